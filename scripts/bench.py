@@ -0,0 +1,254 @@
+#!/usr/bin/env python
+"""Benchmark suite: per-stage timings of the training pipeline and inference throughput.
+
+``run`` scales the synthetic ``data`` section of a config over a grid of row
+counts, feature counts and class weights, runs ``run_training`` on each case
+and takes the per-stage timings from the ``profile.json`` it writes (data,
+split, OOF CV with ``preprocess_fit`` and ``fit:<model>`` per model, bootstrap
+CIs, calibration, threshold, plots, test evaluation), then times
+``InferenceModel.predict`` and the compiled scorer on the saved hold-out.
+Results go to a JSON file.
+``compare`` checks a run against a stored baseline and exits with 1 when a
+stage got slower than ``--tolerance``.
+
+    python scripts/bench.py run --out bench/latest.json
+    python scripts/bench.py compare bench/baseline.json bench/latest.json
+"""
+from __future__ import annotations
+import argparse
+import copy
+import itertools
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Dict, List
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(_ROOT, "src"))
+
+FORMAT_VERSION = 2
+
+
+@contextmanager
+def _timed(stages: Dict[str, float], name: str):
+    start = time.perf_counter()
+    yield
+    stages[name] = stages.get(name, 0.0) + time.perf_counter() - start
+
+
+def run_case(cfg, workdir: str) -> Dict[str, object]:
+    """Run ``run_training`` once for ``cfg`` and read its stage timings from ``profile.json``.
+
+    Training goes through the real pipeline, so every config switch (model
+    selection, calibration source, sampling, compact mode, native categoricals,
+    streaming) is measured as shipped. Top-level profiler stages are summed by
+    name; ``fit:<model>`` and ``preprocess_fit`` sum the per-fold tasks inside
+    ``oof_cv``; the saved artifacts then score the saved hold-out through
+    ``InferenceModel.predict`` (joblib artifacts and the in-memory compiled scorer).
+    """
+    from mlc.infer import InferenceModel
+    from mlc.trainer import run_training
+
+    cfg = copy.deepcopy(cfg)
+    cfg.paths.artifacts_dir = workdir
+    cfg.runtime.profile = True
+    run_training(cfg)
+    with open(os.path.join(workdir, "profile.json"), "r", encoding="utf-8") as f:
+        profile = json.load(f)
+
+    stages: Dict[str, float] = {}
+    best = None
+    for rec in profile["stages"]:
+        if rec["parent"] is None:
+            stages[rec["name"]] = stages.get(rec["name"], 0.0) + rec["wall_s"]
+        if rec["name"] == "calibration":
+            best = rec.get("model", best)  # калибруется только выбранная модель
+    for task in profile["tasks"]:
+        # общий препроцессинг фолдов помечен task="preprocess" и model="a+b"
+        key = "preprocess_fit" if task.get("task") == "preprocess" else f"fit:{task['model']}"
+        stages[key] = stages.get(key, 0.0) + task["wall_s"]
+    total = profile["total"]["wall_s"]
+
+    X_te = _read_holdout(workdir).drop(columns=[cfg.data.target])
+    inf = InferenceModel.load({"artifacts_dir": workdir}, use_bundle=False)
+    with _timed(stages, "predict"):
+        inf.predict(X_te)
+    throughput = {"predict_rows_per_s": len(X_te) / max(stages["predict"], 1e-9)}
+    total += stages["predict"]
+    try:
+        compiled = InferenceModel(inf.preproc, inf.compile(), inf.threshold)
+        with _timed(stages, "predict_compiled"):
+            compiled.predict(X_te)
+        throughput["compiled_rows_per_s"] = len(X_te) / max(stages["predict_compiled"], 1e-9)
+        total += stages["predict_compiled"]
+    except NotImplementedError:
+        pass
+    return {"best_model": best, "total_s": total, "stages": stages, "throughput": throughput}
+
+
+def _read_holdout(workdir: str):
+    """Hold-out saved by the trainer: ``test.csv`` or ``test.parquet`` / ``test.arrow``."""
+    import pandas as pd
+
+    from mlc.data import columnar_kind, read_columnar
+
+    for name in ("test.csv", "test.parquet", "test.arrow"):
+        path = os.path.join(workdir, name)
+        if os.path.exists(path):
+            kind = columnar_kind(path)
+            return read_columnar(path, kind, float32=False) if kind else pd.read_csv(path)
+    raise FileNotFoundError(f"No hold-out test set in {workdir}")
+
+
+def _grid(base, rows: List[int], features: List[int], weights: List[float], models):
+    for n, f, w in itertools.product(rows, features, weights):
+        cfg = copy.deepcopy(base)
+        cfg.data.kind = "synthetic"
+        cfg.data.n_samples, cfg.data.n_features = n, f
+        cfg.data.n_informative = min(cfg.data.n_informative, max(2, f // 3))
+        cfg.data.n_redundant = min(cfg.data.n_redundant, f - cfg.data.n_informative)
+        cfg.data.n_repeated = 0
+        cfg.data.weights = [w, round(1.0 - w, 6)]
+        if models:
+            cfg.models = [m for m in cfg.models if m.get("name", m.get("type")) in models]
+        yield f"rows={n},features={f},weight={w}", {"rows": n, "features": f, "weight": w}, cfg
+
+
+def _meta(config: str) -> Dict[str, object]:
+    try:
+        sha = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=_ROOT, capture_output=True, text=True
+        ).stdout.strip()
+    except OSError:
+        sha = ""
+    return {
+        "format_version": FORMAT_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git": sha,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": config,
+    }
+
+
+def cmd_run(args) -> int:
+    from mlc.config import load_config
+
+    if not args.verbose:
+        logging.disable(logging.INFO)  # логи стадий мешают читать прогресс
+    base = load_config(args.config)
+    base.runtime.n_jobs = args.n_jobs
+    if args.n_repeats is not None:
+        base.validation.cv.n_repeats = args.n_repeats
+    cases = []
+    grid = list(_grid(base, args.rows, args.features, args.weights, args.models))
+    for i, (case, params, cfg) in enumerate(grid, 1):
+        best: Dict[str, object] = {}
+        for _ in range(args.repeat):  # минимум по повторам — устойчивее к шуму
+            with tempfile.TemporaryDirectory(prefix="mlc-bench-") as tmp:
+                r = run_case(cfg, tmp)
+            if not best:
+                best = r
+            else:
+                best["total_s"] = min(best["total_s"], r["total_s"])
+                for k, v in r["stages"].items():
+                    best["stages"][k] = min(best["stages"].get(k, v), v)
+                for k, v in r["throughput"].items():
+                    best["throughput"][k] = max(best["throughput"][k], v)
+        print(f"[{i}/{len(grid)}] {case}: {best['total_s']:.2f}s (best model {best['best_model']})")
+        cases.append({"case": case, "params": params, **best})
+
+    out = {"meta": _meta(args.config), "cases": cases}
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(out, f, indent=2)
+    print(f"Saved {args.out}")
+    return 0
+
+
+def compare(base: Dict, new: Dict, tolerance: float, min_seconds: float) -> List[Dict]:
+    """Rows (case, stage, base, new, ratio, regression) for stages present in both runs."""
+    old = {c["case"]: c for c in base["cases"]}
+    rows = []
+    for c in new["cases"]:
+        if c["case"] not in old:
+            continue
+        for stage, t in c["stages"].items():
+            t0 = old[c["case"]]["stages"].get(stage)
+            if t0 is None:
+                continue
+            ratio = t / t0 if t0 > 0 else float("inf")
+            slower = ratio > 1.0 + tolerance and t - t0 > min_seconds
+            rows.append(
+                {
+                    "case": c["case"],
+                    "stage": stage,
+                    "base": t0,
+                    "new": t,
+                    "ratio": ratio,
+                    "regression": slower,
+                }
+            )
+    return rows
+
+
+def cmd_compare(args) -> int:
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.current, "r", encoding="utf-8") as f:
+        new = json.load(f)
+    rows = compare(base, new, args.tolerance, args.min_seconds)
+    if not rows:
+        print("No common cases/stages to compare")
+        return 1
+    width = max(len(r["case"]) for r in rows)
+    for r in rows:
+        flag = "REGRESSION" if r["regression"] else ""
+        print(
+            f"{r['case']:<{width}}  {r['stage']:<22} {r['base']:8.3f}s -> {r['new']:8.3f}s "
+            f"({r['ratio']:5.2f}x) {flag}"
+        )
+    bad = [r for r in rows if r["regression"]]
+    print(f"{len(bad)} regression(s) beyond +{args.tolerance:.0%} in {len(rows)} stage timings")
+    return 1 if bad else 0
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="Run the benchmark grid and write JSON")
+    run.add_argument("--config", default=os.path.join(_ROOT, "configs", "default.yaml"))
+    run.add_argument("--rows", type=int, nargs="+", default=[2000, 10000])
+    run.add_argument("--features", type=int, nargs="+", default=[20, 60])
+    run.add_argument("--weights", type=float, nargs="+", default=[0.95, 0.99])
+    run.add_argument("--models", nargs="*", default=None, help="Only these cfg.models names")
+    run.add_argument("--n-repeats", type=int, default=None, help="Override validation.cv.n_repeats")
+    run.add_argument("--n-jobs", type=int, default=1)
+    run.add_argument("--repeat", type=int, default=1, help="Runs per case (best time counts)")
+    run.add_argument("--out", default=os.path.join("bench", "latest.json"))
+    run.add_argument("--verbose", action="store_true", help="Keep INFO logs of the pipeline")
+    run.set_defaults(func=cmd_run)
+
+    cmp_ = sub.add_parser("compare", help="Flag stages slower than the baseline")
+    cmp_.add_argument("baseline")
+    cmp_.add_argument("current")
+    cmp_.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown (0.25=+25%%)")
+    cmp_.add_argument(
+        "--min-seconds", type=float, default=0.05, help="Ignore absolute slowdowns below this"
+    )
+    cmp_.set_defaults(func=cmd_compare)
+
+    args = ap.parse_args()
+    sys.exit(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+"""Fit/predict time and peak RSS of hist_gbdt: one-hot categoricals vs native categorical splits.
+
+Each mode runs in its own subprocess on the same synthetic table
+(:class:`mlc.synthetic.SyntheticGenerator` with ``--high-card`` categoricals of
+``--levels`` Zipf-distributed levels): ``onehot`` is the dense one-hot
+preprocessor every model used before, ``native`` encodes every categorical as
+one column of ordinal codes and passes them as ``categorical_features``. The
+model is fitted on the first ``1 - --test-size`` of the rows and scores the rest.
+Reported: preprocessed width, fit and predict seconds, scoring rows/s, RSS after
+the table is built, the process peak and the hold-out PR-AUC.
+
+    python scripts/bench_categorical.py --rows 100000 --high-card 4 --levels 250 --json cat.json
+"""
+from __future__ import annotations
+import argparse
+import dataclasses as dc
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+_SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+
+def _rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def _peak_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Linux: КБ
+
+
+def run_mode(mode: str, args) -> dict:
+    from sklearn.metrics import average_precision_score
+    from sklearn.pipeline import Pipeline
+    from mlc.config import load_config
+    from mlc.features import build_preprocessor, categorical_features
+    from mlc.models import build_model
+    from mlc.synthetic import SyntheticGenerator
+
+    d = load_config(args.config).data
+    d = dc.replace(
+        d, n_samples=args.rows, n_high_card=args.high_card, high_card_levels=args.levels
+    )
+    X, y = SyntheticGenerator(d, seed=0).generate()
+    n_fit = int(len(X) * (1 - args.test_size))
+    X_fit, y_fit, X_te, y_te = X.iloc[:n_fit], y.iloc[:n_fit], X.iloc[n_fit:], y.iloc[n_fit:]
+    data_mb = _rss_mb()
+
+    spec = {"type": "hist_gbdt", "params": {"max_iter": args.max_iter, "max_depth": 6}}
+    native = mode == "native"
+    pre = build_preprocessor(X_fit, native_categorical=native)
+    cat_idx = categorical_features(pre) if native else None
+    pipe = Pipeline([("preprocess", pre), ("model", build_model(spec, 0, cat_idx))])
+    start = time.perf_counter()
+    pipe.fit(X_fit, y_fit)
+    fit_s = time.perf_counter() - start
+    start = time.perf_counter()
+    proba = pipe.predict_proba(X_te)[:, 1]
+    predict_s = time.perf_counter() - start
+    return {
+        "mode": mode,
+        "rows": args.rows,
+        "width": int(pipe[-1].n_features_in_),
+        "fit_s": round(fit_s, 2),
+        "predict_s": round(predict_s, 3),
+        "predict_rows_per_s": round(len(X_te) / predict_s),
+        "data_rss_mb": round(data_mb, 1),
+        "peak_rss_mb": round(_peak_mb(), 1),
+        "pr_auc": round(float(average_precision_score(y_te, proba)), 4),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    ap.add_argument("--config", default="configs/default.yaml", help="Base data.* settings")
+    ap.add_argument("--rows", type=int, default=100_000)
+    ap.add_argument("--high-card", type=int, default=4, help="High-cardinality categoricals")
+    ap.add_argument("--levels", type=int, default=250, help="Levels per categorical")
+    ap.add_argument("--max-iter", type=int, default=100, help="Boosting iterations")
+    ap.add_argument("--test-size", type=float, default=0.2, help="Share of rows to score")
+    ap.add_argument("--modes", default="onehot,native")
+    ap.add_argument("--json", default=None, help="Write results to this JSON file")
+    ap.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:  # один режим в отдельном процессе: ru_maxrss не смешивается
+        print(json.dumps(run_mode(args.child, args)))
+        return
+
+    rows = []
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join([_SRC, os.environ.get("PYTHONPATH", "")])}
+    for mode in args.modes.split(","):
+        cmd = [sys.executable, os.path.abspath(__file__), *sys.argv[1:], "--child", mode]
+        proc = subprocess.run(cmd, env=env, capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(f"{mode:<7} failed (exit {proc.returncode}): {proc.stderr.strip()[-300:]}")
+            continue
+        r = json.loads(proc.stdout.strip().splitlines()[-1])
+        rows.append(r)
+        print(
+            f"{mode:<7} width {r['width']:6d}  fit {r['fit_s']:7.1f}s  "
+            f"predict {r['predict_rows_per_s']:10,} rows/s  "
+            f"peak {r['peak_rss_mb']:7.0f} MB (data {r['data_rss_mb']:.0f})  "
+            f"PR-AUC {r['pr_auc']:.4f}"
+        )
+    if len(rows) == 2:
+        a, b = rows
+        print(
+            f"{b['mode']} vs {a['mode']}: fit {a['fit_s'] / b['fit_s']:.1f}x, "
+            f"predict {a['predict_s'] / b['predict_s']:.1f}x, "
+            f"peak RSS {a['peak_rss_mb'] / b['peak_rss_mb']:.1f}x"
+        )
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+"""Import-time benchmark for the mlc entry points (``python -X importtime``).
+
+Every module in ``BUDGETS`` is imported in a fresh interpreter ``--repeat``
+times; the best cumulative time is compared with its budget, and the list of
+imported packages is checked against modules that must stay lazy on that path
+(sklearn, matplotlib, yaml, ...). ``--check`` exits with 1 on any violation;
+the test suite runs it this way.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+_HEAVY = ("sklearn", "scipy", "matplotlib", "joblib", "yaml")
+
+# модуль -> (бюджет на холодный импорт в мс, пакеты, которые он не должен тянуть)
+BUDGETS: Dict[str, Tuple[float, Tuple[str, ...]]] = {
+    "mlc.config": (150.0, _HEAVY + ("pandas",)),
+    "mlc.compiled": (400.0, _HEAVY + ("pandas",)),
+    "mlc.infer": (1000.0, _HEAVY),
+    "mlc.serving": (1200.0, _HEAVY),
+    "mlc.trainer": (3000.0, ("matplotlib",)),  # sklearn нужен, графики — нет
+}
+
+_SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+
+def importtime(module: str) -> Tuple[float, Dict[str, float]]:
+    """Cold import of ``module``: (its cumulative ms, {top-level package: cumulative ms})."""
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join([_SRC, os.environ.get("PYTHONPATH", "")])}
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total, packages = 0.0, {}
+    for line in proc.stderr.splitlines():
+        # import time:  self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        ms = int(cumulative) / 1000.0
+        top = name.strip().split(".")[0]
+        packages[top] = max(packages.get(top, 0.0), ms)
+        if name.strip() == module:
+            total = ms
+    return total, packages
+
+
+def run(modules: List[str], repeat: int, scale: float) -> List[Dict[str, object]]:
+    rows = []
+    for module in modules:
+        budget, forbidden = BUDGETS[module]
+        runs = [importtime(module) for _ in range(repeat)]
+        best, packages = min(runs, key=lambda r: r[0])
+        heavy = sorted(set(forbidden) & set(packages))
+        top = sorted(
+            ((p, ms) for p, ms in packages.items() if p != module.split(".")[0]),
+            key=lambda kv: -kv[1],
+        )[:5]
+        rows.append(
+            {
+                "module": module,
+                "ms": round(best, 1),
+                "budget_ms": budget * scale,
+                "forbidden_imported": heavy,
+                "heaviest": {p: round(ms, 1) for p, ms in top},
+                "ok": best <= budget * scale and not heavy,
+            }
+        )
+    return rows
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("modules", nargs="*", default=list(BUDGETS), help="Modules to benchmark")
+    ap.add_argument("--repeat", type=int, default=5, help="Cold imports per module (best counts)")
+    ap.add_argument(
+        "--budget-scale", type=float, default=1.0, help="Multiply budgets (slow CI machines)"
+    )
+    ap.add_argument("--json", default=None, help="Write results to this JSON file")
+    ap.add_argument("--check", action="store_true", help="Exit with 1 if a budget is exceeded")
+    args = ap.parse_args()
+
+    rows = run(args.modules, args.repeat, args.budget_scale)
+    for r in rows:
+        heaviest = ", ".join(f"{p} {ms:.0f}" for p, ms in r["heaviest"].items())
+        print(
+            f"{r['module']:<14} {r['ms']:8.1f} ms (budget {r['budget_ms']:.0f})  "
+            f"{'ok' if r['ok'] else 'FAIL'}  heaviest: {heaviest}"
+        )
+        if r["forbidden_imported"]:
+            print(f"{'':<14} imports {', '.join(r['forbidden_imported'])} eagerly")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+    if args.check and not all(r["ok"] for r in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+"""Peak RSS of OOF training: default DataFrame pipeline vs compact (float32 / CSR) mode.
+
+Each mode runs in its own subprocess on the same synthetic table (``--rows`` x
+``--cols``, of which ``--cat-cols`` are string categoricals with
+``--cardinality`` levels): one logistic model, ``--folds``-fold OOF predictions,
+exactly as ``run_training`` does it. Reported are the RSS after the table is
+built, the process peak and the extra memory training needed on top of the data.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+_SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+
+def _rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def _peak_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Linux: КБ
+
+
+def _table(rows: int, cols: int, cat_cols: int, cardinality: int, seed: int = 0):
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    n_num = cols - cat_cols
+    cols_num = [f"x{i:03d}" for i in range(n_num)]
+    X = pd.DataFrame(rng.standard_normal((rows, n_num)), columns=cols_num)
+    levels = np.array([f"v{i}" for i in range(cardinality)], dtype=object)
+    for j in range(cat_cols):
+        X[f"c{j:02d}"] = levels[rng.integers(0, cardinality, size=rows)]
+    logit = X.iloc[:, 0].to_numpy() + 0.5 * (X[f"c{0:02d}"] == "v0").to_numpy() - 3.0
+    y = pd.Series((rng.random(rows) < 1 / (1 + np.exp(-logit))).astype(int), name="target")
+    return X, y
+
+
+def run_mode(mode: str, args) -> dict:
+    from sklearn.model_selection import StratifiedKFold
+    from sklearn.pipeline import Pipeline
+    from mlc.features import CompactEncoder, build_preprocessor
+    from mlc.models import build_model
+    from mlc.validation import oof_predict_many
+
+    X, y = _table(args.rows, args.cols, args.cat_cols, args.cardinality)
+    data_mb = _rss_mb()
+    start = time.perf_counter()
+    if mode == "compact":
+        enc = CompactEncoder().fit(X)
+        X_fit = enc.transform(X)
+        del X  # как в run_training: после кодирования таблица не нужна
+        pre = build_preprocessor(X_fit, num_cols=enc.num_idx_, cat_cols=enc.cat_idx_, compact=True)
+    else:
+        X_fit, pre = X, build_preprocessor(X)
+    spec = {"type": "logistic", "params": {"max_iter": args.max_iter}}
+    pipe = Pipeline([("preprocess", pre), ("model", build_model(spec, 0))])
+    cv = StratifiedKFold(n_splits=args.folds, shuffle=True, random_state=0)
+    oof = oof_predict_many({"lr": pipe}, X_fit, y, cv)["lr"]
+    peak = _peak_mb()
+    return {
+        "mode": mode,
+        "rows": args.rows,
+        "cols": args.cols,
+        "data_rss_mb": round(data_mb, 1),
+        "peak_rss_mb": round(peak, 1),
+        "train_extra_mb": round(peak - data_mb, 1),
+        "seconds": round(time.perf_counter() - start, 2),
+        "oof_mean": float(oof.mean()),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--cols", type=int, default=200)
+    ap.add_argument("--cat-cols", type=int, default=20, help="Categorical columns among --cols")
+    ap.add_argument("--cardinality", type=int, default=50, help="Levels per categorical column")
+    ap.add_argument("--folds", type=int, default=2)
+    ap.add_argument("--max-iter", type=int, default=50, help="LogisticRegression max_iter")
+    ap.add_argument("--modes", default="default,compact")
+    ap.add_argument("--json", default=None, help="Write results to this JSON file")
+    ap.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:  # один режим в отдельном процессе: ru_maxrss не смешивается
+        print(json.dumps(run_mode(args.child, args)))
+        return
+
+    rows = []
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join([_SRC, os.environ.get("PYTHONPATH", "")])}
+    for mode in args.modes.split(","):
+        cmd = [sys.executable, os.path.abspath(__file__), *sys.argv[1:], "--child", mode]
+        proc = subprocess.run(cmd, env=env, capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(f"{mode:<8} failed (exit {proc.returncode}): {proc.stderr.strip()[-300:]}")
+            continue
+        r = json.loads(proc.stdout.strip().splitlines()[-1])
+        rows.append(r)
+        print(
+            f"{mode:<8} data {r['data_rss_mb']:8.0f} MB  peak {r['peak_rss_mb']:8.0f} MB  "
+            f"training +{r['train_extra_mb']:.0f} MB  {r['seconds']:.1f}s"
+        )
+    if len(rows) == 2:
+        print(f"peak RSS ratio: {rows[0]['peak_rss_mb'] / rows[1]['peak_rss_mb']:.2f}x")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+"""Batch scoring throughput of scripts/predict.py against the number of worker processes.
+
+The input is tiled to ``--rows`` rows (written once to a temporary file of the
+same format), then ``score_file`` is timed for every ``--workers`` count
+(best of ``--repeat`` runs). Reported: rows/s, speedup over one worker and
+parallel efficiency (speedup / workers); every run's output is checked to be
+identical to the single-worker one.
+
+    python scripts/bench_predict.py --artifacts-dir artifacts --input artifacts/test.csv \\
+        --rows 1000000 --workers 1,2,4,8 --out bench/predict.json
+"""
+from __future__ import annotations
+import argparse
+import filecmp
+import json
+import os
+import tempfile
+import time
+import pandas as pd
+from mlc.infer import InferenceModel, score_file
+
+
+def _tiled(path: str, rows: int, tmp: str) -> str:
+    from mlc.data import columnar_kind, read_columnar
+
+    kind = columnar_kind(path)
+    df = read_columnar(path, kind, float32=False) if kind else pd.read_csv(path)
+    df = pd.concat([df] * -(-rows // len(df)), ignore_index=True).iloc[:rows]
+    if kind == "parquet":
+        out = os.path.join(tmp, "input.parquet")
+        df.to_parquet(out, index=False)
+    else:
+        out = os.path.join(tmp, "input.csv")
+        df.to_csv(out, index=False)
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    ap.add_argument("--artifacts-dir", required=True)
+    ap.add_argument("--input", required=True, help="CSV or Parquet with feature rows")
+    ap.add_argument("--rows", type=int, default=500_000, help="Tile the input to this many rows")
+    default_workers = ",".join(str(w) for w in (1, 2, 4, 8, 16) if w <= (os.cpu_count() or 1))
+    ap.add_argument("--workers", default=default_workers, help="Worker counts, comma separated")
+    ap.add_argument("--chunksize", type=int, default=50_000, help="Rows per shard")
+    ap.add_argument("--columns", nargs="*", default=[], help="Input columns echoed to the output")
+    ap.add_argument("--joblib", action="store_true", help="Use joblib artifacts, not the bundle")
+    ap.add_argument("--repeat", type=int, default=2, help="Timing runs per count (best counts)")
+    ap.add_argument("--out", default=None, help="Optional JSON file with the results")
+    args = ap.parse_args()
+
+    inf = InferenceModel.load({"artifacts_dir": args.artifacts_dir}, use_bundle=not args.joblib)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        src = _tiled(args.input, args.rows, tmp)
+        ref = None
+        for w in (int(x) for x in args.workers.split(",")):
+            out = os.path.join(tmp, f"preds_{w}.csv")
+            best = float("inf")
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                score_file(inf, src, out, args.chunksize, args.columns, n_jobs=w)
+                best = min(best, time.perf_counter() - start)
+            if ref is None:
+                ref, base = out, best
+            elif not filecmp.cmp(ref, out, shallow=False):
+                raise RuntimeError(f"Output with {w} workers differs from the first run")
+            results.append(
+                {
+                    "workers": w,
+                    "seconds": best,
+                    "rows_per_s": args.rows / best,
+                    "speedup": base / best,
+                    "efficiency": base / best / w,
+                }
+            )
+            r = results[-1]
+            print(
+                f"workers={w:<3} {r['rows_per_s']:12,.0f} rows/s  "
+                f"speedup {r['speedup']:5.2f}x  efficiency {r['efficiency']:.2f}"
+            )
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        meta = {"cpu_count": os.cpu_count(), "rows": args.rows, "chunksize": args.chunksize}
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"meta": meta, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
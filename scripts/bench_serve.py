@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+"""Local load generator for scripts/serve.py: compare micro-batching policies.
+
+For every ``max_batch_size:max_wait_ms`` policy a server subprocess is started,
+``--concurrency`` client threads send single-row requests over keep-alive
+connections for ``--duration`` seconds, and client-side p50/p99 latency and
+throughput are reported together with the server's mean batch size.
+"""
+from __future__ import annotations
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import numpy as np
+import pandas as pd
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(port: int, timeout: float = 60.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/health")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+def _client(port, bodies, stop_at, latencies, seed):
+    rng = np.random.default_rng(seed)
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    headers = {"Content-Type": "application/json"}
+    while time.perf_counter() < stop_at:
+        body = bodies[rng.integers(len(bodies))]
+        t0 = time.perf_counter()
+        conn.request("POST", "/predict", body=body, headers=headers)
+        conn.getresponse().read()
+        latencies.append(time.perf_counter() - t0)
+    conn.close()
+
+
+def run_policy(artifacts_dir, bodies, batch, wait_ms, concurrency, duration):
+    port = _free_port()
+    serve = os.path.join(os.path.dirname(os.path.abspath(__file__)), "serve.py")
+    cmd = [sys.executable, serve, "--artifacts-dir", artifacts_dir, "--port", str(port)]
+    cmd += ["--max-batch-size", str(batch), "--max-wait-ms", str(wait_ms)]
+    proc = subprocess.Popen(cmd, stderr=subprocess.DEVNULL)
+    try:
+        _wait_ready(port)
+        per_thread = [[] for _ in range(concurrency)]
+        stop_at = time.perf_counter() + duration
+        threads = [
+            threading.Thread(target=_client, args=(port, bodies, stop_at, per_thread[i], i))
+            for i in range(concurrency)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        conn = http.client.HTTPConnection("127.0.0.1", port)
+        conn.request("GET", "/stats")
+        server_stats = json.loads(conn.getresponse().read())
+    finally:
+        proc.terminate()
+        proc.wait()
+    lat = np.concatenate([np.asarray(x) for x in per_thread]) * 1000.0
+    return {
+        "max_batch_size": batch,
+        "max_wait_ms": wait_ms,
+        "concurrency": concurrency,
+        "requests": int(lat.size),
+        "throughput_rps": lat.size / duration,
+        "p50_ms": float(np.percentile(lat, 50)),
+        "p99_ms": float(np.percentile(lat, 99)),
+        "mean_batch_size": server_stats["mean_batch_size"],
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--artifacts-dir", required=True)
+    ap.add_argument("--input", required=True, help="CSV with feature rows to replay")
+    ap.add_argument("--policies", default="1:0,16:1,64:2,256:5", help="batch:wait_ms,...")
+    ap.add_argument("--concurrency", type=int, default=32)
+    ap.add_argument("--duration", type=float, default=5.0, help="Seconds per policy")
+    ap.add_argument("--out", default=None, help="Optional JSON file with the results")
+    args = ap.parse_args()
+
+    rows = pd.read_csv(args.input, nrows=10_000).to_dict(orient="records")
+    bodies = [json.dumps(r).encode("utf-8") for r in rows]
+    results = []
+    for policy in args.policies.split(","):
+        batch, wait_ms = policy.split(":")
+        res = run_policy(
+            args.artifacts_dir, bodies, int(batch), float(wait_ms), args.concurrency, args.duration
+        )
+        results.append(res)
+        print(
+            f"batch={res['max_batch_size']:>4} wait={res['max_wait_ms']:>5.1f}ms  "
+            f"rps={res['throughput_rps']:>8.0f}  p50={res['p50_ms']:>7.2f}ms  "
+            f"p99={res['p99_ms']:>7.2f}ms  mean_batch={res['mean_batch_size']:.1f}"
+        )
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+"""Collapse the calibrated ensemble of saved artifacts into one model + a calibration table.
+
+The table is fitted on reference rows (``--reference``, or the hold-out
+reservoir saved with the artifacts), then the collapsed model is compared with
+the original ensemble on rows the table has not seen: ``--input``, or by
+default the ``--report-share`` of the reservoir kept out of the table (the
+reservoir is sampled from the saved hold-out, so that file is refused as
+``--input``; with ``--reference`` the default is the saved hold-out). Reported:
+probability differences, label agreement at the saved threshold and, when the
+target is known, PR-AUC / Brier / ECE of both, plus the row sources in
+``rows``. Scoring throughput is measured for the sklearn and the compiled
+paths. ``--out-dir`` writes a complete artifacts directory with the collapsed
+model and ``parity.json``.
+
+    python scripts/collapse_model.py --config configs/imbalance.yaml --out-dir artifacts_collapsed
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import shutil
+import time
+import numpy as np
+import pandas as pd
+from mlc.infer import InferenceModel
+
+
+def _read(path: str) -> pd.DataFrame:
+    from mlc.data import columnar_kind, read_columnar
+
+    kind = columnar_kind(path)
+    return read_columnar(path, kind, float32=False) if kind else pd.read_csv(path)
+
+
+def _same_file(a: str, b: str) -> bool:
+    if os.path.exists(a) and os.path.exists(b):
+        return os.path.samefile(a, b)
+    return os.path.abspath(a) == os.path.abspath(b)
+
+
+def _rows_per_s(model: InferenceModel, X: pd.DataFrame, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        model.predict(X)
+        best = min(best, time.perf_counter() - start)
+    return len(X) / max(best, 1e-9)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--config", help="Path to YAML config (paths.artifacts_dir, data.target)")
+    src.add_argument("--artifacts-dir", help="Artifacts directory")
+    ap.add_argument("--target", default=None, help="Target column (default: data.target/target)")
+    ap.add_argument("--input", default=None, help="Evaluation data (default: see above)")
+    ap.add_argument("--reference", default=None, help="Rows for the table (default: reservoir)")
+    ap.add_argument(
+        "--report-share",
+        type=float,
+        default=0.5,
+        help="Share of the reservoir kept out of the table for the report",
+    )
+    ap.add_argument("--member", type=int, default=None, help="Keep this ensemble member")
+    ap.add_argument("--repeat", type=int, default=3, help="Timing runs (best counts)")
+    ap.add_argument("--out-dir", default=None, help="Write collapsed artifacts here")
+    ap.add_argument("--json", default=None, help="Write the parity report to this JSON file")
+    args = ap.parse_args()
+
+    from mlc.calibration import calibration_parity
+    from mlc.compiled import _split_compact
+    from mlc.incremental import load_reservoir
+
+    target = args.target or "target"
+    if args.config:
+        from mlc.config import load_config
+
+        cfg = load_config(args.config)
+        art, target = cfg.paths.artifacts_dir, args.target or cfg.data.target
+    else:
+        art = args.artifacts_dir
+    paths = {"artifacts_dir": art}
+
+    names = ("test.csv", "test.parquet", "test.arrow")
+    saved = [os.path.join(art, f) for f in names if os.path.exists(os.path.join(art, f))]
+    if args.input and not args.reference and any(_same_file(args.input, p) for p in saved):
+        ap.error("the reservoir is sampled from the saved hold-out; pass another --input")
+
+    inf = InferenceModel.load(paths, use_bundle=False)
+    df, y = None, None
+    if args.reference:
+        X_ref = _read(args.reference).drop(columns=[target], errors="ignore")
+        rows = {"reference": args.reference}
+    else:
+        reservoir = load_reservoir(art)
+        if reservoir is None:
+            ap.error("no reservoir.pkl (incremental.reservoir: true); pass --reference")
+        X_ref = reservoir["X"]
+        rows = {"reference": "reservoir.pkl"}
+        if args.input is None:
+            if not 0.0 < args.report_share < 1.0:
+                ap.error("--report-share must be in (0, 1)")
+            # часть резервуара не идёт в таблицу: отчёт — на строках, которых она не видела
+            order = np.random.default_rng(0).permutation(len(X_ref))
+            n_report = int(round(len(X_ref) * args.report_share))
+            report_rows, table_rows = order[:n_report], order[n_report:]
+            df = X_ref.iloc[report_rows].reset_index(drop=True)
+            y = np.asarray(reservoir["y"])[report_rows]
+            X_ref = X_ref.iloc[table_rows].reset_index(drop=True)
+            rows["input"] = f"reservoir.pkl (held out, share {args.report_share})"
+    collapsed = inf.collapse(X_ref, member=args.member)
+
+    if df is None:
+        if args.input is None:
+            if not saved:
+                ap.error("no saved hold-out in the artifacts; pass --input")
+            args.input = saved[0]
+        if args.reference and _same_file(args.input, args.reference):
+            ap.error("--input and --reference are the same rows: parity would be in-sample")
+        df = _read(args.input)
+        y = df.pop(target) if target in df else None
+        rows["input"] = args.input
+    rows["n_reference"], rows["n_input"] = len(X_ref), len(df)
+    p_ref, _ = inf.predict(df)
+    p_new, _ = collapsed.predict(df)
+    report = calibration_parity(p_ref.values, p_new.values, y, threshold=inf.threshold)
+    report["member"] = _split_compact(collapsed.model)[1].member
+    report["rows"] = rows
+
+    speed = {
+        "sklearn_ensemble": _rows_per_s(inf, df, args.repeat),
+        "sklearn_collapsed": _rows_per_s(collapsed, df, args.repeat),
+    }
+    try:
+        for name, m in (("compiled_ensemble", inf), ("compiled_collapsed", collapsed)):
+            fast = InferenceModel(None, m.compile(), m.threshold)
+            speed[name] = _rows_per_s(fast, df, args.repeat)
+    except NotImplementedError:
+        pass
+    report["rows_per_s"] = speed
+
+    for k, v in report.items():
+        if k not in ("rows_per_s", "rows"):
+            print(f"{k:<22} {v:.5f}" if isinstance(v, float) else f"{k:<22} {v}")
+    print(
+        f"rows: table {rows['reference']} ({rows['n_reference']}), "
+        f"report {rows['input']} ({rows['n_input']})"
+    )
+    for k, v in speed.items():
+        print(f"{k:<22} {v:12,.0f} rows/s")
+    print(f"speedup (sklearn)      {speed['sklearn_collapsed'] / speed['sklearn_ensemble']:.2f}x")
+
+    if args.out_dir:
+        from mlc.persistence import save_artifacts
+
+        os.makedirs(args.out_dir, exist_ok=True)
+        metrics = {}
+        for name in ("metrics_cv", "metrics_test"):
+            with open(os.path.join(art, f"{name}.json"), "r", encoding="utf-8") as f:
+                metrics[name] = json.load(f)
+        with open(os.path.join(art, "thresholds.json"), "r", encoding="utf-8") as f:
+            thresholds = json.load(f)
+        save_artifacts(
+            preproc=inf.preproc,
+            model=collapsed.model,
+            metrics_cv=metrics["metrics_cv"],
+            metrics_test=metrics["metrics_test"],
+            thresholds=thresholds,
+            paths=argparse.Namespace(artifacts_dir=args.out_dir),
+        )
+        if os.path.exists(os.path.join(art, "reservoir.pkl")):
+            shutil.copy(os.path.join(art, "reservoir.pkl"), args.out_dir)
+        with open(os.path.join(args.out_dir, "parity.json"), "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Collapsed artifacts saved to {args.out_dir}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
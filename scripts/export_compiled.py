@@ -0,0 +1,39 @@
+#!/usr/bin/env python
+from __future__ import annotations
+import argparse
+import os
+import time
+import pandas as pd
+from mlc.config import load_config
+from mlc.infer import InferenceModel
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Compile artifacts into a NumPy-only scorer")
+    ap.add_argument("--config", required=True, help="Path to YAML config (paths.artifacts_dir)")
+    ap.add_argument("--out", default=None, help="Output dir (default: <artifacts_dir>/compiled)")
+    ap.add_argument("--check", default=None, help="CSV to verify parity and time single rows")
+    args = ap.parse_args()
+
+    cfg = load_config(args.config)
+    inf = InferenceModel.load(cfg.paths)
+    compiled = inf.compile()
+    out = args.out or os.path.join(cfg.paths.artifacts_dir, "compiled")
+    compiled.save(out)
+    print(f"Compiled model saved to {out}")
+
+    if args.check:
+        df = pd.read_csv(args.check, nrows=2000)
+        ref, _ = inf.predict(df)
+        got = compiled.predict_proba(df)
+        print(f"max |proba diff| vs sklearn: {abs(got - ref.values).max():.2e}")
+        rows = df.to_dict(orient="records")
+        start = time.perf_counter()
+        for r in rows:
+            compiled.predict_proba(r)
+        per_row = (time.perf_counter() - start) / len(rows) * 1e6
+        print(f"single-row latency: {per_row:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
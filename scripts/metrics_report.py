@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+"""Merge streaming metrics states (``predict.py --metrics-out``) and print the metrics.
+
+Each state is a mergeable :class:`mlc.metrics.StreamingMetrics` accumulator, so
+scoring workers, shards or days are combined without touching the scored rows:
+the report has the hold-out metrics, the ROC/PR-AUC bounds of the binning, the
+expected cost at the threshold of the states and the calibration table.
+
+    python scripts/metrics_report.py metrics_*.json --cost-fn 10 --cost-fp 1 --out merged.json
+"""
+from __future__ import annotations
+import argparse
+import json
+from mlc.metrics import StreamingMetrics
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    ap.add_argument("states", nargs="+", help="JSON states written by --metrics-out")
+    ap.add_argument("--cost-fn", type=float, default=None, help="Cost of a false negative")
+    ap.add_argument("--cost-fp", type=float, default=None, help="Cost of a false positive")
+    ap.add_argument("--threshold", type=float, default=None, help="Threshold for the cost")
+    ap.add_argument("--calibration-bins", type=int, default=10, help="Calibration table bins")
+    ap.add_argument("--out", default=None, help="Write the merged state to this JSON file")
+    ap.add_argument("--json", default=None, help="Write the report to this JSON file")
+    args = ap.parse_args()
+
+    acc = StreamingMetrics.load(args.states[0])
+    for path in args.states[1:]:
+        acc.merge(StreamingMetrics.load(path))
+
+    report = {"n": acc.n, "threshold": acc.threshold, **acc.metrics()}
+    report["auc_bounds"] = acc.auc_bounds()
+    if args.cost_fn is not None and args.cost_fp is not None:
+        thr = acc.threshold if args.threshold is None else args.threshold
+        report["cost"] = acc.cost(thr, args.cost_fn, args.cost_fp)
+    mean_pred, frac_pos = acc.calibration_curve(args.calibration_bins)
+    report["calibration"] = {"mean_pred": mean_pred.tolist(), "frac_pos": frac_pos.tolist()}
+
+    for k, v in report.items():
+        if k == "calibration":
+            continue
+        print(f"{k:<14} {v:.5f}" if isinstance(v, float) else f"{k:<14} {v}")
+    print("mean_pred  frac_pos")
+    for p, f in zip(mean_pred, frac_pos):
+        print(f"{p:9.4f} {f:9.4f}")
+
+    if args.out:
+        acc.save(args.out)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,107 @@
 #!/usr/bin/env python
+"""Score a CSV or Parquet/Arrow file chunk by chunk with saved artifacts.
+
+With ``--challenger`` the input is read once and every model writes its own
+``proba_<name>``/``label_<name>`` pair (the artifacts of ``--config`` /
+``--artifacts-dir`` are ``champion``); preprocessing with the same fitted state
+is shared between the models.
+
+    python scripts/predict.py --artifacts-dir artifacts --input artifacts/test.csv \
+        --out preds.csv --challenger new=artifacts_new
+"""
 from __future__ import annotations
 import argparse
-import pandas as pd
-from mlc.config import load_config
-from mlc.infer import InferenceModel
+import os
+from mlc.infer import InferenceModel, MultiInferenceModel, score_file
+
+
+def _challengers(specs):
+    # "имя=каталог" или просто каталог: challenger, challenger_2, ...
+    out = {}
+    for i, spec in enumerate(specs, 1):
+        name, sep, path = spec.partition("=")
+        if not sep:
+            name, path = ("challenger" if i == 1 else f"challenger_{i}"), spec
+        if name == "champion" or name in out:
+            raise ValueError(f"Duplicate model name: {name}")
+        out[name] = {"artifacts_dir": path}
+    return out
 
 
 def main():
-    ap = argparse.ArgumentParser()
-    ap.add_argument("--config", required=True, help="Path to YAML config (paths.artifacts_dir)")
-    ap.add_argument("--input", required=True, help="CSV with features")
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--config", help="Path to YAML config (paths.artifacts_dir)")
+    src.add_argument("--artifacts-dir", help="Artifacts directory (skips the config and yaml)")
+    ap.add_argument("--input", required=True, help="CSV or Parquet/Arrow with features")
     ap.add_argument("--out", required=True, help="Where to save predictions CSV")
+    ap.add_argument(
+        "--chunksize", type=int, default=100_000, help="Rows read and scored per chunk"
+    )
+    ap.add_argument(
+        "--columns",
+        nargs="*",
+        default=None,
+        help="Input columns to keep next to proba/label (e.g. an id); default: all columns",
+    )
+    ap.add_argument("--progress", action="store_true", help="Log throughput (rows/s) per chunk")
+    ap.add_argument(
+        "--n-jobs",
+        type=int,
+        default=1,
+        help="Worker processes scoring chunks in parallel (-1 = all cores); row order is kept",
+    )
+    ap.add_argument(
+        "--metrics-out",
+        default=None,
+        help="Accumulate metrics of labelled rows into this JSON state (see metrics_report.py)",
+    )
+    ap.add_argument("--target", default="target", help="Label column for --metrics-out")
+    ap.add_argument(
+        "--challenger",
+        action="append",
+        default=[],
+        metavar="[NAME=]DIR",
+        help="Also score with these artifacts in the same pass (repeatable)",
+    )
     args = ap.parse_args()
 
-    cfg = load_config(args.config)
-    inf = InferenceModel.load(cfg.paths)
-    df = pd.read_csv(args.input)
-    proba, label = inf.predict(df)
-    out = df.copy()
-    out[proba.name] = proba.values
-    out[label.name] = label.values
-    out.to_csv(args.out, index=False)
+    if args.config:
+        from mlc.config import load_config
+
+        paths = load_config(args.config).paths
+    else:
+        paths = {"artifacts_dir": args.artifacts_dir}
+    if args.challenger:
+        try:
+            models = {"champion": paths, **_challengers(args.challenger)}
+        except ValueError as exc:
+            ap.error(str(exc))
+        inf = MultiInferenceModel.load(models)
+        thresholds = {name: m.threshold for name, m in inf.models.items()}
+    else:
+        inf = InferenceModel.load(paths)
+        thresholds = {None: inf.threshold}
+    metrics = None
+    if args.metrics_out:
+        from mlc.metrics import StreamingMetrics
+
+        metrics = {name: StreamingMetrics(threshold=thr) for name, thr in thresholds.items()}
+    score_file(
+        inf,
+        args.input,
+        args.out,
+        chunksize=args.chunksize,
+        columns=args.columns,
+        progress=args.progress,
+        metrics=metrics if args.challenger or metrics is None else metrics[None],
+        target=args.target,
+        n_jobs=args.n_jobs,
+    )
+    for name, acc in (metrics or {}).items():
+        # metrics.json -> metrics.champion.json, metrics.new.json, ...
+        stem, ext = os.path.splitext(args.metrics_out)
+        acc.save(args.metrics_out if name is None else f"{stem}.{name}{ext}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+from __future__ import annotations
+import argparse
+from mlc.infer import InferenceModel
+from mlc.logging import setup_logging
+from mlc.serving import make_server
+
+logger = setup_logging(name="mlc.serve")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--config", help="Path to YAML config (paths.artifacts_dir)")
+    src.add_argument("--artifacts-dir", help="Artifacts directory (skips the config)")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8080)
+    ap.add_argument("--unix-socket", default=None, help="Serve on a Unix socket instead of TCP")
+    ap.add_argument("--max-batch-size", type=int, default=64, help="Rows per predict_proba call")
+    ap.add_argument("--max-wait-ms", type=float, default=2.0, help="Max time a request waits")
+    args = ap.parse_args()
+
+    if args.config:
+        from mlc.config import load_config
+
+        paths = load_config(args.config).paths
+    else:
+        paths = {"artifacts_dir": args.artifacts_dir}
+    inf = InferenceModel.load(paths)
+    server, batcher = make_server(
+        inf,
+        host=args.host,
+        port=args.port,
+        unix_socket=args.unix_socket,
+        max_batch_size=args.max_batch_size,
+        max_wait_ms=args.max_wait_ms,
+    )
+    where = args.unix_socket or f"http://{args.host}:{server.server_address[1]}"
+    logger.info(
+        "Serving on %s (max_batch_size=%d, max_wait_ms=%.1f)",
+        where,
+        args.max_batch_size,
+        args.max_wait_ms,
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        batcher.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,15 +2,34 @@
 from __future__ import annotations
 import argparse
 from mlc.config import load_config
-from mlc.trainer import run_training
 
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--config", required=True, help="Path to YAML config")
+    ap.add_argument(
+        "--update",
+        default=None,
+        metavar="PATH",
+        help="Incrementally update the artifacts with new rows (CSV/Parquet/Arrow)",
+    )
+    ap.add_argument(
+        "--out-of-core",
+        action="store_true",
+        help="Train chunk by chunk from data.path (same as streaming.enabled: true)",
+    )
     args = ap.parse_args()
     cfg = load_config(args.config)
-    run_training(cfg)
+    if args.out_of_core:
+        cfg.streaming.enabled = True
+    if args.update:
+        from mlc.incremental import run_incremental
+
+        run_incremental(cfg, args.update)
+    else:
+        from mlc.trainer import run_training
+
+        run_training(cfg)
 
 
 if __name__ == "__main__":
@@ -6,6 +6,7 @@ __all__ = [
     "features",
     "models",
     "validation",
+    "cache",
     "calibration",
     "metrics",
     "cost",
@@ -13,4 +14,6 @@ __all__ = [
     "persistence",
     "trainer",
     "infer",
+    "compiled",
+    "serving",
 ]
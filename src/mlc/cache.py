@@ -0,0 +1,74 @@
+from __future__ import annotations
+import os
+import shutil
+import tempfile
+from typing import Any, Dict, Hashable, Optional, Tuple
+import numpy as np
+
+
+def _nbytes(a) -> int:
+    if hasattr(a, "data") and hasattr(a, "indices"):  # scipy.sparse CSR/CSC
+        return int(a.data.nbytes + a.indices.nbytes + a.indptr.nbytes)
+    return int(np.asarray(a).nbytes)
+
+
+class FoldCache:
+    """Transformed (train, valid) matrices per fold, bounded in RAM.
+
+    Arrays stay in memory until ``max_memory_mb`` is reached; after that dense
+    arrays are written to ``.npy`` files under ``spill_dir`` and served back as
+    read-only memmaps (joblib workers then receive them by file name).
+    """
+
+    def __init__(self, max_memory_mb: Optional[float] = None, spill_dir: Optional[str] = None):
+        self.max_bytes = None if max_memory_mb is None else int(max_memory_mb * 2**20)
+        self._spill_root = spill_dir
+        self._spill_dir: Optional[str] = None
+        self._items: Dict[Hashable, Tuple[Any, Any]] = {}
+        self.memory_bytes = 0
+        self.spilled_bytes = 0
+        self._n_spilled = 0
+
+    def _spill(self, part: str, a) -> Any:
+        if self._spill_dir is None:
+            if self._spill_root:
+                os.makedirs(self._spill_root, exist_ok=True)
+            self._spill_dir = tempfile.mkdtemp(prefix="mlc-fold-cache-", dir=self._spill_root)
+        path = os.path.join(self._spill_dir, f"{self._n_spilled:05d}_{part}.npy")
+        self._n_spilled += 1
+        np.save(path, np.ascontiguousarray(a))
+        self.spilled_bytes += _nbytes(a)
+        return np.load(path, mmap_mode="r")
+
+    def _store(self, part: str, a) -> Any:
+        size = _nbytes(a)
+        dense = isinstance(a, np.ndarray)
+        if dense and self.max_bytes is not None and self.memory_bytes + size > self.max_bytes:
+            return self._spill(part, a)
+        self.memory_bytes += size
+        return a
+
+    def put(self, key: Hashable, X_train, X_valid) -> None:
+        self._items[key] = (self._store("tr", X_train), self._store("va", X_valid))
+
+    def get(self, key: Hashable) -> Tuple[Any, Any]:
+        return self._items[key]
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._items
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def close(self) -> None:
+        self._items.clear()
+        self.memory_bytes = self.spilled_bytes = 0
+        if self._spill_dir is not None:
+            shutil.rmtree(self._spill_dir, ignore_errors=True)
+            self._spill_dir = None
+
+    def __enter__(self) -> "FoldCache":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
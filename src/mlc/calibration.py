@@ -1,11 +1,22 @@
 from __future__ import annotations
+from typing import Any, List
+import numpy as np
+from sklearn.base import BaseEstimator, ClassifierMixin, clone
 from sklearn.calibration import CalibratedClassifierCV, calibration_curve
 
+# край для logit(p): вероятность 0/1 из expit не превращается в ±inf
+_LOGIT_EPS = 1e-12
 
-def calibrate(estimator, method: str, cv_or_holdout=5):
+
+def _check_method(method: str) -> str:
     method = method.lower()
     if method not in {"sigmoid", "isotonic"}:
         raise ValueError("Calibration method must be 'sigmoid' or 'isotonic'")
+    return method
+
+
+def calibrate(estimator, method: str, cv_or_holdout=5):
+    method = _check_method(method)
     # sklearn >= 1.4 uses 'estimator' instead of deprecated 'base_estimator'
     return CalibratedClassifierCV(estimator=estimator, method=method, cv=cv_or_holdout)
 
@@ -13,3 +24,170 @@ def calibrate(estimator, method: str, cv_or_holdout=5):
 def calibration_curves(y_true, proba, n_bins: int = 10):
     frac_pos, mean_pred = calibration_curve(y_true, proba, n_bins=n_bins, strategy="uniform")
     return mean_pred, frac_pos
+
+
+def _uses_decision(estimator) -> bool:
+    # CalibratedClassifierCV берёт decision_function, если он есть, иначе predict_proba
+    return hasattr(estimator, "decision_function")
+
+
+def _response(estimator, X) -> np.ndarray:
+    if _uses_decision(estimator):
+        return np.ravel(estimator.decision_function(X))
+    return estimator.predict_proba(X)[:, 1]
+
+
+def _proba_to_response(estimator, proba: np.ndarray) -> np.ndarray:
+    # для logistic / sgd(log_loss) / hist_gbdt decision_function = logit(P(y=1))
+    if _uses_decision(estimator):
+        p = np.clip(proba, _LOGIT_EPS, 1.0 - _LOGIT_EPS)
+        return np.log(p) - np.log1p(-p)
+    return proba
+
+
+class _Member:
+    """One fitted (estimator, calibrator) pair, laid out like sklearn's calibrated members."""
+
+    def __init__(self, estimator, calibrator, method: str):
+        self.estimator = estimator
+        self.calibrators = [calibrator]
+        self.method = method
+
+    def calibrate(self, scores: np.ndarray) -> np.ndarray:
+        return np.clip(self.calibrators[0].predict(scores), 0.0, 1.0)
+
+    def predict_proba(self, X) -> np.ndarray:
+        p = self.calibrate(_response(self.estimator, X))
+        return np.column_stack([1.0 - p, p])
+
+
+class _SingleMember:
+    # predict_proba / predict для моделей с одним (оценщик, калибратор) в calibrated_classifiers_
+    calibrated_classifiers_: List[Any]  # выставляет fit наследника
+    classes_: np.ndarray
+
+    def predict_proba(self, X) -> np.ndarray:
+        return self.calibrated_classifiers_[0].predict_proba(X)
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[(self.predict_proba(X)[:, 1] >= 0.5).astype(int)]
+
+
+class OOFCalibratedClassifier(_SingleMember, ClassifierMixin, BaseEstimator):
+    """Pipeline fitted once on the full train set + a calibrator fitted on its OOF scores.
+
+    Exposes ``calibrated_classifiers_`` with a single member, so the compiled
+    scorer, the artifact bundle and incremental updates treat it like a
+    ``CalibratedClassifierCV``. With ``prefit=True`` the estimator is already
+    fitted (e.g. out of core) and is used as is.
+    """
+
+    def __init__(self, estimator, method: str = "sigmoid", prefit: bool = False):
+        self.estimator = estimator
+        self.method = method
+        self.prefit = prefit
+
+    def fit(self, X, y, oof):
+        """Fit the calibrator on ``oof`` (``(n_repeats, n_samples)`` P(y=1), NaN = not
+        validated), then refit a clone of ``estimator`` on all of ``X, y`` (``X`` is
+        ignored when ``prefit``)."""
+        from sklearn.isotonic import IsotonicRegression
+
+        method = _check_method(self.method)
+        base = self.estimator if self.prefit else clone(self.estimator).fit(X, y)
+        oof = np.atleast_2d(np.asarray(oof, dtype=float))
+        seen = ~np.isnan(oof)
+        # каждая OOF-оценка — выход одной модели фолда, как и у итоговой модели
+        scores = _proba_to_response(base, oof[seen])
+        y_rep = np.broadcast_to(np.asarray(y), oof.shape)[seen]
+        if method == "sigmoid":
+            from sklearn.calibration import _SigmoidCalibration
+
+            calibrator = _SigmoidCalibration().fit(scores, y_rep)
+        else:
+            calibrator = IsotonicRegression(out_of_bounds="clip").fit(scores, y_rep)
+        self.calibrated_classifiers_ = [_Member(base, calibrator, method)]
+        self.classes_ = base.classes_
+        return self
+
+    def calibrate_proba(self, proba) -> np.ndarray:
+        """Map raw P(y=1) of the base pipeline (e.g. OOF scores) through the calibrator."""
+        member = self.calibrated_classifiers_[0]
+        p = np.asarray(proba, dtype=float)
+        return member.calibrate(_proba_to_response(member.estimator, p.ravel())).reshape(p.shape)
+
+
+class CollapsedClassifier(_SingleMember, ClassifierMixin, BaseEstimator):
+    """One member of a calibrated ensemble + a monotone table from its raw score to
+    the ensemble's probability (see :func:`collapse_calibrated`).
+
+    The table is an isotonic fit evaluated by linear interpolation, so the
+    compiled scorer and the bundle treat it as an isotonic-calibrated model.
+    """
+
+    def __init__(self, member: int = 0):
+        self.member = member
+
+
+def _ece(y, proba, n_bins: int = 10) -> float:
+    bins = np.minimum((np.asarray(proba) * n_bins).astype(int), n_bins - 1)
+    n = np.bincount(bins, minlength=n_bins)
+    gap = np.abs(
+        np.bincount(bins, weights=proba, minlength=n_bins)
+        - np.bincount(bins, weights=np.asarray(y, dtype=float), minlength=n_bins)
+    )
+    return float(gap.sum() / max(n.sum(), 1))
+
+
+def calibration_parity(reference, candidate, y=None, threshold: float = 0.5):
+    """How far ``candidate`` probabilities are from ``reference`` (and, with labels,
+    PR-AUC / Brier / ECE of both)."""
+    from sklearn.metrics import average_precision_score, brier_score_loss
+
+    ref, new = np.asarray(reference, dtype=float), np.asarray(candidate, dtype=float)
+    diff = np.abs(new - ref)
+    out = {
+        "n": int(len(ref)),
+        "abs_diff_mean": float(diff.mean()),
+        "abs_diff_p99": float(np.quantile(diff, 0.99)),
+        "abs_diff_max": float(diff.max()),
+        "label_agreement": float(np.mean((ref >= threshold) == (new >= threshold))),
+    }
+    if y is not None:
+        y = np.asarray(y)
+        for name, p in (("reference", ref), ("collapsed", new)):
+            out[f"pr_auc_{name}"] = float(average_precision_score(y, p))
+            out[f"brier_{name}"] = float(brier_score_loss(y, p))
+            out[f"ece_{name}"] = _ece(y, p)
+    return out
+
+
+def collapse_calibrated(model, X, member=None) -> CollapsedClassifier:
+    """Replace a fitted calibrated ensemble by one member and a score -> probability table.
+
+    ``X`` is reference data (e.g. a sample of training rows): the ensemble is
+    scored once, and for each member an isotonic map from its raw score
+    (``decision_function`` or P(y=1), as in sklearn) to the ensemble probability
+    is fitted. The member with the smallest squared error is kept unless
+    ``member`` picks one. Inference then runs preprocessing and the base model
+    once instead of once per member.
+    """
+    from sklearn.isotonic import IsotonicRegression
+
+    members = model.calibrated_classifiers_
+    target = model.predict_proba(X)[:, 1]
+    candidates = range(len(members)) if member is None else [member]
+    best = None
+    for k in candidates:
+        est = members[k].estimator
+        scores = _response(est, X)
+        table = IsotonicRegression(out_of_bounds="clip", y_min=0.0, y_max=1.0)
+        table.fit(scores, target)
+        err = float(np.mean((table.predict(scores) - target) ** 2))
+        if best is None or err < best[0]:
+            best = (err, k, est, table)
+    _, k, est, table = best
+    out = CollapsedClassifier(member=k)
+    out.calibrated_classifiers_ = [_Member(est, table, "isotonic")]
+    out.classes_ = model.classes_
+    return out
@@ -0,0 +1,699 @@
+"""NumPy-only scoring of fitted artifacts without sklearn dispatch.
+
+:func:`compile_model` flattens a fitted ``CalibratedClassifierCV`` (or a plain
+``Pipeline``) built by this package into arrays: imputation values, scaler
+statistics, one-hot or ordinal-code lookup tables, linear coefficients or
+flattened tree nodes (with routing tables for native categorical splits) and
+calibration maps. :class:`CompiledModel` scores dicts, lists of dicts,
+DataFrames or 2-D arrays with a handful of vectorized NumPy operations, which
+is what matters for single-row latency.
+"""
+
+from __future__ import annotations
+import json
+import os
+from typing import Any, Dict, List, Literal, Mapping, Optional, Sequence, Tuple
+import numpy as np
+
+FORMAT_VERSION = 1
+
+_LINEAR = "linear"
+_TREES = "trees"
+# слоты таблицы категориального сплита: коды 0..254 (max_bins <= 255) и последний — пропуск
+_CAT_SLOTS = 256
+
+
+def _expit(z: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-z))
+
+
+def _is_missing(v: Any) -> bool:
+    return v is None or (isinstance(v, float) and v != v)
+
+
+# ----------------------------------------------------------------------------- compile
+
+
+def _split_pipeline(est) -> Tuple[Any, Any]:
+    from sklearn.compose import ColumnTransformer
+    from sklearn.pipeline import Pipeline
+
+    if not isinstance(est, Pipeline) or len(est.steps) != 2:
+        raise NotImplementedError("Compiled path expects Pipeline([preprocess, model])")
+    pre, model = est.steps[0][1], est.steps[1][1]
+    if not isinstance(pre, ColumnTransformer):
+        raise NotImplementedError("Compiled path expects a ColumnTransformer preprocessor")
+    return pre, model
+
+
+def _split_compact(model) -> Tuple[Any, Any]:
+    # Pipeline([("compact", CompactEncoder), ("model", calibrated)]) из компактного режима
+    from sklearn.pipeline import Pipeline
+
+    if isinstance(model, Pipeline) and model.steps[0][0] == "compact" and len(model.steps) == 2:
+        return model.steps[0][1], model.steps[1][1]
+    return None, model
+
+
+def _ordinal_codes(enc) -> List[Dict[Any, float]]:
+    """Value -> code of every column of a fitted ``OrdinalEncoder`` (infrequent levels included)."""
+    import pandas as pd
+
+    cats = [[v for v in c.tolist() if not _is_missing(v)] for c in enc.categories_]
+    n = max((len(c) for c in cats), default=0)
+    # по колонке свои категории, хвост добит первой: transform сам применяет группировку редких
+    cols = {j: c + [c[0]] * (n - len(c)) if c else [None] * n for j, c in enumerate(cats)}
+    names = getattr(enc, "feature_names_in_", None)
+    frame = pd.DataFrame({names[j] if names is not None else j: v for j, v in cols.items()})
+    codes = enc.transform(frame if names is not None else frame.to_numpy()) if n else None
+    return [{v: float(codes[i, j]) for i, v in enumerate(c)} for j, c in enumerate(cats)]
+
+
+def _scaler_float32_math(sc, mean: np.ndarray, scale: np.ndarray) -> bool:
+    """How a ``StandardScaler`` transforms float32 input: in float32 (``True``, newer
+    scikit-learn) or in float64 with a float32 rounding after each step (``False``)."""
+    rng = np.random.default_rng(0)
+    probe = (rng.standard_normal((512, len(mean))) * 3 * scale + mean).astype(np.float32)
+    ref = sc.transform(probe)
+    f32 = np.float32
+    if np.array_equal((probe - mean.astype(f32)) / scale.astype(f32), ref):
+        return True
+    centered = (probe - mean).astype(f32)
+    if np.array_equal((centered / scale).astype(f32), ref):
+        return False
+    raise NotImplementedError("Cannot reproduce float32 scaling of this scikit-learn version")
+
+
+def _compile_preprocessor(ct, encoder=None) -> Dict[str, Any]:
+    """Numeric (imputer + scaler) and categorical (imputer + one-hot, or ordinal codes for
+    native categorical splits) blocks of one clone.
+
+    With a :class:`~mlc.features.CompactEncoder` in front, matrix column indices are
+    mapped back to column names and category codes back to the original values.
+    """
+    from sklearn.impute import SimpleImputer
+    from sklearn.preprocessing import OneHotEncoder, OrdinalEncoder, StandardScaler
+
+    out: Dict[str, Any] = {"num_cols": [], "cat_cols": [], "cat_offsets": [], "cat_fill": []}
+    width = 0
+    for name, trans, cols in ct.transformers_:
+        if trans == "drop" or name == "remainder":
+            continue
+        steps = dict(trans.steps) if hasattr(trans, "steps") else {}
+        imp = steps.get("imputer")
+        cols = list(cols)
+        decode: List[Any] = [None] * len(cols)
+        if encoder is not None:
+            names = encoder.num_cols_ + encoder.cat_cols_
+            n_num = len(encoder.num_cols_)
+            decode = [encoder.categories_[i - n_num] if i >= n_num else None for i in cols]
+            cols = [names[i] for i in cols]
+        if isinstance(steps.get("scaler"), StandardScaler) and isinstance(imp, SimpleImputer):
+            stats = np.asarray(imp.statistics_, dtype=float)
+            if np.isnan(stats).any():
+                raise NotImplementedError("All-missing numeric columns are not supported")
+            sc = steps["scaler"]
+            out["num_cols"] += cols
+            out["num_fill"] = stats
+            out["num_mean"] = sc.mean_ if sc.with_mean else np.zeros(len(cols))
+            out["num_scale"] = sc.scale_ if sc.with_std else np.ones(len(cols))
+            out["num_start"] = width
+            if encoder is not None:  # float32-вход: арифметика скейлера зависит от версии sklearn
+                out["scale_f32"] = _scaler_float32_math(sc, out["num_mean"], out["num_scale"])
+            width += len(cols)
+        elif isinstance(steps.get("ohe"), OneHotEncoder) and isinstance(imp, SimpleImputer):
+            ohe = steps["ohe"]
+            if ohe.drop_idx_ is not None or getattr(ohe, "infrequent_categories_", None):
+                raise NotImplementedError("OneHotEncoder with drop/infrequent is not supported")
+            out["cat_cols"] += cols
+            for cats, fill, dec in zip(ohe.categories_, imp.statistics_, decode):
+                cats = cats.tolist() if dec is None else [dec[int(c)] for c in cats]
+                fill = fill if dec is None else dec[int(fill)]
+                out["cat_offsets"].append({c: width + i for i, c in enumerate(cats)})
+                out["cat_fill"].append(fill)
+                width += len(cats)
+        elif isinstance(steps.get("ordinal"), OrdinalEncoder) and len(steps) == 1:
+            # нативные категориальные: одна колонка кодов, пропуск и новое значение — NaN
+            out["cat_cols"] += cols
+            out["cat_codes"] = out.get("cat_codes", [])
+            out["cat_pos"] = out.get("cat_pos", [])
+            for codes, dec in zip(_ordinal_codes(steps["ordinal"]), decode):
+                codes = codes if dec is None else {dec[int(v)]: c for v, c in codes.items()}
+                out["cat_codes"].append(codes)
+                out["cat_pos"].append(width)
+                width += 1
+        else:
+            raise NotImplementedError(f"Unsupported transformer in compiled path: {name}")
+    out["width"] = width
+    return out
+
+
+def _bits(bitset: np.ndarray) -> np.ndarray:
+    # битсет sklearn (8 × uint32) -> bool[256]
+    v = np.arange(_CAT_SLOTS)
+    return ((bitset[v // 32] >> (v % 32)) & 1).astype(bool)
+
+
+def _hgb_categorical(model) -> Tuple[np.ndarray, List[np.ndarray], np.ndarray, np.ndarray]:
+    """(column of every internal feature, raw values of the categories sklearn re-encoded,
+    known-category bitsets, feature -> bitset row) of an HGB with ``categorical_features``."""
+    is_cat = np.asarray(model.is_categorical_, dtype=bool)
+    # sklearn сам перекодирует категориальные в 0..k-1 и ставит их в начало матрицы
+    order = np.concatenate([np.flatnonzero(is_cat), np.flatnonzero(~is_cat)])
+    raw = model._preprocessor.named_transformers_["encoder"].categories_
+    known, f_map = model._bin_mapper.make_known_categories_bitsets()
+    return order, [np.asarray(c, dtype=float) for c in raw], known, f_map
+
+
+def _tree_nodes(model) -> List[Dict[str, np.ndarray]]:
+    """Flatten HGB predictors or sklearn trees into (feature, threshold, left, right, ...).
+
+    A native categorical split of HGB becomes a row of ``cat_right``: whether a value
+    with ordinal code ``0..254`` (slot 255 — missing) goes to the right child.
+    """
+    trees = []
+    if hasattr(model, "_predictors"):  # HistGradientBoostingClassifier
+        if model.n_trees_per_iteration_ != 1:
+            raise NotImplementedError("Only binary HistGradientBoosting is supported")
+        order = None
+        if getattr(model, "is_categorical_", None) is not None:
+            order, raw, known, f_map = _hgb_categorical(model)
+        for (pred,) in model._predictors:
+            nd = pred.nodes
+            feature = nd["feature_idx"].astype(np.int64)
+            cat_row = np.full(len(nd), -1, dtype=np.int64)
+            cat_right = np.zeros((0, _CAT_SLOTS), dtype=bool)
+            if nd["is_categorical"].any():
+                if order is None or any(c.max(initial=0) >= _CAT_SLOTS - 1 for c in raw):
+                    raise NotImplementedError("Categorical codes must be below 255")
+                cat_nodes = np.flatnonzero(nd["is_categorical"])
+                cat_row[cat_nodes] = np.arange(len(cat_nodes))
+                cat_right = np.empty((len(cat_nodes), _CAT_SLOTS), dtype=bool)
+                for r, i in enumerate(cat_nodes):
+                    f = feature[i]
+                    # как sklearn: пропуск и неизвестный код идут по missing_go_to_left
+                    miss_right = not nd["missing_go_to_left"][i]
+                    left = _bits(pred.raw_left_cat_bitsets[nd["bitset_idx"][i]])
+                    seen = _bits(known[f_map[f]])
+                    codes = raw[f][~np.isnan(raw[f])]
+                    h = np.arange(len(codes))
+                    cat_right[r] = miss_right
+                    cat_right[r, codes.astype(np.int64)] = ~left[h] & (seen[h] | miss_right)
+            if order is not None:
+                feature = order[feature]
+            trees.append(
+                {
+                    "feature": feature,
+                    "threshold": nd["num_threshold"].astype(float),
+                    "left": nd["left"].astype(np.int64),
+                    "right": nd["right"].astype(np.int64),
+                    "is_leaf": nd["is_leaf"].astype(bool),
+                    "value": nd["value"].astype(float),
+                    "depth": int(nd["depth"].max()),
+                    "cat_row": cat_row,
+                    "cat_right": cat_right,
+                }
+            )
+        return trees
+
+    pos = int(np.flatnonzero(model.classes_ == 1)[0])
+    for est in model.estimators_:
+        t = est.tree_
+        leaf = t.children_left == -1
+        val = t.value[:, 0, :]
+        val = val[:, pos] / np.where(val.sum(axis=1) > 0, val.sum(axis=1), 1.0)
+        trees.append(
+            {
+                "feature": np.where(leaf, 0, t.feature).astype(np.int64),
+                "threshold": t.threshold.astype(float),
+                "left": t.children_left.astype(np.int64),
+                "right": t.children_right.astype(np.int64),
+                "is_leaf": leaf,
+                "value": val.astype(float),
+                "depth": int(t.max_depth),
+            }
+        )
+    return trees
+
+
+def _response(model) -> Tuple[str, str]:
+    """(kind, how the raw score turns into P(y=1) without calibration)."""
+    if hasattr(model, "coef_") and hasattr(model, "decision_function"):
+        return _LINEAR, "expit"
+    if hasattr(model, "_predictors"):
+        return _TREES, "expit"
+    if hasattr(model, "estimators_") and hasattr(model.estimators_[0], "tree_"):
+        return _TREES, "identity"
+    raise NotImplementedError(f"Unsupported model in compiled path: {type(model).__name__}")
+
+
+def _unwrap_sampling(model) -> Tuple[Any, float]:
+    # DownsampledClassifier: внутренняя модель + сдвиг log-odds к исходному приору
+    if hasattr(model, "estimator_") and hasattr(model, "negative_rate"):
+        return model.estimator_, model.offset_
+    return model, 0.0
+
+
+def _clones(model) -> List[Tuple[Any, Optional[Any], Optional[str]]]:
+    """(pipeline, calibrator, method) for every member of the calibrated ensemble."""
+    if hasattr(model, "calibrated_classifiers_"):
+        out = []
+        for cc in model.calibrated_classifiers_:
+            if len(cc.calibrators) != 1:
+                raise NotImplementedError("Only binary calibrated models are supported")
+            out.append((cc.estimator, cc.calibrators[0], cc.method))
+        return out
+    return [(model, None, None)]
+
+
+def compile_model(model, threshold: float = 0.5) -> "CompiledModel":
+    """Flatten a fitted calibrated pipeline into a :class:`CompiledModel`."""
+    encoder, model = _split_compact(model)
+    clones = _clones(model)
+    pres, ests = zip(*(_split_pipeline(est) for est, _, _ in clones))
+    ests, offsets = zip(*(_unwrap_sampling(m) for m in ests))
+    pp = [_compile_preprocessor(p, encoder) for p in pres]
+    kinds = {_response(m) for m in ests}
+    methods = {method for _, _, method in clones}
+    if len(kinds) != 1 or len(methods) != 1:
+        raise NotImplementedError("All ensemble members must share model type and calibration")
+    (kind, link), (method,) = kinds.pop(), methods
+    num_cols, cat_cols = pp[0]["num_cols"], pp[0]["cat_cols"]
+    if any(p["num_cols"] != num_cols or p["cat_cols"] != cat_cols for p in pp):
+        raise NotImplementedError("Ensemble members were fitted on different columns")
+
+    encodings = {"cat_codes" in p for p in pp}
+    if len(encodings) != 1:
+        raise NotImplementedError("Ensemble members mix one-hot and native categoricals")
+    native = encodings.pop()
+    if native and kind == _LINEAR:
+        raise NotImplementedError("Ordinal-coded categoricals need a tree model")
+    cat_key = "cat_codes" if native else "cat_offsets"
+
+    K, n_num, n_cat = len(clones), len(num_cols), len(cat_cols)
+    width = max(p["width"] for p in pp)
+
+    # общий словарь категорий по всем клонам: значение -> индекс u
+    vocab: List[List[Any]] = []
+    for c in range(n_cat):
+        seen: Dict[Any, None] = {}
+        for p in pp:
+            seen.update(dict.fromkeys(p[cat_key][c]))
+        vocab.append(list(seen))
+    vocab_start = np.concatenate(([0], np.cumsum([len(v) for v in vocab]))).astype(np.int64)
+    n_vocab = int(vocab_start[-1])
+
+    arrays: Dict[str, np.ndarray] = {"vocab_start": vocab_start}
+    zeros = np.zeros((K, n_num))
+    arrays["num_fill"] = np.vstack([p.get("num_fill", zeros[0]) for p in pp]) if n_num else zeros
+    arrays["num_mean"] = np.vstack([p.get("num_mean", zeros[0]) for p in pp]) if n_num else zeros
+    arrays["num_scale"] = np.vstack([p.get("num_scale", zeros[0]) for p in pp]) if n_num else zeros
+    # колонка one-hot для (клон, категория); последний слот — «неизвестная» (-1)
+    cat_col = np.full((K, n_vocab + 1), -1, dtype=np.int64)
+    cat_fill = np.zeros((K, n_cat), dtype=np.int64)
+    if native:
+        # код (клон, категория) в колонке cat_pos признака; неизвестная — NaN, как у OrdinalEncoder
+        cat_code = np.full((K, n_vocab + 1), np.nan)
+        for k, p in enumerate(pp):
+            for c in range(n_cat):
+                for u, val in enumerate(vocab[c]):
+                    cat_code[k, vocab_start[c] + u] = p["cat_codes"][c].get(val, np.nan)
+        arrays["cat_code"] = cat_code
+        arrays["cat_pos"] = np.array([p["cat_pos"] for p in pp], dtype=np.int64).reshape(K, n_cat)
+    else:
+        for k, p in enumerate(pp):
+            for c in range(n_cat):
+                for u, val in enumerate(vocab[c]):
+                    cat_col[k, vocab_start[c] + u] = p["cat_offsets"][c].get(val, -1)
+                cat_fill[k, c] = vocab[c].index(p["cat_fill"][c])
+    arrays["cat_col"], arrays["cat_fill"] = cat_col, cat_fill
+    num_start = np.array([p.get("num_start", 0) for p in pp], dtype=np.int64)
+    arrays["num_start"] = num_start
+
+    meta: Dict[str, Any] = {
+        "format_version": FORMAT_VERSION,
+        "kind": kind,
+        "threshold": float(threshold),
+        "num_cols": list(num_cols),
+        "cat_cols": list(cat_cols),
+        "vocab": vocab,
+        "width": int(width),
+        "n_clones": K,
+        "map": method or link,
+        "num_float32": encoder is not None,  # компактный режим: числа приходят во float32
+        "scale_f32": any(p.get("scale_f32", False) for p in pp),
+    }
+
+    if kind == _LINEAR:
+        # масштабирование и one-hot сворачиваются в веса: z = x_imp·w + b + Σ w_cat[u]
+        w_num = np.zeros((K, n_num))
+        b = np.zeros(K)
+        cat_w = np.zeros((K, n_vocab + 1))
+        for k, m in enumerate(ests):
+            coef = np.asarray(m.coef_, dtype=float).ravel()
+            s = int(num_start[k])
+            w = coef[s : s + n_num] / arrays["num_scale"][k]
+            w_num[k] = w
+            b[k] = float(np.ravel(m.intercept_)[0]) - float(w @ arrays["num_mean"][k]) + offsets[k]
+            known = cat_col[k] >= 0
+            cat_w[k, known] = coef[cat_col[k, known]]
+        # вклад пропусков: медиана / мода клона, умноженная на вес клона
+        w_fill = w_num * arrays["num_fill"]
+        cat_w_fill = np.take_along_axis(cat_w, cat_fill + vocab_start[:-1], axis=1)
+        arrays.update(w_num=w_num, w_fill=w_fill, intercept=b, cat_w=cat_w, cat_w_fill=cat_w_fill)
+    else:
+        trees_per_clone = [_tree_nodes(m) for m in ests]
+        children, thr, feat, value, roots, tree_clone = [], [], [], [], [], []
+        cat_row, cat_right = [], []
+        offset = depth = n_cat_splits = 0
+        for k, trees in enumerate(trees_per_clone):
+            for t in trees:
+                n = len(t["feature"])
+                idx = np.arange(n) + offset
+                # листья ссылаются сами на себя — обход идёт фиксированное число шагов;
+                # пара (left, right) лежит рядом: следующий узел = children[2*idx + (x > thr)]
+                pair = np.empty((n, 2), dtype=np.int64)
+                pair[:, 0] = np.where(t["is_leaf"], idx, t["left"] + offset)
+                pair[:, 1] = np.where(t["is_leaf"], idx, t["right"] + offset)
+                children.append(pair.ravel())
+                # индекс признака в плоском векторе (клон, признак) — один gather на уровень
+                feat.append(k * width + t["feature"])
+                thr.append(t["threshold"])
+                value.append(t["value"])
+                if "cat_row" in t:
+                    rows = t["cat_row"]
+                    cat_row.append(np.where(rows >= 0, rows + n_cat_splits, -1))
+                    cat_right.append(t["cat_right"])
+                    n_cat_splits += len(t["cat_right"])
+                roots.append(offset)
+                tree_clone.append(k)
+                offset += n
+                depth = max(depth, int(t["depth"]))
+        # пропуски на входе деревьев — только коды нативных категориальных (NaN -> слот 255):
+        # числовые признаки импутированы, one-hot — 0/1
+        if n_cat_splits:
+            arrays["node_cat_row"] = np.concatenate(cat_row)
+            arrays["cat_right"] = np.concatenate(cat_right)
+        arrays["node_children"] = np.concatenate(children)
+        arrays["node_flat_feature"] = np.concatenate(feat)
+        arrays["node_threshold"] = np.concatenate(thr)
+        arrays["node_value"] = np.concatenate(value)
+        arrays["roots"] = np.asarray(roots, dtype=np.int64)
+        n_trees = np.bincount(np.asarray(tree_clone, dtype=np.int64), minlength=K)
+        arrays["clone_n_trees"] = n_trees.astype(np.int64)
+        arrays["clone_tree_start"] = np.concatenate(([0], np.cumsum(n_trees)[:-1])).astype(np.int64)
+        if not native:
+            cat_fill_col = np.take_along_axis(cat_col, cat_fill + vocab_start[:-1], axis=1)
+            arrays["cat_fill_col"] = cat_fill_col
+        if link == "expit":  # HGB: сумма листьев + baseline
+            baseline = [float(np.ravel(m._baseline_prediction)[0]) for m in ests]
+            arrays["baseline"] = np.array(baseline) + np.array(offsets)
+        elif any(offsets):  # лес: шансы средней вероятности × negative_rate
+            arrays["odds_scale"] = np.exp(np.array(offsets))
+        meta["depth"] = int(depth)
+        meta["tree_agg"] = "sum" if link == "expit" else "mean"
+        meta["x_float32"] = link == "identity"  # деревья sklearn сравнивают признаки во float32
+
+    if method == "sigmoid":
+        arrays["sig_a"] = np.array([cal.a_ for _, cal, _ in clones], dtype=float)
+        arrays["sig_b"] = np.array([cal.b_ for _, cal, _ in clones], dtype=float)
+    elif method == "isotonic":
+        xs = [np.asarray(cal.X_thresholds_, dtype=float) for _, cal, _ in clones]
+        ys = [np.asarray(cal.y_thresholds_, dtype=float) for _, cal, _ in clones]
+        arrays["iso_start"] = np.concatenate(([0], np.cumsum([len(x) for x in xs]))).astype(
+            np.int64
+        )
+        arrays["iso_x"], arrays["iso_y"] = np.concatenate(xs), np.concatenate(ys)
+    elif method is not None:
+        raise NotImplementedError(f"Unsupported calibration method: {method}")
+
+    return CompiledModel(meta, arrays)
+
+
+# ----------------------------------------------------------------------------- score
+
+
+class CompiledModel:
+    """Flat, sklearn-free representation of a fitted (calibrated) pipeline."""
+
+    # массивы ``arrays`` доступны как ``self._<name>``; часть есть только у своего вида модели
+    _vocab_start: np.ndarray
+    _num_fill: np.ndarray
+    _num_mean: np.ndarray
+    _num_scale: np.ndarray
+    _num_start: np.ndarray
+    _cat_col: np.ndarray
+    _cat_fill: np.ndarray
+    _cat_code: np.ndarray  # нативные категориальные
+    _cat_pos: np.ndarray
+    _w_num: np.ndarray  # линейные
+    _w_fill: np.ndarray
+    _intercept: np.ndarray
+    _cat_w: np.ndarray
+    _cat_w_fill: np.ndarray
+    _node_children: np.ndarray  # деревья
+    _node_flat_feature: np.ndarray
+    _node_threshold: np.ndarray
+    _node_value: np.ndarray
+    _node_cat_row: np.ndarray
+    _cat_right: np.ndarray
+    _cat_fill_col: np.ndarray
+    _roots: np.ndarray
+    _clone_n_trees: np.ndarray
+    _clone_tree_start: np.ndarray
+    _baseline: np.ndarray
+    _odds_scale: np.ndarray
+    _sig_a: np.ndarray  # калибровка
+    _sig_b: np.ndarray
+    _iso_start: np.ndarray
+    _iso_x: np.ndarray
+    _iso_y: np.ndarray
+
+    def __init__(self, meta: Dict[str, Any], arrays: Mapping[str, np.ndarray]):
+        self.meta = meta
+        self.arrays = dict(arrays)
+        self.threshold = float(meta["threshold"])
+        self.num_cols: List[str] = list(meta["num_cols"])
+        self.cat_cols: List[str] = list(meta["cat_cols"])
+        self.columns = self.num_cols + self.cat_cols
+        self._lookup = [{v: u for u, v in enumerate(voc)} for voc in meta["vocab"]]
+        for k, v in self.arrays.items():
+            setattr(self, f"_{k}", v)
+        self._n_vocab = int(self._vocab_start[-1])
+        self._k = np.arange(int(meta["n_clones"]))
+
+    # -- input encoding -------------------------------------------------------
+    def _encode_cat(self, values: Sequence[Any], c: int) -> np.ndarray:
+        # -1 — неизвестная категория, -2 — пропуск (заполняется модой клона)
+        lut = self._lookup[c]
+        return np.fromiter(
+            (-2 if _is_missing(v) else lut.get(v, -1) for v in values),
+            dtype=np.int64,
+            count=len(values),
+        )
+
+    def _encode(self, X) -> Tuple[np.ndarray, np.ndarray]:
+        """Raw numeric block (n, n_num) with NaN and category ids (n, n_cat)."""
+        x_num: np.ndarray
+        if isinstance(X, Mapping):  # одна строка — самый частый случай для онлайна
+            x_num = np.fromiter(
+                (np.nan if (v := X.get(c)) is None else v for c in self.num_cols),
+                dtype=float,
+                count=len(self.num_cols),
+            ).reshape(1, -1)
+            ids = [
+                -2 if _is_missing(v := X.get(col)) else lut.get(v, -1)
+                for col, lut in zip(self.cat_cols, self._lookup)
+            ]
+            return x_num, np.array(ids, dtype=np.int64).reshape(1, len(ids))
+        if isinstance(X, list):
+            x_num = np.array(
+                [[r.get(c, np.nan) for c in self.num_cols] for r in X], dtype=float
+            ).reshape(len(X), len(self.num_cols))
+            u = np.empty((len(X), len(self.cat_cols)), dtype=np.int64)
+            for c, col in enumerate(self.cat_cols):
+                u[:, c] = self._encode_cat([r.get(col) for r in X], c)
+            return x_num, u
+        if hasattr(X, "columns"):  # DataFrame
+            x_num = X[self.num_cols].to_numpy(dtype=float)
+            u = np.empty((len(X), len(self.cat_cols)), dtype=np.int64)
+            for c, col in enumerate(self.cat_cols):
+                u[:, c] = self._encode_cat(X[col].tolist(), c)
+            return x_num, u
+        arr = np.asarray(X, dtype=object if self.cat_cols else float)
+        arr = arr.reshape(-1, len(self.columns))
+        n_num = len(self.num_cols)
+        x_num = arr[:, :n_num].astype(float)
+        u = np.empty((len(arr), len(self.cat_cols)), dtype=np.int64)
+        for c in range(len(self.cat_cols)):
+            u[:, c] = self._encode_cat(arr[:, n_num + c].tolist(), c)
+        return x_num, u
+
+    def _slots(self, u: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        # глобальный слот словаря (неизвестные и пропуски -> нулевой слот) и маска пропусков
+        return np.where(u >= 0, u + self._vocab_start[:-1], self._n_vocab), u == -2
+
+    # -- model scores (K, n) --------------------------------------------------
+    def _linear_scores(self, x_num: np.ndarray, u: np.ndarray) -> np.ndarray:
+        nan = np.isnan(x_num)
+        if nan.any():
+            z = self._w_num @ np.where(nan, 0.0, x_num).T + self._w_fill @ nan.T
+        else:
+            z = self._w_num @ x_num.T
+        z += self._intercept[:, None]
+        if u.shape[1]:
+            slot, miss = self._slots(u)
+            z += self._cat_w[:, slot].sum(axis=2)
+            if miss.any():
+                z += self._cat_w_fill @ miss.T
+        return z
+
+    def _tree_scores(self, x_num: np.ndarray, u: np.ndarray) -> np.ndarray:
+        n, K, width = len(x_num), len(self._k), int(self.meta["width"])
+        nan = np.isnan(x_num)
+        x = np.where(nan[None], self._num_fill[:, None, :], x_num[None]) if nan.any() else x_num
+        if self.meta.get("num_float32"):
+            # как sklearn на float32-входе (иначе значения ровно на пороге сплита уходят в
+            # другую ветку): новые версии считают во float32, старые — во float64 с округлением
+            f32 = np.float32
+            x = x.astype(f32)
+            if self.meta.get("scale_f32"):
+                mean, scale = self._num_mean.astype(f32), self._num_scale.astype(f32)
+                scaled = ((x - mean[:, None]) / scale[:, None]).astype(float)
+            else:
+                centered = (x - self._num_mean[:, None]).astype(f32)
+                scaled = (centered / self._num_scale[:, None]).astype(f32).astype(float)
+        else:
+            scaled = (x - self._num_mean[:, None]) / self._num_scale[:, None]  # (K, n, n_num)
+        Xt = np.zeros((n, K, width))
+        if self._num_start.any():
+            cols = self._num_start[:, None] + np.arange(x_num.shape[1])[None, :]
+            Xt[:, self._k[:, None], cols] = scaled.transpose(1, 0, 2)
+        else:
+            Xt[:, :, : x_num.shape[1]] = scaled.transpose(1, 0, 2)
+        flat = Xt.reshape(-1)
+        if u.shape[1] and "cat_code" in self.arrays:
+            slot, miss = self._slots(u)
+            code = self._cat_code[:, slot]  # (K, n, n_cat); пропуск — NaN, как у OrdinalEncoder
+            if miss.any():
+                code = np.where(miss[None], np.nan, code)
+            pos = (np.arange(n)[None, :, None] * K + self._k[:, None, None]) * width
+            flat[pos + self._cat_pos[:, None, :]] = code
+        elif u.shape[1]:
+            slot, miss = self._slots(u)
+            col = self._cat_col[:, slot]  # (K, n, n_cat)
+            if miss.any():
+                col = np.where(miss[None], self._cat_fill_col[:, None, :], col)
+            pos = (np.arange(n)[None, :, None] * K + self._k[:, None, None]) * width + col
+            flat[pos[col >= 0]] = 1.0
+        if self.meta.get("x_float32"):
+            flat = flat.astype(np.float32).astype(float)
+
+        children, feat, thr = self._node_children, self._node_flat_feature, self._node_threshold
+        step = self._cat_step if "cat_right" in self.arrays else None
+        if n == 1:
+            idx = self._roots
+            for _ in range(int(self.meta["depth"])):
+                x = flat[feat[idx]]
+                right = x > thr[idx] if step is None else step(idx, x)
+                idx = children[2 * idx + right]
+            leaf = self._node_value[idx][:, None]
+        else:
+            row = (np.arange(n) * K * width)[None, :]
+            idx = np.broadcast_to(self._roots[:, None], (len(self._roots), n))
+            for _ in range(int(self.meta["depth"])):
+                x = flat[row + feat[idx]]
+                right = x > thr[idx] if step is None else step(idx, x)
+                idx = children[2 * idx + right]
+            leaf = self._node_value[idx]  # (T, n)
+        per_clone = np.add.reduceat(leaf, self._clone_tree_start, axis=0)
+        if self.meta["tree_agg"] == "sum":
+            return per_clone + self._baseline[:, None]
+        p = per_clone / self._clone_n_trees[:, None]
+        if "odds_scale" in self.arrays:
+            r = self._odds_scale[:, None]
+            p = r * p / (r * p + 1.0 - p)
+        return p
+
+    def _cat_step(self, idx: np.ndarray, x: np.ndarray) -> np.ndarray:
+        # шаг вправо: порог для числовых узлов, таблица cat_right для категориальных
+        right = x > self._node_threshold[idx]
+        r = self._node_cat_row[idx]
+        cat = r >= 0
+        if cat.any():
+            code = x[cat]
+            slot = np.where(np.isnan(code), _CAT_SLOTS - 1, code).astype(np.int64)
+            right[cat] = self._cat_right[r[cat], slot]
+        return right
+
+    def _calibrate(self, s: np.ndarray) -> np.ndarray:
+        kind = self.meta["map"]
+        if kind == "sigmoid":
+            return 1.0 / (1.0 + np.exp(self._sig_a[:, None] * s + self._sig_b[:, None]))
+        if kind == "isotonic":
+            st = self._iso_start
+            return np.vstack(
+                [
+                    np.interp(s[k], self._iso_x[st[k] : st[k + 1]], self._iso_y[st[k] : st[k + 1]])
+                    for k in self._k
+                ]
+            )
+        if kind == "expit":
+            return _expit(s)
+        return s
+
+    @property
+    def input_key(self) -> str:
+        """Fingerprint of the input encoding: models with equal keys can share :meth:`encode`."""
+        import hashlib
+
+        f32 = bool(self.meta.get("num_float32"))
+        spec = [self.num_cols, self.cat_cols, self.meta["vocab"], f32]
+        return hashlib.sha256(json.dumps(spec, default=repr).encode()).hexdigest()
+
+    def encode(self, X) -> Tuple[np.ndarray, np.ndarray]:
+        """Numeric block and category ids of ``X`` as consumed by :meth:`predict_encoded`."""
+        x_num, u = self._encode(X)
+        if self.meta.get("num_float32"):
+            x_num = x_num.astype(np.float32).astype(float)
+        return x_num, u
+
+    def predict_proba(self, X) -> np.ndarray:
+        """P(y=1) for a dict, list of dicts, DataFrame or 2-D array (``self.columns`` order)."""
+        return self.predict_encoded(*self.encode(X))
+
+    def predict_encoded(self, x_num: np.ndarray, u: np.ndarray) -> np.ndarray:
+        """P(y=1) from the output of :meth:`encode`."""
+        if self.meta["kind"] == _LINEAR:
+            s = self._linear_scores(x_num, u)
+        else:
+            s = self._tree_scores(x_num, u)
+        # калибраторы не выходят за [0, 1] больше чем на ошибку округления
+        return np.minimum(self._calibrate(s).mean(axis=0), 1.0)
+
+    def predict(self, X) -> Tuple[np.ndarray, np.ndarray]:
+        proba = self.predict_proba(X)
+        return proba, (proba >= self.threshold).astype(int)
+
+    # -- persistence ----------------------------------------------------------
+    def save(self, path: str) -> None:
+        """Write ``compiled.json`` plus one ``.npy`` per array into directory ``path``."""
+        os.makedirs(path, exist_ok=True)
+        for name, arr in self.arrays.items():
+            np.save(os.path.join(path, f"{name}.npy"), np.ascontiguousarray(arr))
+        meta = {**self.meta, "arrays": sorted(self.arrays)}
+        with open(os.path.join(path, "compiled.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "CompiledModel":
+        with open(os.path.join(path, "compiled.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported compiled format: {meta.get('format_version')}")
+        mode: Optional[Literal["r"]] = "r" if mmap else None
+        arrays = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode)
+            for name in meta.pop("arrays")
+        }
+        return cls(meta, arrays)
@@ -1,15 +1,15 @@
 from __future__ import annotations
 import dataclasses as dc
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, TypedDict
+from typing import Any, Dict, List, Optional, TypedDict, Union
 import pathlib as _p
-import yaml
 
 
 class ModelSpec(TypedDict, total=False):
     name: str
-    type: str  # "logistic" | "hist_gbdt" | "rf"
+    type: str  # "logistic" | "sgd" | "hist_gbdt" | "rf"
     params: Dict[str, Any]
+    native_categorical: bool  # hist_gbdt: ordinal-коды + categorical_features вместо one-hot
 
 
 @dataclass
@@ -21,14 +21,19 @@ class CVConfig:
 
 @dataclass
 class ValidationConfig:
-    cv: CVConfig = CVConfig()
+    cv: CVConfig = dc.field(default_factory=CVConfig)
+    selection: str = "exhaustive"  # или "racing": отстающие модели снимаются по ходу CV
+    race_z: float = 2.0  # ширина верхней границы разрыва PR-AUC с лидером (в стандартных ошибках)
+    race_min_folds: int = 3  # раньше этого числа фолдов никого не снимаем
 
 
 @dataclass
 class DataConfig:
-    kind: str = "synthetic"  # or "csv"
-    path: Optional[str] = None
+    kind: str = "synthetic"  # or "csv" | "parquet" | "arrow"
+    path: Optional[Union[str, List[str]]] = None  # файл, каталог, glob или список файлов
     target: str = "target"
+    columns: Optional[List[str]] = None  # читать только эти признаки (target — всегда)
+    float32: bool = True  # parquet/arrow: числовые признаки читаются как float32
     test_size: float = 0.2
     n_samples: int = 5000
     n_features: int = 20
@@ -38,11 +43,22 @@ class DataConfig:
     n_classes: int = 2
     weights: Optional[List[float]] = dc.field(default_factory=lambda: [0.95, 0.05])
     n_clusters_per_class: int = 2
+    chunk_rows: int = 100_000  # synthetic: строк в независимом блоке генератора
+    n_high_card: int = 0  # synthetic: высококардинальные категориальные hc00, hc01, ...
+    high_card_levels: int = 1000  # synthetic: уровней в каждой (частоты по Ципфу)
+    missing_rate: float = 0.0  # synthetic: доля пропусков (MCAR) в каждом признаке
+
+
+@dataclass
+class SamplingConfig:
+    negative_rate: float = 1.0  # доля отрицательных в каждом фите (все положительные остаются)
+    correction: str = "offset"  # "offset": logit + log(rate); "weight": вес 1/rate у отрицательных
 
 
 @dataclass
 class CalibrationConfig:
     method: str = "sigmoid"  # or "isotonic"
+    source: str = "cv"  # "cv": CalibratedClassifierCV(cv=5); "oof": калибратор по OOF + один фит
 
 
 @dataclass
@@ -61,6 +77,36 @@ class PathsConfig:
     artifacts_dir: str = "artifacts"
 
 
+@dataclass
+class RuntimeConfig:
+    n_jobs: int = 1  # процессы для (model, repeat, fold) фитов; -1 = все ядра
+    max_memory_mb: Optional[float] = None  # бюджет памяти на все воркеры
+    fold_cache_mb: Optional[float] = 1024.0  # общий препроцессинг фолдов в RAM, остальное — memmap
+    spill_dir: Optional[str] = None  # куда сбрасывать кэш фолдов (по умолчанию tmp)
+    compact: bool = False  # признаки один раз -> float32-матрица, one-hot — float32 CSR
+    profile: bool = True  # wall/CPU/peak RSS по стадиям и фолдам -> artifacts/profile.json
+    profile_hook: Optional[str] = None  # "cprofile" | "tracemalloc" для стадии profile_stage
+    profile_stage: Optional[str] = None  # например "oof_cv", "calibration", "bootstrap"
+
+
+@dataclass
+class IncrementalConfig:
+    reservoir: bool = False  # сохранять reservoir.pkl: hold-out строки, которых модели не видели
+    reservoir_size: int = 20000  # размер резервуара (равномерная выборка) для калибровки и порога
+    holdout_fraction: float = 0.2  # доля дельты, отложенная от дообучения под калибровку и порог
+    extra_trees: int = 50  # rf: сколько деревьев добавить на дельте
+    extra_iter: int = 20  # hist_gbdt: сколько итераций бустинга добавить
+
+
+@dataclass
+class StreamingConfig:
+    enabled: bool = False  # обучение по чанкам data.path, когда данные не помещаются в RAM
+    chunksize: int = 100_000  # строк в чанке: от него зависит пик памяти
+    epochs: int = 5  # проходов partial_fit по данным
+    sketch_k: int = 2048  # ёмкость уровня скетча квантилей (медианы импутера)
+    n_bins: int = 65536  # разрешение гистограмм скоров для OOF / hold-out метрик
+
+
 @dataclass
 class Config:
     random_state: int
@@ -71,6 +117,10 @@ class Config:
     cost: CostConfig
     reports: ReportsConfig
     paths: PathsConfig
+    runtime: RuntimeConfig = dc.field(default_factory=RuntimeConfig)
+    incremental: IncrementalConfig = dc.field(default_factory=IncrementalConfig)
+    streaming: StreamingConfig = dc.field(default_factory=StreamingConfig)
+    sampling: SamplingConfig = dc.field(default_factory=SamplingConfig)
 
 
 _SCHEMA_REQUIRED = {
@@ -94,6 +144,8 @@ def _validate_schema(d: Dict[str, Any]) -> None:
 
 
 def load_config(path: str | _p.Path) -> Config:
+    import yaml
+
     p = _p.Path(path)
     with p.open("r", encoding="utf-8") as f:
         raw = yaml.safe_load(f)
@@ -105,11 +157,18 @@ def load_config(path: str | _p.Path) -> Config:
     cfg = Config(
         random_state=int(raw.get("random_state", 42)),
         data=_dc_load(DataConfig, raw["data"]),
-        validation=ValidationConfig(cv=_dc_load(CVConfig, raw["validation"].get("cv", {}))),
+        validation=ValidationConfig(
+            cv=_dc_load(CVConfig, raw["validation"].get("cv", {})),
+            **{k: v for k, v in raw["validation"].items() if k != "cv"},
+        ),
         models=raw["models"],
         calibration=_dc_load(CalibrationConfig, raw["calibration"]),
         cost=_dc_load(CostConfig, raw["cost"]),
         reports=_dc_load(ReportsConfig, raw["reports"]),
         paths=_dc_load(PathsConfig, raw["paths"]),
+        runtime=_dc_load(RuntimeConfig, raw.get("runtime", {})),
+        incremental=_dc_load(IncrementalConfig, raw.get("incremental", {})),
+        streaming=_dc_load(StreamingConfig, raw.get("streaming", {})),
+        sampling=_dc_load(SamplingConfig, raw.get("sampling", {})),
     )
     return cfg
@@ -1,24 +1,81 @@
 from __future__ import annotations
-from typing import Tuple
+from typing import Sequence, Tuple
 import numpy as np
 import pandas as pd
 
+# сколько ячеек (сценарии × пороги) считаем за один блок в cost_sweep
+_SWEEP_BLOCK_CELLS = 4_000_000
+
+
+def _cumulative_counts(y_true, proba) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Sort scores once; return sorted scores and prefix counts of positives/negatives."""
+    y = np.asarray(y_true).astype(int)
+    p = np.asarray(proba, dtype=float)
+    order = np.argsort(p, kind="mergesort")
+    p_sorted = p[order]
+    pos = np.concatenate(([0], np.cumsum(y[order] == 1)))
+    neg = np.concatenate(([0], np.cumsum(y[order] == 0)))
+    return p_sorted, pos, neg
+
+
+def _counts_at(p_sorted, pos, neg, thresholds) -> Tuple[np.ndarray, np.ndarray]:
+    # число объектов с proba < thr -> они предсказаны как 0
+    k = np.searchsorted(p_sorted, thresholds, side="left")
+    fn = pos[k]
+    fp = neg[-1] - neg[k]
+    return fp, fn
+
+
+def _breakpoints(p_sorted: np.ndarray) -> np.ndarray:
+    # все различные скоры + порог выше максимума ("всё в класс 0")
+    uniq = np.unique(p_sorted)
+    top = np.nextafter(uniq[-1], np.inf) if uniq.size else 1.0
+    return np.append(uniq, top)
+
 
 def expected_cost(
     y_true, proba, c_fn: float, c_fp: float, thresholds: np.ndarray
 ) -> Tuple[float, pd.DataFrame]:
-    y = np.asarray(y_true).astype(int)
-    costs = []
-    for thr in thresholds:
-        y_hat = (proba >= thr).astype(int)
-        fp = int(((y == 0) & (y_hat == 1)).sum())
-        fn = int(((y == 1) & (y_hat == 0)).sum())
-        cost = c_fn * fn + c_fp * fp
-        costs.append((thr, cost, fp, fn))
-    df = (
-        pd.DataFrame(costs, columns=["threshold", "cost", "fp", "fn"])
-        .sort_values("threshold")
-        .reset_index(drop=True)
-    )
+    p_sorted, pos, neg = _cumulative_counts(y_true, proba)
+    thr = np.sort(np.asarray(thresholds, dtype=float))
+    fp, fn = _counts_at(p_sorted, pos, neg, thr)
+    cost = c_fn * fn + c_fp * fp
+    df = pd.DataFrame({"threshold": thr, "cost": cost, "fp": fp, "fn": fn})
     best_row = df.loc[df["cost"].idxmin()]
     return float(best_row["threshold"]), df
+
+
+def optimal_threshold(y_true, proba, c_fn: float, c_fp: float) -> Tuple[float, float]:
+    """Exact cost-optimal cut over all distinct score breakpoints: (threshold, cost)."""
+    p_sorted, pos, neg = _cumulative_counts(y_true, proba)
+    thr = _breakpoints(p_sorted)
+    fp, fn = _counts_at(p_sorted, pos, neg, thr)
+    cost = c_fn * fn + c_fp * fp
+    i = int(np.argmin(cost))
+    return float(thr[i]), float(cost[i])
+
+
+def cost_sweep(y_true, proba, scenarios: Sequence[Tuple[float, float]]) -> pd.DataFrame:
+    """Exact optimal threshold for each (c_fn, c_fp) scenario from a single sort."""
+    c = np.asarray(scenarios, dtype=float).reshape(-1, 2)
+    p_sorted, pos, neg = _cumulative_counts(y_true, proba)
+    thr = _breakpoints(p_sorted)
+    fp, fn = _counts_at(p_sorted, pos, neg, thr)
+
+    best = np.empty(len(c), dtype=int)
+    block = max(1, _SWEEP_BLOCK_CELLS // len(thr))
+    for start in range(0, len(c), block):
+        cb = c[start : start + block]
+        cost = cb[:, :1] * fn[None, :] + cb[:, 1:] * fp[None, :]
+        best[start : start + block] = np.argmin(cost, axis=1)
+
+    return pd.DataFrame(
+        {
+            "c_fn": c[:, 0],
+            "c_fp": c[:, 1],
+            "threshold": thr[best],
+            "cost": c[:, 0] * fn[best] + c[:, 1] * fp[best],
+            "fp": fp[best],
+            "fn": fn[best],
+        }
+    )
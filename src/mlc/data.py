@@ -1,54 +1,239 @@
 from __future__ import annotations
+import glob
 import os
-from typing import Tuple
+from typing import Any, Iterator, List, Optional, Sequence, Tuple, Union
 import pandas as pd
-from sklearn.datasets import make_classification
-from sklearn.model_selection import train_test_split
 from .config import Config
 from .logging import setup_logging
 
 logger = setup_logging(name="mlc.data")
 
+# data.kind -> формат pyarrow.dataset и расширение файла hold-out
+COLUMNAR_FORMATS = {"parquet": ("parquet", ".parquet"), "arrow": ("ipc", ".arrow")}
+
+PathLike = Union[str, Sequence[str]]
+
+
+def columnar_kind(path: str) -> Optional[str]:
+    """``"parquet"``/``"arrow"`` by file extension (directories are read as Parquet)."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".parquet", ".pq") or os.path.isdir(path):
+        return "parquet"
+    if ext in (".arrow", ".feather", ".ipc"):
+        return "arrow"
+    return None
+
+
+def _csv_files(path: PathLike) -> List[str]:
+    # CSV: файл, список файлов, glob или каталог с *.csv (шарды write_shards)
+    if not isinstance(path, str):
+        return list(path)
+    if os.path.isdir(path):
+        path = os.path.join(path, "*.csv")
+    if not glob.has_magic(path):
+        return [path]
+    files = sorted(glob.glob(path))
+    if not files:
+        raise FileNotFoundError(f"No files match {path!r}")
+    return files
+
+
+def _dataset(path: PathLike, kind: str):
+    if isinstance(path, str) and glob.has_magic(path):
+        files = sorted(glob.glob(path))
+        if not files:
+            raise FileNotFoundError(f"No files match {path!r}")
+        path = files
+    import pyarrow.dataset as ds
+
+    return ds.dataset(path, format=COLUMNAR_FORMATS[kind][0])
+
+
+def _read_schema(schema, columns: Sequence[str], float32: bool, keep: Sequence[str]):
+    # числовые признаки -> float32, строки -> dictionary (в pandas это category)
+    import pyarrow as pa
+
+    fields = []
+    for name in columns:
+        field = schema.field(name)
+        typ = field.type
+        if name not in keep and float32 and (pa.types.is_floating(typ) or pa.types.is_integer(typ)):
+            typ = pa.float32()
+        elif pa.types.is_string(typ) or pa.types.is_large_string(typ):
+            typ = pa.dictionary(pa.int32(), typ)
+        fields.append(pa.field(name, typ))
+    return pa.schema(fields)
+
+
+def iter_columnar(
+    path: PathLike,
+    kind: str = "parquet",
+    columns: Optional[Sequence[str]] = None,
+    float32: bool = True,
+    keep: Sequence[str] = (),
+    batch_size: int = 100_000,
+) -> Iterator[pd.DataFrame]:
+    """Stream Parquet/Arrow files (one file, a directory, a glob or a list) as DataFrames.
+
+    Only ``columns`` are read, files and row groups are visited in order, and each
+    record batch is cast before conversion: numerics to float32 (except ``keep``)
+    and strings to categoricals.
+    """
+    dataset = _dataset(path, kind)
+    names = list(columns) if columns is not None else dataset.schema.names
+    schema = _read_schema(dataset.schema, names, float32, keep)
+    empty = True
+    for batch in dataset.to_batches(columns=names, batch_size=batch_size):
+        empty = False
+        yield batch.cast(schema).to_pandas()
+    if empty:  # как read_csv(chunksize=...): пустой вход — один пустой кадр со схемой
+        yield schema.empty_table().to_pandas()
+
+
+def read_columnar(
+    path: PathLike,
+    kind: str = "parquet",
+    columns: Optional[Sequence[str]] = None,
+    float32: bool = True,
+    keep: Sequence[str] = (),
+) -> pd.DataFrame:
+    """Read a whole Parquet/Arrow dataset; see :func:`iter_columnar`."""
+    import pyarrow as pa
+
+    dataset = _dataset(path, kind)
+    names = list(columns) if columns is not None else dataset.schema.names
+    schema = _read_schema(dataset.schema, names, float32, keep)
+    # каст по батчам: в памяти одновременно не больше одного батча в исходных типах
+    batches = [b.cast(schema) for b in dataset.to_batches(columns=names)]
+    return pa.Table.from_batches(batches, schema=schema).to_pandas()
+
+
+def write_columnar(df: pd.DataFrame, path: str, kind: str = "parquet") -> None:
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if kind == "parquet":
+        import pyarrow.parquet as pq
+
+        pq.write_table(table, path)
+    else:
+        import pyarrow.feather as feather
+
+        feather.write_feather(table, path)
+
+
+class ChunkWriter:
+    """Append DataFrame chunks to one CSV, Parquet (a row group per chunk) or Arrow IPC file."""
+
+    def __init__(self, path: str, kind: str = "csv"):
+        self.path = path
+        self.kind = kind if kind in COLUMNAR_FORMATS else "csv"
+        self._writer: Any = None  # pq.ParquetWriter | pa.RecordBatchFileWriter после первого чанка
+        self._schema = None
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def write(self, df: pd.DataFrame) -> None:
+        if self.kind == "csv":
+            df.to_csv(self.path, mode="a", header=not os.path.exists(self.path), index=False)
+            return
+        import pyarrow as pa
+
+        # категории — как строки: словари чанков могут различаться, схема — нет
+        df = df.astype(
+            {c: object for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)}
+        )
+        table = pa.Table.from_pandas(df, schema=self._schema, preserve_index=False)
+        if self._writer is None:
+            self._schema = table.schema
+            if self.kind == "parquet":
+                import pyarrow.parquet as pq
+
+                self._writer = pq.ParquetWriter(self.path, self._schema)
+            else:
+                self._writer = pa.ipc.new_file(self.path, self._schema)
+        self._writer.write_table(table)
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self) -> "ChunkWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _feature_columns(cfg: Config) -> Optional[List[str]]:
+    if cfg.data.columns is None:
+        return None
+    return [c for c in cfg.data.columns if c != cfg.data.target] + [cfg.data.target]
+
 
 def make_dataset(cfg: Config) -> tuple[pd.DataFrame, pd.Series]:
     if cfg.data.kind == "synthetic":
-        X, y = make_classification(
-            n_samples=cfg.data.n_samples,
-            n_features=cfg.data.n_features,
-            n_informative=cfg.data.n_informative,
-            n_redundant=cfg.data.n_redundant,
-            n_repeated=cfg.data.n_repeated,
-            n_classes=cfg.data.n_classes,
-            weights=cfg.data.weights,
-            n_clusters_per_class=cfg.data.n_clusters_per_class,
-            random_state=cfg.random_state,
-        )
-        cols = [f"x{i:02d}" for i in range(cfg.data.n_features)]
-        X = pd.DataFrame(X, columns=cols)
-        y = pd.Series(y, name=cfg.data.target)
-        X["cat_bin"] = pd.qcut(X[cols[0]], q=4, labels=["a", "b", "c", "d"]).astype(str)
+        from .synthetic import SyntheticGenerator
+
+        X, y = SyntheticGenerator(cfg.data, cfg.random_state).generate()
         logger.info("Synthetic dataset created: %s rows, %s cols", X.shape[0], X.shape[1])
         return X, y
     elif cfg.data.kind == "csv" and cfg.data.path:
-        df = pd.read_csv(cfg.data.path)
+        usecols = _feature_columns(cfg)
+        df = pd.concat(
+            [pd.read_csv(p, usecols=usecols) for p in _csv_files(cfg.data.path)],
+            ignore_index=True,
+        )
         y = df[cfg.data.target]
         X = df.drop(columns=[cfg.data.target])
         logger.info("CSV dataset loaded: %s rows, %s cols", X.shape[0], X.shape[1])
         return X, y
+    elif cfg.data.kind in COLUMNAR_FORMATS and cfg.data.path:
+        df = read_columnar(
+            cfg.data.path,
+            cfg.data.kind,
+            columns=_feature_columns(cfg),
+            float32=cfg.data.float32,
+            keep=(cfg.data.target,),
+        )
+        y = df[cfg.data.target]
+        X = df.drop(columns=[cfg.data.target])
+        logger.info(
+            "%s dataset loaded: %s rows, %s cols (%.1f MB)",
+            cfg.data.kind.capitalize(),
+            X.shape[0],
+            X.shape[1],
+            X.memory_usage(deep=True).sum() / 2**20,
+        )
+        return X, y
     else:
-        raise ValueError("Unsupported data.kind; use 'synthetic' or provide csv path")
+        raise ValueError(
+            "Unsupported data.kind; use 'synthetic' or provide a path for 'csv'/'parquet'/'arrow'"
+        )
 
 
 def train_test_split_stratified(
-    X: pd.DataFrame, y: pd.Series, test_size: float, random_state: int, artifacts_dir: str
+    X: pd.DataFrame,
+    y: pd.Series,
+    test_size: float,
+    random_state: int,
+    artifacts_dir: str,
+    kind: str = "csv",
 ) -> Tuple[pd.DataFrame, pd.DataFrame, pd.Series, pd.Series]:
+    from sklearn.model_selection import train_test_split
+
     X_tr, X_te, y_tr, y_te = train_test_split(
         X, y, test_size=test_size, random_state=random_state, stratify=y
     )
     os.makedirs(artifacts_dir, exist_ok=True)
     test_df = X_te.copy()
     test_df[y.name] = y_te.values
-    test_path = os.path.join(artifacts_dir, "test.csv")
-    test_df.to_csv(test_path, index=False)
+    if kind in COLUMNAR_FORMATS:
+        test_path = os.path.join(artifacts_dir, "test" + COLUMNAR_FORMATS[kind][1])
+        write_columnar(test_df, test_path, kind)
+    else:
+        test_path = os.path.join(artifacts_dir, "test.csv")
+        test_df.to_csv(test_path, index=False)
     logger.info("Saved holdout test set to %s", test_path)
     return X_tr, X_te, y_tr, y_te
@@ -1,26 +1,98 @@
 from __future__ import annotations
 from typing import List, Optional
+import numpy as np
 import pandas as pd
+from sklearn.base import BaseEstimator, TransformerMixin
 from sklearn.compose import ColumnTransformer
-from sklearn.preprocessing import StandardScaler, OneHotEncoder
+from sklearn.preprocessing import StandardScaler, OneHotEncoder, OrdinalEncoder
 from sklearn.impute import SimpleImputer
 from sklearn.pipeline import Pipeline
 
 
 def _infer_columns(df: pd.DataFrame) -> tuple[List[str], List[str]]:
+    # object/string и category — категориальные (в т.ч. dictionary-колонки из parquet/arrow)
     cat_cols = [
-        c for c in df.columns if df[c].dtype == "object" or str(df[c].dtype).startswith("category")
+        c
+        for c in df.columns
+        if isinstance(df[c].dtype, pd.CategoricalDtype) or pd.api.types.is_string_dtype(df[c].dtype)
     ]
     num_cols = [c for c in df.columns if c not in cat_cols]
     return num_cols, cat_cols
 
 
+class CompactEncoder(TransformerMixin, BaseEstimator):
+    """DataFrame -> one C-contiguous float32 matrix: numeric columns first, then
+    categorical columns as integer codes.
+
+    Codes index ``categories_`` learned in ``fit``; an unseen category gets the
+    code ``len(categories)`` (ignored by the one-hot step, as before) and a missing
+    value stays NaN (imputed downstream). ``num_idx_`` / ``cat_idx_`` are the matrix
+    column indices to build the preprocessor with.
+    """
+
+    def __init__(self, num_cols=None, cat_cols=None, dtype=np.float32):
+        self.num_cols = num_cols
+        self.cat_cols = cat_cols
+        self.dtype = dtype
+
+    def fit(self, X: pd.DataFrame, y=None):
+        num_i, cat_i = _infer_columns(X)
+        self.num_cols_ = list(self.num_cols if self.num_cols is not None else num_i)
+        self.cat_cols_ = list(self.cat_cols if self.cat_cols is not None else cat_i)
+        self.categories_ = [
+            pd.Index(np.sort(np.asarray(X[c].dropna().unique(), dtype=object)))
+            for c in self.cat_cols_
+        ]
+        n_num = len(self.num_cols_)
+        self.num_idx_ = list(range(n_num))
+        self.cat_idx_ = list(range(n_num, n_num + len(self.cat_cols_)))
+        self.n_features_in_ = X.shape[1]
+        return self
+
+    def transform(self, X: pd.DataFrame) -> np.ndarray:
+        n_num = len(self.num_cols_)
+        out = np.empty((len(X), n_num + len(self.cat_cols_)), dtype=self.dtype)
+        # по колонке: без промежуточной float64-копии всей таблицы
+        for j, c in enumerate(self.num_cols_):
+            out[:, j] = X[c].to_numpy()
+        for j, (c, cats) in enumerate(zip(self.cat_cols_, self.categories_), start=n_num):
+            col = X[c]
+            codes = cats.get_indexer(col.astype(object)).astype(self.dtype)
+            codes[codes < 0] = len(cats)
+            codes[col.isna().to_numpy()] = np.nan
+            out[:, j] = codes
+        return out
+
+    def get_feature_names_out(self, input_features=None):
+        return np.asarray(self.num_cols_ + self.cat_cols_, dtype=object)
+
+
 def build_preprocessor(
     X_sample: pd.DataFrame,
     cfg=None,
     num_cols: Optional[List[str]] = None,
     cat_cols: Optional[List[str]] = None,
+    compact: bool = False,
+    sparse: bool = True,
+    categories: Optional[List] = None,
+    native_categorical: bool = False,
+    max_categories: int = 255,
 ) -> ColumnTransformer:
+    """Impute + scale numerics, impute + one-hot categoricals.
+
+    With ``compact=True`` (input from :class:`CompactEncoder`, columns given as
+    indices) the one-hot block is float32 CSR and the output stays float32; it is
+    returned as CSR when its density is below 30% and ``sparse`` allows it (turn it
+    off for estimators without sparse input support). ``categories`` fixes the
+    one-hot vocabulary per categorical column (e.g. collected over all chunks of
+    a file larger than ``X_sample``) instead of learning it in ``fit``.
+
+    With ``native_categorical=True`` (models with native categorical splits, see
+    :data:`~mlc.models.NATIVE_CATEGORICAL`) categoricals are not expanded: each
+    becomes one column of ordinal codes ``0..max_categories-1`` (rarest levels
+    share the last code), missing and unseen values become NaN and are left to
+    the model; :func:`categorical_features` gives the positions of these columns.
+    """
     if num_cols is None or cat_cols is None:
         num_cols_i, cat_cols_i = _infer_columns(X_sample)
         num_cols = num_cols or num_cols_i
@@ -28,20 +100,59 @@ def build_preprocessor(
 
     num_pipe = Pipeline(
         [
-            ("imputer", SimpleImputer(strategy="median")),
+            # при нативных категориальных пустые колонки не выбрасываются: позиции кодов известны
+            ("imputer", SimpleImputer(strategy="median", keep_empty_features=native_categorical)),
             ("scaler", StandardScaler()),
         ]
     )
+    if native_categorical:
+        # одна колонка кодов на признак; пропуски и новые значения — NaN, их разводит сама модель
+        cat_pipe = Pipeline(
+            [
+                (
+                    "ordinal",
+                    OrdinalEncoder(
+                        categories=categories or "auto",
+                        handle_unknown="use_encoded_value",
+                        unknown_value=np.nan,
+                        max_categories=max_categories,
+                        dtype=np.float32 if compact else np.float64,
+                    ),
+                )
+            ]
+        )
+        return ColumnTransformer(
+            [("num", num_pipe, num_cols), ("cat", cat_pipe, cat_cols)], sparse_threshold=0.0
+        )
     cat_pipe = Pipeline(
         [
             ("imputer", SimpleImputer(strategy="most_frequent")),
-            ("ohe", OneHotEncoder(handle_unknown="ignore", sparse_output=False)),
+            (
+                "ohe",
+                OneHotEncoder(
+                    categories=categories or "auto", handle_unknown="ignore", sparse_output=False
+                )
+                if not compact
+                else OneHotEncoder(
+                    categories=categories or "auto",
+                    handle_unknown="ignore",
+                    sparse_output=True,
+                    dtype=np.float32,
+                ),
+            ),
         ]
     )
     preproc = ColumnTransformer(
         [
             ("num", num_pipe, num_cols),
             ("cat", cat_pipe, cat_cols),
-        ]
+        ],
+        sparse_threshold=0.3 if sparse else 0.0,
     )
     return preproc
+
+
+def categorical_features(preproc: ColumnTransformer) -> List[int]:
+    """Output positions of the ordinal-coded categoricals of ``preproc`` (numerics come first)."""
+    widths = {name: len(cols) for name, _, cols in preproc.transformers}
+    return list(range(widths["num"], widths["num"] + widths["cat"]))
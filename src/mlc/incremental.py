@@ -0,0 +1,267 @@
+"""Incremental retraining of saved artifacts on a delta of new rows.
+
+The calibrated model from :func:`~mlc.trainer.run_training` is updated in place:
+every member of the calibrated ensemble keeps its fitted preprocessor and its
+estimator is grown on the delta (HistGradientBoosting adds boosting iterations,
+random forest adds trees, ``partial_fit`` models take one more pass; full-batch
+linear models such as logistic regression are refused, since a refit on the
+delta alone forgets the history). Calibrators and the cost
+threshold are then refit only on rows no estimator was fitted on: a stratified
+``holdout_fraction`` of the delta kept out of growth plus, with
+``incremental.reservoir``, a bounded reservoir sample of earlier hold-out rows,
+so an update costs O(delta + reservoir), not O(history).
+"""
+from __future__ import annotations
+import dataclasses as dc
+import json
+import os
+from typing import Any, Dict, Optional, Tuple
+import numpy as np
+import pandas as pd
+from .config import Config
+from .logging import setup_logging
+
+logger = setup_logging(name="mlc.incremental")
+
+RESERVOIR_FILE = "reservoir.pkl"
+
+
+def reservoir_update(
+    reservoir: Optional[Dict[str, Any]],
+    X: pd.DataFrame,
+    y,
+    size: int,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """Algorithm R over a stream of batches: a uniform sample of ``size`` rows seen so far.
+
+    ``reservoir`` is ``{"X": DataFrame, "y": ndarray, "n_seen": int}`` (or ``None``
+    for an empty one); the batch is processed in one vectorised step with the
+    same result as feeding its rows one by one.
+    """
+    y = np.asarray(y)
+    if reservoir is None:
+        reservoir = {"X": X.iloc[:0], "y": y[:0], "n_seen": 0}
+    n_seen, m = int(reservoir["n_seen"]), len(X)
+    rng = np.random.default_rng([seed, n_seen])
+    n_old = len(reservoir["X"])
+    # номера строк в concat(резервуар, батч), которые остаются в выборке
+    keep = np.arange(n_old)
+
+    # пока резервуар не полон — строки просто дописываются
+    n_fill = min(max(size - n_old, 0), m)
+    keep = np.concatenate([keep, n_old + np.arange(n_fill)])
+
+    # строка с глобальным номером t попадает в слот j ~ U[0, t] при j < size
+    t = n_seen + np.arange(n_fill, m)
+    slot = (rng.random(len(t)) * (t + 1)).astype(np.int64)
+    take = np.flatnonzero(slot < size)
+    if take.size:
+        # одна и та же ячейка может перезаписываться — побеждает последняя строка
+        slots, last = np.unique(slot[take][::-1], return_index=True)
+        keep[slots] = n_old + n_fill + take[::-1][last]
+    X_all = pd.concat([reservoir["X"], X], ignore_index=True)
+    y_all = np.concatenate([np.asarray(reservoir["y"]), y])
+    X_res = X_all.iloc[keep].reset_index(drop=True)
+    y_res = y_all[keep]
+    return {"X": X_res, "y": y_res, "n_seen": n_seen + m}
+
+
+def save_reservoir(reservoir: Optional[Dict[str, Any]], artifacts_dir: str) -> None:
+    """Write ``reservoir.pkl``; ``None`` removes a stale one left by earlier artifacts."""
+    import joblib
+
+    path = os.path.join(artifacts_dir, RESERVOIR_FILE)
+    if reservoir is not None:
+        joblib.dump(reservoir, path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def load_reservoir(artifacts_dir: str) -> Optional[Dict[str, Any]]:
+    import joblib
+
+    path = os.path.join(artifacts_dir, RESERVOIR_FILE)
+    return joblib.load(path) if os.path.exists(path) else None
+
+
+def _split_model(model) -> Tuple[Any, Any]:
+    # Pipeline([("compact", encoder), ("model", calibrated)]) из компактного режима
+    steps = getattr(model, "named_steps", {})
+    if "compact" in steps:
+        return steps["compact"], steps["model"]
+    return None, model
+
+
+def _scores(est, Xt) -> np.ndarray:
+    # тот же выход, что берёт CalibratedClassifierCV: decision_function, иначе P(y=1)
+    if hasattr(est, "decision_function"):
+        return np.ravel(est.decision_function(Xt))
+    return est.predict_proba(Xt)[:, 1]
+
+
+def _split_delta(y: np.ndarray, fraction: float, seed: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Stratified row indices of the delta: (rows to grow on, held-out rows to calibrate on)."""
+    from sklearn.model_selection import train_test_split
+
+    if not 0.0 < fraction < 1.0:
+        raise ValueError(f"incremental.holdout_fraction must be in (0, 1), got {fraction}")
+    grow, held = train_test_split(
+        np.arange(len(y)), test_size=fraction, stratify=y, random_state=seed
+    )
+    return np.sort(grow), np.sort(held)
+
+
+def _grow(est, Xt, y, inc) -> str:
+    """Update one fitted estimator on the (transformed) delta; returns how."""
+    if hasattr(est, "partial_fit"):
+        if est.get_params().get("class_weight") == "balanced":
+            # partial_fit не принимает "balanced" — те же веса через sample_weight
+            from sklearn.utils.class_weight import compute_sample_weight
+
+            weight = compute_sample_weight("balanced", y)
+            est.set_params(class_weight=None)
+            try:
+                est.partial_fit(Xt, y, sample_weight=weight)
+            finally:
+                est.set_params(class_weight="balanced")
+        else:
+            est.partial_fit(Xt, y)
+        return "partial_fit"
+    if hasattr(est, "_predictors"):  # HistGradientBoosting: ещё extra_iter итераций бустинга
+        est.set_params(warm_start=True, max_iter=est.n_iter_ + inc.extra_iter)
+        est.fit(Xt, y)
+        return f"+{inc.extra_iter} iterations"
+    if hasattr(est, "estimators_"):  # случайный лес: новые деревья обучаются на дельте
+        est.set_params(warm_start=True, n_estimators=len(est.estimators_) + inc.extra_trees)
+        est.fit(Xt, y)
+        return f"+{inc.extra_trees} trees"
+    if hasattr(est, "coef_"):
+        # warm_start выпуклого солвера меняет только старт: сходится к оптимуму одной дельты
+        raise NotImplementedError(
+            f"{type(est).__name__} has no partial_fit: a refit on the delta forgets the "
+            "history; use type 'sgd' (log_loss, partial_fit) for incremental updates"
+        )
+    raise NotImplementedError(f"Incremental update is not supported for {type(est).__name__}")
+
+
+def update_model(model, X: pd.DataFrame, y, cfg: Config, X_cal: pd.DataFrame, y_cal):
+    """Grow every calibrated member on ``X, y`` and refit its calibrator on ``X_cal, y_cal``.
+
+    ``model`` is the artifact saved by training (optionally wrapped with the
+    compact encoder) and is modified in place; preprocessors stay frozen, so
+    unseen categories of the delta are treated as unknown. ``X_cal`` must be
+    rows the estimators were never fitted on (in-sample scores of a forest are
+    overconfident). Returns the updated model's calibrated P(y=1) on ``X_cal``.
+    """
+    from sklearn.base import clone
+
+    y, y_cal = np.asarray(y), np.asarray(y_cal)
+    if np.unique(y).size < 2:
+        raise ValueError("Incremental update needs both classes in the new data")
+    encoder, cal = _split_model(model)
+    if encoder is not None:
+        X, X_cal = encoder.transform(X), encoder.transform(X_cal)
+    members = getattr(cal, "calibrated_classifiers_", None)
+    if members is None:
+        raise ValueError("Expected a fitted CalibratedClassifierCV artifact")
+
+    how, proba = None, np.zeros(len(y_cal))
+    for cc in members:
+        pre, est = cc.estimator[:-1], cc.estimator[-1]
+        how = _grow(est, pre.transform(X), y, cfg.incremental)
+        if len(cc.calibrators) != 1:
+            raise NotImplementedError("Only binary calibrated models are supported")
+        scores = _scores(est, pre.transform(X_cal))
+        cc.calibrators[0] = clone(cc.calibrators[0]).fit(scores, y_cal)
+        # вероятность ансамбля на X_cal — для порога, без второго прогона
+        proba += np.clip(cc.calibrators[0].predict(scores), 0.0, 1.0) / len(members)
+    logger.info(
+        "Updated %d calibrated members (%s) on %d new rows; calibrators refit on %d rows",
+        len(members),
+        how,
+        len(y),
+        len(y_cal),
+    )
+    return proba
+
+
+def _load_delta(cfg: Config, path: str) -> Tuple[pd.DataFrame, pd.Series]:
+    from .data import columnar_kind, make_dataset
+
+    kind = columnar_kind(path) or "csv"
+    return make_dataset(dc.replace(cfg, data=dc.replace(cfg.data, kind=kind, path=path)))
+
+
+def run_incremental(cfg: Config, data_path: str) -> None:
+    """Update the artifacts in ``cfg.paths.artifacts_dir`` with the rows in ``data_path``.
+
+    The previous model is first scored on the delta (test-then-train), then
+    updated with :func:`update_model` on all but a stratified
+    ``holdout_fraction`` of the delta; calibrators and the threshold are refit
+    on the held-out rows plus the hold-out reservoir (``incremental.reservoir``),
+    which then absorbs them. ``metrics_update.json`` records the update, the
+    other artifacts are rewritten in place.
+    """
+    from .cost import optimal_threshold
+    from .metrics import compute_metrics
+    from .persistence import load_artifacts, save_artifacts
+    from .profiling import StageProfiler
+
+    art = cfg.paths.artifacts_dir
+    rt, inc = cfg.runtime, cfg.incremental
+    prof = StageProfiler(enabled=rt.profile, hook=rt.profile_hook, hook_stage=rt.profile_stage)
+    with prof.stage("data"):
+        X, y_new = _load_delta(cfg, data_path)
+        preproc, model, old_thr = load_artifacts(cfg.paths)
+        reservoir = load_reservoir(art) if inc.reservoir else None
+    if inc.reservoir and reservoir is None:
+        logger.warning("No %s in %s: calibrating on the new rows only", RESERVOIR_FILE, art)
+    y = y_new.to_numpy()
+    grow, held = _split_delta(y, inc.holdout_fraction, cfg.random_state)
+    X_held, y_held = X.iloc[held].reset_index(drop=True), y[held]
+    if reservoir is not None and len(reservoir["X"]):
+        X_cal = pd.concat([reservoir["X"], X_held], ignore_index=True)
+        y_cal = np.concatenate([np.asarray(reservoir["y"]), y_held])
+    else:
+        X_cal, y_cal = X_held, y_held
+
+    # оценка до обновления: прежняя модель этих строк не видела
+    with prof.stage("prequential"):
+        proba_old = model.predict_proba(X)[:, 1]
+        before = compute_metrics(y, proba_old, threshold=old_thr, k=cfg.reports.pr_k)
+    with prof.stage("update"):
+        proba_cal = update_model(model, X.iloc[grow], y[grow], cfg, X_cal, y_cal)
+    with prof.stage("threshold"):
+        best_thr, _ = optimal_threshold(y_cal, proba_cal, cfg.cost.fn, cfg.cost.fp)
+    logger.info("Threshold by cost: %.3f -> %.3f", old_thr, best_thr)
+
+    with prof.stage("save_artifacts"):
+        if inc.reservoir:
+            # в резервуар — только отложенные строки: обновлённая модель их не видела
+            reservoir = reservoir_update(
+                reservoir, X_held, y_held, inc.reservoir_size, seed=cfg.random_state
+            )
+            save_reservoir(reservoir, art)
+        old = {}
+        for name in ("metrics_cv", "metrics_test"):
+            with open(os.path.join(art, f"{name}.json"), "r", encoding="utf-8") as f:
+                old[name] = json.load(f)
+        save_artifacts(
+            preproc=preproc,
+            model=model,
+            metrics_cv=old["metrics_cv"],
+            metrics_test=old["metrics_test"],
+            thresholds={"optimal": best_thr, "fixed_0_5": 0.5},
+            paths=cfg.paths,
+        )
+        update = {
+            "n_new": int(len(y)),
+            "n_train": int(len(grow)),
+            "n_calibration": int(len(y_cal)),
+            "threshold": {"before": old_thr, "after": best_thr},
+            "prequential": before,
+        }
+        with open(os.path.join(art, "metrics_update.json"), "w", encoding="utf-8") as f:
+            json.dump(update, f, indent=2)
+    prof.save(os.path.join(art, "profile_update.json"))
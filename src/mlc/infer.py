@@ -1,8 +1,17 @@
 from __future__ import annotations
+import os
+import time
+import numpy as np
 import pandas as pd
-from typing import Tuple
-from .persistence import load_artifacts
-from .config import PathsConfig
+from typing import TYPE_CHECKING, Any, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+from .persistence import BUNDLE_DIR, load_artifacts, load_bundle, load_threshold
+from .logging import setup_logging
+
+if TYPE_CHECKING:
+    from .config import PathsConfig
+    from .metrics import StreamingMetrics
+
+logger = setup_logging(name="mlc.infer")
 
 
 class InferenceModel:
@@ -12,11 +21,315 @@ class InferenceModel:
         self.threshold = threshold
 
     @classmethod
-    def load(cls, paths: PathsConfig | dict) -> "InferenceModel":
+    def load(
+        cls, paths: PathsConfig | dict, use_bundle: bool = True, collapse: bool = False
+    ) -> "InferenceModel":
+        """Artifacts from ``paths.artifacts_dir``.
+
+        ``collapse=True`` replaces the calibrated ensemble with one member and a
+        calibration table fitted on the saved hold-out reservoir (see
+        :meth:`collapse`); with ``use_bundle`` the result is compiled in memory.
+        Measure parity on rows outside the reservoir (``scripts/collapse_model.py``
+        keeps part of it out of the table).
+        """
+        art = paths.artifacts_dir if hasattr(paths, "artifacts_dir") else paths["artifacts_dir"]
+        if collapse:
+            from .incremental import RESERVOIR_FILE, load_reservoir
+
+            reservoir = load_reservoir(art)
+            if reservoir is None:
+                raise FileNotFoundError(f"collapse=True needs {RESERVOIR_FILE} in {art}")
+            pre, model, thr = load_artifacts(paths)
+            inf = cls(pre, model, thr).collapse(reservoir["X"])
+            return cls(pre, inf.compile(), thr) if use_bundle else inf
+        # memory-mapped бандл, если он есть; иначе — joblib-артефакты
+        if use_bundle and os.path.isdir(os.path.join(art, BUNDLE_DIR)):
+            try:
+                return cls(None, load_bundle(paths), load_threshold(paths))
+            except (OSError, ValueError) as exc:
+                logger.warning("Artifact bundle unusable, falling back to joblib: %s", exc)
         pre, model, thr = load_artifacts(paths)
         return cls(pre, model, thr)
 
+    def collapse(self, X: pd.DataFrame, member: Optional[int] = None) -> "InferenceModel":
+        """One base model + a monotone calibration table instead of the calibrated ensemble.
+
+        ``X`` is reference data (e.g. training rows) for fitting the table, see
+        :func:`mlc.calibration.collapse_calibrated`; check the result with
+        :func:`mlc.calibration.calibration_parity`.
+        """
+        from .calibration import collapse_calibrated
+        from .compiled import _split_compact
+
+        if self.compiled:
+            raise ValueError("collapse needs the sklearn model; load with use_bundle=False")
+        encoder, cal = _split_compact(self.model)
+        if encoder is None:
+            return InferenceModel(self.preproc, collapse_calibrated(cal, X, member), self.threshold)
+        from sklearn.pipeline import Pipeline
+
+        collapsed = collapse_calibrated(cal, encoder.transform(X), member)
+        model = Pipeline([("compact", encoder), ("model", collapsed)])
+        return InferenceModel(self.preproc, model, self.threshold)
+
+    @property
+    def compiled(self) -> bool:
+        from .compiled import CompiledModel
+
+        return isinstance(self.model, CompiledModel)
+
+    def compile(self):
+        """NumPy-only scorer with the same predictions (see :mod:`mlc.compiled`)."""
+        from .compiled import compile_model
+
+        if self.compiled:
+            return self.model
+        return compile_model(self.model, threshold=self.threshold)
+
     def predict(self, df: pd.DataFrame) -> Tuple[pd.Series, pd.Series]:
-        proba = self.model.predict_proba(df)[:, 1]
+        if self.compiled:
+            proba = self.model.predict_proba(df)
+        else:
+            proba = self.model.predict_proba(df)[:, 1]
         label = (proba >= self.threshold).astype(int)
         return pd.Series(proba, name="proba"), pd.Series(label, name="label")
+
+
+def _sklearn_plan(model) -> Tuple[Optional[Tuple[str, Any]], List[Tuple[str, Any, Any]]]:
+    """Shared steps of a joblib artifact: the compact encoder (or ``None``) and, per
+    calibrated member, (fingerprint, preprocessor, member scoring transformed rows)."""
+    import copy
+    import joblib
+    from sklearn.pipeline import Pipeline
+    from .compiled import _split_compact
+
+    encoder, cal = _split_compact(model)
+    enc = None if encoder is None else (joblib.hash(encoder), encoder)
+    members = []
+    for cc in getattr(cal, "calibrated_classifiers_", []):
+        est = cc.estimator
+        if not isinstance(est, Pipeline) or len(est.steps) < 2:
+            return None, []
+        # тот же член, но препроцессинг уже применён: первый шаг — passthrough
+        view = copy.copy(cc)
+        view.estimator = Pipeline([(est.steps[0][0], "passthrough")] + est.steps[1:])
+        members.append((joblib.hash(est.steps[0][1]), est.steps[0][1], view))
+    return enc, members
+
+
+class MultiInferenceModel:
+    """Several artifacts (a champion and its challengers) scored on the same rows.
+
+    Steps with the same fitted state are run once per batch and shared: the input
+    encoding of compiled bundles (same columns and category vocabularies) and
+    the compact encoder / per-member preprocessors of joblib artifacts (same
+    ``joblib.hash``). Each model then only runs its own estimator and calibrator.
+    """
+
+    def __init__(self, models: Mapping[str, InferenceModel]):
+        if not models:
+            raise ValueError("MultiInferenceModel needs at least one model")
+        self.models = dict(models)
+        self._plans: Dict[str, Any] = {}
+        for name, inf in self.models.items():
+            if inf.compiled:
+                self._plans[name] = ("compiled", inf.model.input_key)
+            else:
+                enc, members = _sklearn_plan(inf.model)
+                self._plans[name] = ("sklearn", enc, members) if members else ("model",)
+
+    @classmethod
+    def load(
+        cls, paths: Mapping[str, Union[PathsConfig, dict]], use_bundle: bool = True
+    ) -> "MultiInferenceModel":
+        """``{name: paths}`` in order, the champion first."""
+        return cls({name: InferenceModel.load(p, use_bundle) for name, p in paths.items()})
+
+    @property
+    def names(self) -> List[str]:
+        return list(self.models)
+
+    def shared_steps(self) -> Dict[str, int]:
+        """How many transform steps a batch runs with and without sharing."""
+        keys: List[Any] = []
+        for plan in self._plans.values():
+            if plan[0] == "compiled":
+                keys.append(plan[1])
+            elif plan[0] == "sklearn":
+                enc = plan[1][0] if plan[1] else None
+                keys += [(enc, fp) for fp, _, _ in plan[2]]
+        return {"total": len(keys), "distinct": len(set(keys))}
+
+    def predict(self, df: pd.DataFrame) -> pd.DataFrame:
+        """``proba_<name>`` and ``label_<name>`` for every model, in order."""
+        encoded: Dict[str, Any] = {}
+        transformed: Dict[Tuple[Any, str], Any] = {}
+        out: Dict[str, Any] = {}
+        for name, inf in self.models.items():
+            plan = self._plans[name]
+            if plan[0] == "compiled":
+                if plan[1] not in encoded:
+                    encoded[plan[1]] = inf.model.encode(df)
+                proba = inf.model.predict_encoded(*encoded[plan[1]])
+            elif plan[0] == "sklearn":
+                enc, members = plan[1], plan[2]
+                X = df
+                if enc is not None:
+                    if enc[0] not in encoded:
+                        encoded[enc[0]] = enc[1].transform(df)
+                    X = encoded[enc[0]]
+                proba = 0.0
+                for fp, pre, view in members:
+                    key = (enc[0] if enc else None, fp)
+                    if key not in transformed:
+                        transformed[key] = pre.transform(X)
+                    # сумма и деление — как усреднение в CalibratedClassifierCV
+                    proba = proba + view.predict_proba(transformed[key])[:, 1]
+                proba = proba / len(members)
+            else:
+                proba = inf.model.predict_proba(df)[:, 1]
+            out[f"proba_{name}"] = proba
+            out[f"label_{name}"] = (proba >= inf.threshold).astype(int)
+        return pd.DataFrame(out, index=df.index)
+
+
+def score_csv(
+    model: Union[InferenceModel, MultiInferenceModel],
+    input_path: str,
+    out_path: str,
+    chunksize: int = 100_000,
+    columns: Optional[Sequence[str]] = None,
+    progress: bool = False,
+    metrics: Union[StreamingMetrics, Dict[str, StreamingMetrics], None] = None,
+    target: str = "target",
+    n_jobs: int = 1,
+) -> int:
+    """Score a CSV chunk by chunk and append predictions to ``out_path``.
+
+    Only one chunk is held in memory at a time. ``columns`` selects which input
+    columns are echoed next to ``proba``/``label`` (all of them when ``None``).
+    With ``metrics``, rows that carry a ``target`` label are added to it. A
+    :class:`MultiInferenceModel` writes ``proba_<name>``/``label_<name>`` per model
+    and takes ``metrics`` as ``{name: StreamingMetrics}``. ``n_jobs > 1`` (-1 =
+    all cores) scores and formats chunks in a process pool, output order kept.
+    Returns the number of scored rows.
+    """
+    chunks = pd.read_csv(input_path, chunksize=chunksize)
+    return _score_chunks(model, chunks, out_path, columns, progress, metrics, target, n_jobs)
+
+
+def score_file(
+    model: Union[InferenceModel, MultiInferenceModel],
+    input_path: str,
+    out_path: str,
+    chunksize: int = 100_000,
+    columns: Optional[Sequence[str]] = None,
+    progress: bool = False,
+    metrics: Union[StreamingMetrics, Dict[str, StreamingMetrics], None] = None,
+    target: str = "target",
+    n_jobs: int = 1,
+) -> int:
+    """Like :func:`score_csv`, but Parquet/Arrow input (by extension or a directory)
+    is streamed by record batches; predictions are still written as CSV."""
+    from .data import columnar_kind, iter_columnar
+
+    kind = columnar_kind(input_path)
+    if kind is None:
+        return score_csv(
+            model, input_path, out_path, chunksize, columns, progress, metrics, target, n_jobs
+        )
+    chunks = iter_columnar(input_path, kind, float32=False, batch_size=chunksize)
+    return _score_chunks(model, chunks, out_path, columns, progress, metrics, target, n_jobs)
+
+
+def _prediction_columns(model, chunk: pd.DataFrame) -> Dict[str, Any]:
+    if chunk.empty:
+        # пустой вход (только заголовок): sklearn не принимает 0 строк, но шапка нужна
+        names = model.names if isinstance(model, MultiInferenceModel) else [None]
+        pred: Dict[str, Any] = {}
+        for name in names:
+            suffix = "" if name is None else f"_{name}"
+            pred[f"proba{suffix}"] = np.empty(0, dtype=float)
+            pred[f"label{suffix}"] = np.empty(0, dtype=int)
+        return pred
+    if isinstance(model, MultiInferenceModel):
+        return {str(c): v.to_numpy() for c, v in model.predict(chunk).items()}
+    proba, label = model.predict(chunk)
+    return {str(proba.name): proba.to_numpy(), str(label.name): label.to_numpy()}
+
+
+def _render(model, chunk: pd.DataFrame, columns, header: bool) -> Tuple[Dict[str, Any], str]:
+    # прогноз и готовый CSV-текст шарда: форматирование чисел тоже уходит в воркер
+    pred = _prediction_columns(model, chunk)
+    out = chunk if columns is None else chunk.loc[:, list(columns)]
+    return pred, out.assign(**pred).to_csv(header=header, index=False)
+
+
+# модель воркера пула: задаётся один раз initializer'ом (при fork — без копирования)
+_WORKER_MODEL = None
+
+
+def _init_worker(model) -> None:
+    global _WORKER_MODEL
+    _WORKER_MODEL = model
+
+
+def _render_shard(chunk: pd.DataFrame, columns, header: bool) -> Tuple[Dict[str, Any], str]:
+    return _render(_WORKER_MODEL, chunk, columns, header)
+
+
+def _iter_rendered(model, chunks, columns, n_jobs: int):
+    """``(chunk, prediction columns, CSV text)`` for every chunk, in input order.
+
+    With ``n_jobs > 1`` (-1 = all cores) the chunks are row shards scored and
+    formatted by a process pool; each worker receives the model once when it
+    starts (inherited after ``fork`` where available, pickled otherwise). At
+    most ``2 * n_jobs`` shards are in flight, so memory stays bounded.
+    """
+    workers = (os.cpu_count() or 1) if n_jobs < 0 else max(1, n_jobs)
+    if workers == 1:
+        for i, chunk in enumerate(chunks):
+            yield (chunk, *_render(model, chunk, columns, i == 0))
+        return
+    import multiprocessing as mp
+    from collections import deque
+    from concurrent.futures import ProcessPoolExecutor
+
+    ctx = mp.get_context("fork" if "fork" in mp.get_all_start_methods() else None)
+    pool = ProcessPoolExecutor(workers, mp_context=ctx, initializer=_init_worker, initargs=(model,))
+    pending: deque = deque()
+    try:
+        for i, chunk in enumerate(chunks):
+            pending.append((chunk, pool.submit(_render_shard, chunk, columns, i == 0)))
+            if len(pending) >= 2 * workers:
+                chunk, fut = pending.popleft()
+                yield (chunk, *fut.result())
+        while pending:
+            chunk, fut = pending.popleft()
+            yield (chunk, *fut.result())
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _score_chunks(
+    model, chunks, out_path, columns, progress, metrics=None, target=None, n_jobs=1
+) -> int:
+    n_rows = 0
+    start = time.perf_counter()
+    multi = isinstance(model, MultiInferenceModel)
+    # для нескольких моделей — свой аккумулятор на каждую: {имя: StreamingMetrics}
+    accs = {} if metrics is None else metrics if multi else {None: metrics}
+    with open(out_path, "w", encoding="utf-8", newline="") as f:
+        for chunk, pred, text in _iter_rendered(model, chunks, columns, n_jobs):
+            if accs and target in chunk:
+                # размеченные строки — в аккумулятор мониторинга (память не растёт)
+                known = chunk[target].notna().to_numpy()
+                y = chunk[target].to_numpy()[known]
+                for name, acc in accs.items():
+                    acc.update(y, pred["proba" if name is None else f"proba_{name}"][known])
+            f.write(text)
+            n_rows += len(chunk)
+            if progress:
+                elapsed = time.perf_counter() - start
+                logger.info("Scored %d rows (%.0f rows/s)", n_rows, n_rows / max(elapsed, 1e-9))
+    return n_rows
@@ -1,52 +1,243 @@
 from __future__ import annotations
-from typing import Callable, Dict, Optional, Tuple
+from typing import Any, Callable, Dict, Iterator, Optional, Sequence, Tuple
 import numpy as np
+from joblib import Parallel, delayed
 from sklearn import metrics as skm
 
+BOOTSTRAP_METRICS = ("pr_auc", "roc_auc", "brier")
 
-def _f1_at_threshold(y_true, proba, thr: float) -> float:
-    y_pred = (proba >= thr).astype(int)
-    return skm.f1_score(y_true, y_pred)
+# scorer -> имя метрики, которую умеет считать векторизованный бутстрап
+_FAST_SCORERS = {
+    skm.average_precision_score: "pr_auc",
+    skm.roc_auc_score: "roc_auc",
+    skm.brier_score_loss: "brier",
+}
 
+# ограничение на размер блока весов (ресэмплы × объекты) в памяти
+_BOOT_MAX_CELLS = 1 << 22
 
-def _recall_at_k(y_true, proba, k: Optional[int]) -> Optional[float]:
+
+def _recall_at_k(y_true, proba, k: Optional[int], sample_weight=None) -> Optional[float]:
     if k is None or k <= 0:
         return None
-    order = np.argsort(-proba)
-    top_k = order[: min(k, len(order))]
-    y_top = np.asarray(y_true)[top_k]
-    positives = np.sum(y_true)
+    y = np.asarray(y_true, dtype=float)
+    p = np.asarray(proba)
+    w = y if sample_weight is None else y * np.asarray(sample_weight, dtype=float)
+    positives = w.sum()
     if positives == 0:
         return 0.0
-    return float(np.sum(y_top) / positives)
+    # top-k без полной сортировки: O(n) вместо O(n log n)
+    top_k = np.argpartition(-p, k - 1)[:k] if k < len(p) else np.arange(len(p))
+    return float(w[top_k].sum() / positives)
+
+
+def _trapezoid(x: np.ndarray, y: np.ndarray) -> float:
+    return float(np.sum(np.diff(x) * (y[1:] + y[:-1]) / 2.0))
+
+
+class _Curve:
+    """Cumulative TP/FP (weighted) counts at every distinct score, highest first.
+
+    One sort serves ROC-AUC, PR-AUC (same trapezoidal areas as ``skm.auc`` over
+    ``roc_curve`` / ``precision_recall_curve``) and confusion counts at any
+    threshold.
+    """
+
+    def __init__(self, y_true, proba, sample_weight=None):
+        y = np.asarray(y_true, dtype=float)
+        p = np.asarray(proba, dtype=float)
+        w = np.ones_like(y) if sample_weight is None else np.asarray(sample_weight, dtype=float)
+        order = np.argsort(p)[::-1]
+        p_s, y_s, w_s = p[order], y[order], w[order]
+        # последний элемент каждого блока одинаковых скоров
+        last = np.r_[np.flatnonzero(np.diff(p_s)), len(p_s) - 1]
+        self.thresholds = p_s[last]
+        self.tps = np.cumsum(y_s * w_s)[last]
+        self.fps = np.cumsum((1.0 - y_s) * w_s)[last]
+        self.n_pos = self.tps[-1] if len(last) else 0.0
+        self.n_neg = self.fps[-1] if len(last) else 0.0
 
+    def roc_auc(self) -> float:
+        return _trapezoid(np.r_[0.0, self.fps] / self.n_neg, np.r_[0.0, self.tps] / self.n_pos)
 
-def compute_metrics(y_true, proba, threshold: float = 0.5, k: Optional[int] = None) -> Dict[str, float]:
-    fpr, tpr, _ = skm.roc_curve(y_true, proba)
-    precision, recall, _ = skm.precision_recall_curve(y_true, proba)
-    metrics = {
+    def pr_auc(self) -> float:
+        precision = self.tps / (self.tps + self.fps)
+        return _trapezoid(np.r_[0.0, self.tps / self.n_pos], np.r_[1.0, precision])
+
+    def counts_at(self, threshold: float) -> Tuple[float, float, float, float]:
+        """(tn, fp, fn, tp) for the rule ``proba >= threshold``."""
+        j = int(np.searchsorted(-self.thresholds, -threshold, side="right"))
+        tp = self.tps[j - 1] if j else 0.0
+        fp = self.fps[j - 1] if j else 0.0
+        return self.n_neg - fp, fp, self.n_pos - tp, tp
+
+
+def _compute_metrics_sklearn(y_true, proba, threshold, k, sample_weight) -> Dict[str, float]:
+    # вырожденные выборки (один класс): поведение и предупреждения sklearn как есть
+    w = sample_weight
+    fpr, tpr, _ = skm.roc_curve(y_true, proba, sample_weight=w)
+    precision, recall, _ = skm.precision_recall_curve(y_true, proba, sample_weight=w)
+    y_pred = (proba >= threshold).astype(int)
+    cm = skm.confusion_matrix(y_true, y_pred, labels=[0, 1], sample_weight=w)
+    return {
         "roc_auc": skm.auc(fpr, tpr),
         "pr_auc": skm.auc(recall, precision),
-        "brier": skm.brier_score_loss(y_true, proba),
-        "accuracy": skm.accuracy_score(y_true, (proba >= threshold).astype(int)),
-        "f1_at_thr": _f1_at_threshold(y_true, proba, threshold),
-        "recall_at_k": _recall_at_k(y_true, proba, k) if k else None,
+        "brier": skm.brier_score_loss(y_true, proba, sample_weight=w),
+        "accuracy": skm.accuracy_score(y_true, y_pred, sample_weight=w),
+        "f1_at_thr": skm.f1_score(y_true, y_pred, sample_weight=w),
+        "recall_at_k": _recall_at_k(y_true, proba, k, w) if k else None,
+        "tn": cm[0, 0],
+        "fp": cm[0, 1],
+        "fn": cm[1, 0],
+        "tp": cm[1, 1],
     }
-    cm = skm.confusion_matrix(y_true, (proba >= threshold).astype(int), labels=[0, 1])
-    metrics.update(
-        {
-            "tn": int(cm[0, 0]),
-            "fp": int(cm[0, 1]),
-            "fn": int(cm[1, 0]),
-            "tp": int(cm[1, 1]),
+
+
+def compute_metrics(
+    y_true, proba, threshold: float = 0.5, k: Optional[int] = None, sample_weight=None
+) -> Dict[str, float]:
+    """ROC-AUC, PR-AUC, Brier, accuracy / F1 / confusion counts at ``threshold`` and
+    recall@k, all from one sort of the scores (see :class:`_Curve`)."""
+    y = np.asarray(y_true)
+    p = np.asarray(proba, dtype=float)
+    w = None if sample_weight is None else np.asarray(sample_weight, dtype=float)
+    curve = _Curve(y, p, w)
+    if curve.n_pos == 0 or curve.n_neg == 0:
+        metrics = _compute_metrics_sklearn(y, p, threshold, k, w)
+    else:
+        tn, fp, fn, tp = curve.counts_at(threshold)
+        metrics = {
+            "roc_auc": curve.roc_auc(),
+            "pr_auc": curve.pr_auc(),
+            "brier": float(np.average((p - y) ** 2, weights=w)),
+            "accuracy": float((tp + tn) / (tp + tn + fp + fn)),
+            "f1_at_thr": float(2 * tp / (2 * tp + fp + fn)),
+            "recall_at_k": _recall_at_k(y, p, k, w) if k else None,
+            "tn": tn,
+            "fp": fp,
+            "fn": fn,
+            "tp": tp,
         }
-    )
+    # счётчики — целые без весов, взвешенные суммы — с весами
+    cast = int if w is None else float
+    metrics.update({c: cast(metrics[c]) for c in ("tn", "fp", "fn", "tp")})
     return metrics
 
 
+def _ci(values: np.ndarray) -> Tuple[float, float, float]:
+    lo, hi = np.percentile(values, [2.5, 97.5])
+    return float(np.mean(values)), float(lo), float(hi)
+
+
+def _resample_indices(
+    rng: np.random.Generator, n: int, n_boot: int, chunk: int
+) -> Iterator[np.ndarray]:
+    # тот же поток индексов, что и rng.choice(idx, size=n) в цикле, блоками по chunk ресэмплов
+    dtype = np.int32 if n < np.iinfo(np.int32).max else np.int64
+    for start in range(0, n_boot, chunk):
+        yield rng.integers(0, n, size=(min(chunk, n_boot - start), n), dtype=dtype)
+
+
+def _score_segments(y: np.ndarray, p: np.ndarray) -> Tuple[np.ndarray, int]:
+    """Map every sample to a rank segment; returns (segment id per sample, n positive blocks).
+
+    Scores are grouped into blocks of equal value in descending order. For the k-th
+    block that holds positives, segment ``3k`` holds the negatives ranked above it
+    (after block k-1), ``3k+1`` the negatives tied with it and ``3k+2`` its positives;
+    ``3m`` collects the negatives below the last positive block.
+    """
+    n = len(y)
+    order = np.argsort(-p, kind="mergesort")
+    y_s, p_s = y[order], p[order]
+    block = np.concatenate(([0], np.cumsum(np.diff(p_s) != 0)))
+    has_pos = np.zeros(block[-1] + 1 if n else 0, dtype=int)
+    np.maximum.at(has_pos, block, y_s.astype(int))
+    k = (np.cumsum(has_pos) - has_pos)[block]
+    seg_s = np.where(has_pos[block] == 1, 3 * k + 1 + y_s.astype(int), 3 * k)
+    seg = np.empty(n, dtype=np.int32 if n < np.iinfo(np.int32).max // 3 else np.int64)
+    seg[order] = seg_s
+    return seg, int(has_pos.sum())
+
+
+def _bootstrap_chunk(
+    seg: np.ndarray, n_pos_blocks: int, sq_err: np.ndarray, idx: np.ndarray, metrics: Sequence[str]
+) -> Dict[str, np.ndarray]:
+    """PR-AUC / ROC-AUC / Brier for every resample (row) of ``idx``."""
+    rows, n = idx.shape
+    out: Dict[str, np.ndarray] = {}
+    if "brier" in metrics:
+        out["brier"] = sq_err[idx].mean(axis=1)
+    if "pr_auc" not in metrics and "roc_auc" not in metrics:
+        return out
+
+    m = n_pos_blocks
+    width = 3 * m + 1
+    flat = (seg[idx] + width * np.arange(rows)[:, None]).ravel()
+    counts = np.bincount(flat, minlength=rows * width).reshape(rows, width).astype(float)
+    gap, tied_neg, pos = counts[:, 0:-1:3], counts[:, 1::3], counts[:, 2::3]
+
+    tp = np.cumsum(pos, axis=1)
+    fp = np.cumsum(gap + tied_neg, axis=1)
+    n_pos = tp[:, -1] if m else np.zeros(rows)
+    n_neg = n - n_pos
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if "pr_auc" in metrics:
+            prec = np.divide(tp, tp + fp, out=np.zeros_like(tp), where=pos > 0)
+            ap = np.sum(pos * prec, axis=1) / n_pos
+            out["pr_auc"] = np.where(n_pos > 0, ap, 0.0)
+        if "roc_auc" in metrics:
+            # Манн-Уитни: отрицательные ниже блока + половина связанных
+            wins = np.sum(pos * (n_neg[:, None] - fp + 0.5 * tied_neg), axis=1)
+            out["roc_auc"] = wins / (n_pos * n_neg)
+    return out
+
+
+def bootstrap_metrics(
+    y_true,
+    proba,
+    metrics: Sequence[str] = BOOTSTRAP_METRICS,
+    n_boot: int = 1000,
+    seed: int = 0,
+    n_jobs: Optional[int] = None,
+) -> Dict[str, Tuple[float, float, float]]:
+    """Bootstrap (mean, 2.5%, 97.5%) for several metrics at once.
+
+    Resamples are the same as in :func:`bootstrap_ci` for a given seed, but every
+    metric is read from rank-segment counts of the resample instead of re-sorting it.
+    Resamples are processed in bounded-size chunks; ``n_jobs`` scores the chunks
+    in worker processes without changing the result.
+    """
+    unknown = set(metrics) - set(BOOTSTRAP_METRICS)
+    if unknown:
+        raise ValueError(f"Unsupported bootstrap metrics: {sorted(unknown)}")
+    y = np.asarray(y_true).astype(float)
+    p = np.asarray(proba, dtype=float)
+    n = len(y)
+    seg, n_pos_blocks = _score_segments(y, p)
+    sq_err = (p - y) ** 2
+
+    rng = np.random.default_rng(seed)
+    chunk = max(1, min(n_boot, _BOOT_MAX_CELLS // max(n, 1)))
+    batches = _resample_indices(rng, n, n_boot, chunk)
+    if n_jobs is None or n_jobs == 1:
+        parts = [_bootstrap_chunk(seg, n_pos_blocks, sq_err, idx, metrics) for idx in batches]
+    else:
+        parts = Parallel(n_jobs=n_jobs)(
+            delayed(_bootstrap_chunk)(seg, n_pos_blocks, sq_err, idx, metrics) for idx in batches
+        )
+    return {m: _ci(np.concatenate([part[m] for part in parts])) for m in metrics}
+
+
 def bootstrap_ci(
-    y_true, proba, scorer: Callable[[np.ndarray, np.ndarray], float], n_boot: int = 1000, seed: int = 0
+    y_true,
+    proba,
+    scorer: Callable[[np.ndarray, np.ndarray], float],
+    n_boot: int = 1000,
+    seed: int = 0,
 ) -> Tuple[float, float, float]:
+    fast = _FAST_SCORERS.get(scorer)
+    if fast is not None:
+        return bootstrap_metrics(y_true, proba, metrics=(fast,), n_boot=n_boot, seed=seed)[fast]
     rng = np.random.default_rng(seed)
     n = len(y_true)
     stats: list[float] = []
@@ -56,4 +247,206 @@ def bootstrap_ci(
         stats.append(float(scorer(y_true[s], proba[s])))
     # не перетираем тип списка массивом — используем отдельную переменную
     values = np.sort(np.array(stats, dtype=float))
-    return float(np.mean(values)), float(np.percentile(values, 2.5)), float(np.percentile(values, 97.5))
\ No newline at end of file
+    return _ci(values)
+
+
+STREAMING_FORMAT = "mlc-streaming-metrics"
+STREAMING_VERSION = 1
+
+
+class StreamingMetrics:
+    """Fixed-memory, mergeable accumulator of (label, P(y=1)) pairs for monitoring.
+
+    Scores fall into ``n_bins`` equal bins ``[b / n_bins, (b + 1) / n_bins)`` holding
+    the (weighted) counts of positives and negatives and the sum of scores. Brier,
+    the confusion counts at ``threshold`` and recall@``k`` (top ``k`` scores are
+    kept) are exact; ROC-AUC and PR-AUC follow :func:`compute_metrics` with every
+    bin as one block of tied scores, and :meth:`auc_bounds` gives the range over
+    all orderings inside the bins. Memory is O(n_bins + k) whatever the traffic;
+    copies from different workers are combined with :meth:`merge` and stored as
+    JSON with :meth:`save` / :meth:`load`.
+    """
+
+    def __init__(self, n_bins: int = 65536, threshold: float = 0.5, k: Optional[int] = None):
+        self.n_bins, self.threshold, self.k = int(n_bins), float(threshold), k
+        self.pos = np.zeros(self.n_bins)
+        self.neg = np.zeros(self.n_bins)
+        self.score_sum = np.zeros(self.n_bins)
+        self.sq_err = 0.0
+        self.cm: np.ndarray = np.zeros(4)  # tn, fp, fn, tp при proba >= threshold
+        self.weighted = False
+        self.top: np.ndarray = np.empty((3, 0))  # (скор, метка, вес) лучших k строк
+
+    def _bin(self, proba: np.ndarray) -> np.ndarray:
+        return np.clip((proba * self.n_bins).astype(np.int64), 0, self.n_bins - 1)
+
+    def update(self, y_true, proba, sample_weight=None) -> "StreamingMetrics":
+        y = np.asarray(y_true, dtype=float)
+        p = np.asarray(proba, dtype=float)
+        if sample_weight is None:
+            w = np.ones_like(y)
+        else:
+            w = np.asarray(sample_weight, dtype=float)
+            self.weighted = True
+        b = self._bin(p)
+        self.pos += np.bincount(b, weights=w * y, minlength=self.n_bins)
+        self.neg += np.bincount(b, weights=w * (1.0 - y), minlength=self.n_bins)
+        self.score_sum += np.bincount(b, weights=w * p, minlength=self.n_bins)
+        self.sq_err += float(np.sum(w * (p - y) ** 2))
+        cell = 2 * y.astype(np.int64) + (p >= self.threshold)
+        self.cm += np.bincount(cell, weights=w, minlength=4)
+        if self.k:
+            self._keep_top(np.vstack([p, y, w]))
+        return self
+
+    def _keep_top(self, rows: np.ndarray) -> None:
+        top = np.hstack([self.top, rows])
+        if top.shape[1] > self.k:
+            top = top[:, np.argpartition(-top[0], self.k - 1)[: self.k]]
+        self.top = top
+
+    def merge(self, other: "StreamingMetrics") -> "StreamingMetrics":
+        if (other.n_bins, other.threshold, other.k) != (self.n_bins, self.threshold, self.k):
+            raise ValueError("Accumulators differ in n_bins, threshold or k")
+        self.pos += other.pos
+        self.neg += other.neg
+        self.score_sum += other.score_sum
+        self.sq_err += other.sq_err
+        self.cm += other.cm
+        self.weighted |= other.weighted
+        if self.k:
+            self._keep_top(other.top)
+        return self
+
+    @property
+    def n(self) -> float:
+        return float(self.cm.sum())
+
+    def _curve(self, order: Optional[str] = None) -> _Curve:
+        # order: None — бин как блок одинаковых скоров; "best"/"worst" — положительные
+        # внутри бина выше/ниже отрицательных
+        nz = np.flatnonzero(self.pos + self.neg)
+        s = nz.astype(float)
+        if order is None:
+            s_pos = s_neg = s
+        elif order == "best":
+            s_pos, s_neg = 2 * s + 1, 2 * s
+        else:
+            s_pos, s_neg = 2 * s, 2 * s + 1
+        has_pos, has_neg = self.pos[nz] > 0, self.neg[nz] > 0
+        return _Curve(
+            np.r_[np.ones(has_pos.sum()), np.zeros(has_neg.sum())],
+            np.r_[s_pos[has_pos], s_neg[has_neg]],
+            np.r_[self.pos[nz][has_pos], self.neg[nz][has_neg]],
+        )
+
+    def metrics(self) -> Dict[str, float]:
+        """The keys of :func:`compute_metrics` (``recall_at_k`` needs ``k``)."""
+        curve = self._curve()
+        both = curve.n_pos > 0 and curve.n_neg > 0
+        tn, fp, fn, tp = self.cm
+        n = self.n
+        out = {
+            "roc_auc": curve.roc_auc() if both else float("nan"),
+            "pr_auc": curve.pr_auc() if both else float("nan"),
+            "brier": self.sq_err / n if n else float("nan"),
+            "accuracy": float((tp + tn) / n) if n else float("nan"),
+            "f1_at_thr": float(2 * tp / (2 * tp + fp + fn)) if tp + fp + fn else 0.0,
+            "recall_at_k": None,
+        }
+        if self.k:
+            y, w = self.top[1], self.top[2]
+            out["recall_at_k"] = float(np.sum(w * y) / curve.n_pos) if curve.n_pos else 0.0
+        cast = float if self.weighted else int
+        out.update({c: cast(v) for c, v in zip(("tn", "fp", "fn", "tp"), self.cm)})
+        return out
+
+    def auc_bounds(self) -> Dict[str, Tuple[float, float]]:
+        """(low, high) of ROC-AUC and PR-AUC over the orderings of scores inside each bin."""
+        worst, best = self._curve("worst"), self._curve("best")
+        if worst.n_pos == 0 or worst.n_neg == 0:
+            return {"roc_auc": (float("nan"),) * 2, "pr_auc": (float("nan"),) * 2}
+        return {
+            "roc_auc": (worst.roc_auc(), best.roc_auc()),
+            "pr_auc": (worst.pr_auc(), best.pr_auc()),
+        }
+
+    def cost(self, threshold: float, c_fn: float, c_fp: float) -> Dict[str, float]:
+        """``c_fn * FN + c_fp * FP`` of the rule ``proba >= threshold`` (as in
+        :func:`~mlc.cost.expected_cost`), with rows of the bin that contains the
+        threshold split linearly; ``cost_low`` / ``cost_high`` bound the true value
+        and coincide when the threshold is a bin edge."""
+        x = min(max(float(threshold), 0.0), 1.0) * self.n_bins
+        b = min(int(np.floor(x)), self.n_bins - 1)
+        share_above = 1.0 - (x - b)  # доля бина b с proba >= threshold при равномерных скорах
+        fn_sure, fp_sure = self.pos[:b].sum(), self.neg[b + 1 :].sum()
+        pos_b, neg_b = self.pos[b], self.neg[b]
+        fn = fn_sure + (1.0 - share_above) * pos_b
+        fp = fp_sure + share_above * neg_b
+        above = c_fn * fn_sure + c_fp * (fp_sure + neg_b)  # весь бин b — класс 1
+        below = c_fn * (fn_sure + pos_b) + c_fp * fp_sure  # весь бин b — класс 0
+        if share_above == 1.0:  # порог на границе бина — значение точное
+            below = above
+        return {
+            "threshold": float(threshold),
+            "cost": float(c_fn * fn + c_fp * fp),
+            "cost_low": float(min(above, below)),
+            "cost_high": float(max(above, below)),
+            "fn": float(fn),
+            "fp": float(fp),
+        }
+
+    def calibration_curve(self, n_bins: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """(mean predicted, fraction of positives) per non-empty uniform bin, like
+        :func:`~mlc.calibration.calibration_curves`; exact when ``n_bins`` divides
+        the accumulator's resolution."""
+        coarse = np.arange(self.n_bins) * n_bins // self.n_bins
+        w = np.bincount(coarse, weights=self.pos + self.neg, minlength=n_bins)
+        pos = np.bincount(coarse, weights=self.pos, minlength=n_bins)
+        scores = np.bincount(coarse, weights=self.score_sum, minlength=n_bins)
+        seen = w > 0
+        return scores[seen] / w[seen], pos[seen] / w[seen]
+
+    def to_dict(self) -> Dict[str, Any]:
+        # только непустые бины: состояние остаётся маленьким при любом n_bins
+        nz = np.flatnonzero(self.pos + self.neg)
+        return {
+            "format": STREAMING_FORMAT,
+            "version": STREAMING_VERSION,
+            "n_bins": self.n_bins,
+            "threshold": self.threshold,
+            "k": self.k,
+            "weighted": self.weighted,
+            "bins": nz.tolist(),
+            "pos": self.pos[nz].tolist(),
+            "neg": self.neg[nz].tolist(),
+            "score_sum": self.score_sum[nz].tolist(),
+            "sq_err": self.sq_err,
+            "cm": self.cm.tolist(),
+            "top": self.top.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "StreamingMetrics":
+        if d.get("format") != STREAMING_FORMAT or d.get("version") != STREAMING_VERSION:
+            raise ValueError(f"Unsupported metrics state: {d.get('format')} v{d.get('version')}")
+        out = cls(n_bins=d["n_bins"], threshold=d["threshold"], k=d["k"])
+        nz = np.asarray(d["bins"], dtype=np.int64)
+        out.pos[nz], out.neg[nz], out.score_sum[nz] = d["pos"], d["neg"], d["score_sum"]
+        out.sq_err, out.cm = float(d["sq_err"]), np.asarray(d["cm"], dtype=float)
+        out.weighted = bool(d["weighted"])
+        out.top = np.asarray(d["top"], dtype=float).reshape(3, -1)
+        return out
+
+    def save(self, path: str) -> None:
+        import json
+
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path: str) -> "StreamingMetrics":
+        import json
+
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
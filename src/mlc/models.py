@@ -1,24 +1,47 @@
 from __future__ import annotations
-from typing import Any, Mapping, Union
+from typing import Any, List, Mapping, Optional, Union
 from .config import ModelSpec
-from sklearn.linear_model import LogisticRegression
-from sklearn.ensemble import RandomForestClassifier, HistGradientBoostingClassifier
 
+# эстиматоры, принимающие CSR на вход (для компактного режима); HGB требует плотную матрицу
+SPARSE_INPUT = {"logistic", "sgd", "rf"}
+# эстиматоры с нативными категориальными сплитами: категориальные — ordinal-кодами, не one-hot
+NATIVE_CATEGORICAL = {"hist_gbdt"}
 
-def build_model(spec: Union[ModelSpec, Mapping[str, Any]], random_state: int):
+
+def build_model(
+    spec: Union[ModelSpec, Mapping[str, Any]],
+    random_state: int,
+    categorical_features: Optional[List[int]] = None,
+):
     typ = spec.get("type")
     params = {**spec.get("params", {})}
     params.setdefault("random_state", random_state)
 
     if typ == "logistic":
+        from sklearn.linear_model import LogisticRegression
+
         params.setdefault("max_iter", 200)
         return LogisticRegression(**params)
 
+    if typ == "sgd":
+        from sklearn.linear_model import SGDClassifier
+
+        # логистическая потеря + partial_fit — для инкрементального дообучения
+        params.setdefault("loss", "log_loss")
+        return SGDClassifier(**params)
+
     if typ == "rf":
+        from sklearn.ensemble import RandomForestClassifier
+
         return RandomForestClassifier(**params)
 
     if typ == "hist_gbdt":
+        from sklearn.ensemble import HistGradientBoostingClassifier
+
+        if categorical_features:  # позиции ordinal-кодов (features.categorical_features)
+            params.setdefault("categorical_features", categorical_features)
         # у HistGradientBoostingClassifier нет class_weight
-        return HistGradientBoostingClassifier(**{k: v for k, v in params.items() if k != "class_weight"})
+        params.pop("class_weight", None)
+        return HistGradientBoostingClassifier(**params)
 
     raise ValueError(f"Unknown model type: {typ}")
\ No newline at end of file
@@ -1,8 +1,94 @@
 from __future__ import annotations
 import os
 import json
-from typing import Any, Dict, Tuple
-import joblib
+import hashlib
+import shutil
+from typing import Any, Dict, Optional, Tuple
+from .logging import setup_logging
+
+logger = setup_logging(name="mlc.persistence")
+
+BUNDLE_DIR = "bundle"
+BUNDLE_FORMAT = "mlc-bundle"
+BUNDLE_VERSION = 1
+
+
+def _artifacts_dir(paths) -> str:
+    return paths.artifacts_dir if hasattr(paths, "artifacts_dir") else paths["artifacts_dir"]
+
+
+def _sha256(path: str, block: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(block), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def save_bundle(model, threshold: float, art: str) -> Optional[str]:
+    """Write ``<art>/bundle``: compiled arrays as ``.npy`` + ``manifest.json`` with checksums.
+
+    The directory is assembled next to the target and swapped in at the end, so
+    readers never see a half-written bundle. Returns ``None`` (and removes a bundle
+    left by an earlier run, keeping only the joblib artifacts) when the model
+    cannot be compiled.
+    """
+    from .compiled import compile_model
+
+    try:
+        compiled = compile_model(model, threshold=threshold)
+    except NotImplementedError as exc:
+        logger.warning("Skipping artifact bundle, joblib artifacts only: %s", exc)
+        # бандл прошлого обучения не должен пережить новую модель
+        shutil.rmtree(os.path.join(art, BUNDLE_DIR), ignore_errors=True)
+        return None
+
+    target = os.path.join(art, BUNDLE_DIR)
+    tmp = f"{target}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    compiled.save(tmp)
+    files = {}
+    for name in sorted(os.listdir(tmp)):
+        fp = os.path.join(tmp, name)
+        files[name] = {"bytes": os.path.getsize(fp), "sha256": _sha256(fp)}
+    manifest = {"format": BUNDLE_FORMAT, "version": BUNDLE_VERSION, "files": files}
+    with open(os.path.join(tmp, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(tmp, target)
+    return target
+
+
+def verify_bundle(path: str) -> None:
+    """Recompute checksums of every bundle file; raises ``ValueError`` on mismatch."""
+    with open(os.path.join(path, "manifest.json"), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    for name, info in manifest["files"].items():
+        if _sha256(os.path.join(path, name)) != info["sha256"]:
+            raise ValueError(f"Checksum mismatch in bundle file {name}")
+
+
+def load_bundle(paths, verify: bool = False):
+    """Lazily load ``<artifacts_dir>/bundle`` as a memory-mapped :class:`CompiledModel`.
+
+    Arrays are opened with ``mmap_mode="r"``: nothing is read until scoring touches
+    it, load time does not depend on model size, and forked workers share pages.
+    Only file sizes are checked unless ``verify`` asks for full checksums.
+    """
+    from .compiled import CompiledModel
+
+    path = os.path.join(_artifacts_dir(paths), BUNDLE_DIR)
+    with open(os.path.join(path, "manifest.json"), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    fmt, version = manifest.get("format"), manifest.get("version")
+    if fmt != BUNDLE_FORMAT or version != BUNDLE_VERSION:
+        raise ValueError(f"Unsupported bundle: {fmt} v{version}")
+    for name, info in manifest["files"].items():
+        if os.path.getsize(os.path.join(path, name)) != info["bytes"]:
+            raise ValueError(f"Bundle file {name} has unexpected size")
+    if verify:
+        verify_bundle(path)
+    return CompiledModel.load(path, mmap=True)
 
 
 def save_artifacts(
@@ -12,11 +98,16 @@ def save_artifacts(
     metrics_test: Dict[str, Any],
     thresholds: Dict[str, Any],
     paths,
+    bundle: bool = True,
 ) -> None:
+    import joblib
+
     art = paths.artifacts_dir
     os.makedirs(art, exist_ok=True)
     joblib.dump(preproc, os.path.join(art, "preprocessor.pkl"))
     joblib.dump(model, os.path.join(art, "model.pkl"))
+    if bundle:
+        save_bundle(model, thresholds.get("optimal", 0.5), art)
     with open(os.path.join(art, "metrics_cv.json"), "w", encoding="utf-8") as f:
         json.dump(metrics_cv, f, indent=2)
     with open(os.path.join(art, "metrics_test.json"), "w", encoding="utf-8") as f:
@@ -25,10 +116,15 @@ def save_artifacts(
         json.dump(thresholds, f, indent=2)
 
 
+def load_threshold(paths) -> float:
+    with open(os.path.join(_artifacts_dir(paths), "thresholds.json"), "r", encoding="utf-8") as f:
+        return float(json.load(f).get("optimal", 0.5))
+
+
 def load_artifacts(paths) -> Tuple[Any, Any, float]:
-    art = paths.artifacts_dir if hasattr(paths, "artifacts_dir") else paths["artifacts_dir"]
+    import joblib
+
+    art = _artifacts_dir(paths)
     pre = joblib.load(os.path.join(art, "preprocessor.pkl"))
     model = joblib.load(os.path.join(art, "model.pkl"))
-    with open(os.path.join(art, "thresholds.json"), "r", encoding="utf-8") as f:
-        thr = json.load(f).get("optimal", 0.5)
-    return pre, model, float(thr)
+    return pre, model, load_threshold(paths)
@@ -0,0 +1,206 @@
+from __future__ import annotations
+import json
+import os
+import resource
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+from .logging import setup_logging
+
+logger = setup_logging(name="mlc.profiling")
+
+HOOKS = ("cprofile", "tracemalloc")
+
+
+def _status_kb(field: str) -> Optional[int]:
+    try:
+        with open("/proc/self/status", "r", encoding="ascii") as f:
+            for line in f:
+                if line.startswith(field):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def rss_mb() -> float:
+    kb = _status_kb("VmRSS:")
+    return kb / 1024 if kb is not None else peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    kb = _status_kb("VmHWM:")
+    if kb is not None:
+        return kb / 1024
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024  # macOS: байты, Linux: КБ
+
+
+def reset_peak_rss() -> bool:
+    """Reset the kernel's peak-RSS counter (Linux); ``False`` if peaks are process-wide."""
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def profiled_call(fn, *args, **kwargs):
+    """Run ``fn`` (e.g. in a joblib worker) and return ``(result, stats)``."""
+    reset_peak_rss()
+    wall, cpu = time.perf_counter(), time.process_time()
+    out = fn(*args, **kwargs)
+    stats = {
+        "wall_s": time.perf_counter() - wall,
+        "cpu_s": time.process_time() - cpu,
+        "peak_rss_mb": peak_rss_mb(),
+        "pid": os.getpid(),
+    }
+    return out, stats
+
+
+class StageProfiler:
+    """Wall time, CPU time and peak RSS per named stage of a run.
+
+    ``stage()`` blocks may nest; the peak of a stage covers its children. Task
+    records from worker processes (per model and fold) are added with
+    ``add_task``. ``hook`` (``"cprofile"`` or ``"tracemalloc"``) is attached
+    to the stage named ``hook_stage`` only. A disabled profiler does nothing.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        hook: Optional[str] = None,
+        hook_stage: Optional[str] = None,
+        out_dir: Optional[str] = None,
+    ):
+        if hook is not None and hook not in HOOKS:
+            raise ValueError(f"Unknown profile hook {hook!r}; use one of {HOOKS}")
+        self.enabled = enabled
+        self.hook, self.hook_stage, self.out_dir = hook, hook_stage, out_dir
+        self.stages: List[Dict[str, Any]] = []
+        self.tasks: List[Dict[str, Any]] = []
+        self.hook_report: Dict[str, Any] = {}
+        self._stack: List[Dict[str, Any]] = []
+        self._exact_peaks = reset_peak_rss() if enabled else False
+        self._start = (time.perf_counter(), time.process_time())
+
+    def _bump_parents(self) -> None:
+        # пик ядра сбрасывается на входе/выходе стадии — родители забирают его до сброса
+        peak = peak_rss_mb()
+        for rec in self._stack:
+            rec["peak_rss_mb"] = max(rec["peak_rss_mb"], peak)
+        if self._exact_peaks:
+            reset_peak_rss()
+
+    @contextmanager
+    def stage(self, name: str, **tags: Any) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        self._bump_parents()
+        rec: Dict[str, Any] = {
+            "name": name,
+            "parent": self._stack[-1]["name"] if self._stack else None,
+            **tags,
+            "rss_start_mb": rss_mb(),
+            "peak_rss_mb": 0.0,
+        }
+        self.stages.append(rec)
+        self._stack.append(rec)
+        # хук — только на первое вхождение стадии (стадия может повторяться по моделям)
+        hook = self._start_hook() if name == self.hook_stage and not self.hook_report else None
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            rec["wall_s"] = time.perf_counter() - wall
+            rec["cpu_s"] = time.process_time() - cpu
+            if hook is not None:
+                self._stop_hook(name, hook)
+            rec["rss_end_mb"] = rss_mb()
+            self._bump_parents()
+            self._stack.pop()
+
+    def call(self, fn, *args, **kwargs):
+        """:func:`profiled_call` in this process, without losing the enclosing stage's peak."""
+        self._bump_parents()
+        out = profiled_call(fn, *args, **kwargs)
+        self._bump_parents()
+        return out
+
+    def add_task(self, stats: Dict[str, Any], **tags: Any) -> None:
+        if self.enabled:
+            self.tasks.append({**tags, **stats})
+
+    def _start_hook(self):
+        if self.hook == "cprofile":
+            import cProfile
+
+            prof = cProfile.Profile()
+            prof.enable()
+            return prof
+        import tracemalloc
+
+        tracemalloc.start(25)
+        return tracemalloc
+
+    def _stop_hook(self, name: str, hook) -> None:
+        if self.hook == "cprofile":
+            import io
+            import pstats
+
+            hook.disable()
+            report: Dict[str, Any] = {"hook": "cprofile", "stage": name}
+            if self.out_dir:
+                path = os.path.join(self.out_dir, f"profile_{name}.prof")
+                hook.dump_stats(path)
+                report["file"] = path
+            buf = io.StringIO()
+            pstats.Stats(hook, stream=buf).sort_stats("cumulative").print_stats(25)
+            report["top_cumulative"] = buf.getvalue().splitlines()
+        else:
+            snapshot = hook.take_snapshot()
+            _, peak = hook.get_traced_memory()
+            hook.stop()
+            top = snapshot.statistics("lineno")[:25]
+            report = {
+                "hook": "tracemalloc",
+                "stage": name,
+                "traced_peak_mb": peak / 2**20,
+                "top_allocations": [
+                    {"where": str(s.traceback[0]), "size_mb": s.size / 2**20, "count": s.count}
+                    for s in top
+                ],
+            }
+        self.hook_report = report
+
+    def summary(self) -> Dict[str, Any]:
+        models: Dict[str, Dict[str, float]] = {}
+        for t in self.tasks:
+            agg = models.setdefault(t.get("model", "?"), {"tasks": 0, "wall_s": 0.0, "cpu_s": 0.0})
+            agg["tasks"] += 1
+            agg["wall_s"] += t["wall_s"]
+            agg["cpu_s"] += t["cpu_s"]
+        return {
+            "total": {
+                "wall_s": time.perf_counter() - self._start[0],
+                "cpu_s": time.process_time() - self._start[1],
+                "peak_rss_mb": max([s["peak_rss_mb"] for s in self.stages] + [peak_rss_mb()]),
+            },
+            "peak_rss_scope": "stage" if self._exact_peaks else "process",
+            "stages": self.stages,
+            "models": models,
+            "tasks": self.tasks,
+            "hook": self.hook_report or None,
+        }
+
+    def save(self, path: str) -> None:
+        if not self.enabled:
+            return
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, indent=2)
+        logger.info("Profile saved to %s", path)
@@ -0,0 +1,101 @@
+"""Majority-class downsampling with the class prior restored at prediction time."""
+from __future__ import annotations
+from typing import Optional, Tuple
+import numpy as np
+from sklearn.base import BaseEstimator, ClassifierMixin, clone
+from sklearn.utils.metaestimators import available_if
+
+CORRECTIONS = ("offset", "weight")
+
+
+def _take(X, idx):
+    return X.iloc[idx] if hasattr(X, "iloc") else X[idx]
+
+
+def _has_decision(self) -> bool:
+    return hasattr(getattr(self, "estimator_", self.estimator), "decision_function")
+
+
+class DownsampledClassifier(ClassifierMixin, BaseEstimator):
+    """Fit ``estimator`` on every positive and a ``negative_rate`` share of negatives.
+
+    A model fitted on such a sample sees the odds of the positive class
+    multiplied by ``1 / negative_rate``. ``correction="offset"`` adds
+    ``log(negative_rate)`` to its log-odds (``decision_function``; the odds of
+    ``predict_proba`` are scaled by ``negative_rate``); ``"weight"`` gives the
+    kept negatives sample weight ``1 / negative_rate`` so the model learns the
+    true prior itself. Either way the outputs refer to the full class
+    distribution, so metrics, calibration and the cost threshold need no changes.
+    """
+
+    def __init__(
+        self,
+        estimator,
+        negative_rate: float = 0.1,
+        correction: str = "offset",
+        random_state: Optional[int] = None,
+    ):
+        self.estimator = estimator
+        self.negative_rate = negative_rate
+        self.correction = correction
+        self.random_state = random_state
+
+    def sample(self, X, y, sample_weight=None) -> Tuple[object, np.ndarray, Optional[np.ndarray]]:
+        """Fit rows: all positives and each negative with probability ``negative_rate``."""
+        if self.correction not in CORRECTIONS:
+            raise ValueError(f"correction must be one of {CORRECTIONS}")
+        if not 0.0 < self.negative_rate <= 1.0:
+            raise ValueError("negative_rate must be in (0, 1]")
+        y = np.asarray(y)
+        neg = y == np.unique(y)[0]
+        rng = np.random.default_rng(self.random_state)
+        idx = np.flatnonzero(~neg | (rng.random(len(y)) < self.negative_rate))
+        w = None if sample_weight is None else np.asarray(sample_weight, dtype=float)[idx]
+        if self.correction == "weight" and self.negative_rate < 1.0:
+            w = np.ones(idx.size) if w is None else w
+            w = np.where(neg[idx], w / self.negative_rate, w)
+        return _take(X, idx), y[idx], w
+
+    def fit(self, X, y, sample_weight=None):
+        X_s, y_s, w = self.sample(X, y, sample_weight)
+        fit_params = {} if w is None else {"sample_weight": w}
+        self.estimator_ = clone(self.estimator).fit(X_s, y_s, **fit_params)
+        self.classes_ = self.estimator_.classes_
+        self.n_fit_ = len(y_s)
+        return self
+
+    @property
+    def offset_(self) -> float:
+        # на сколько сдвигаются логарифмические шансы положительного класса
+        return float(np.log(self.negative_rate)) if self.correction == "offset" else 0.0
+
+    @available_if(_has_decision)
+    def decision_function(self, X) -> np.ndarray:
+        return np.ravel(self.estimator_.decision_function(X)) + self.offset_
+
+    def predict_proba(self, X) -> np.ndarray:
+        p = self.estimator_.predict_proba(X)[:, 1]
+        if self.offset_:
+            # шансы × negative_rate: то же, что сдвиг logit на offset_
+            r = self.negative_rate
+            p = r * p / (r * p + 1.0 - p)
+        return np.column_stack([1.0 - p, p])
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[(self.predict_proba(X)[:, 1] >= 0.5).astype(int)]
+
+
+def downsample(
+    model, negative_rate: float, correction: str = "offset", random_state: Optional[int] = None
+):
+    """``model`` (or the final step of a Pipeline) wrapped in :class:`DownsampledClassifier`;
+    returned as is when ``negative_rate >= 1``."""
+    from sklearn.pipeline import Pipeline
+
+    if negative_rate >= 1.0:
+        return model
+    if isinstance(model, Pipeline):
+        name, est = model.steps[-1]
+        est = downsample(est, negative_rate, correction, random_state)
+        return Pipeline(model.steps[:-1] + [(name, est)])
+    return DownsampledClassifier(model, negative_rate, correction, random_state)
@@ -0,0 +1,213 @@
+from __future__ import annotations
+import collections
+import json
+import os
+import queue
+import socketserver
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from .infer import InferenceModel
+from .logging import setup_logging
+
+logger = setup_logging(name="mlc.serving")
+
+
+class MicroBatcher:
+    """Collect concurrent single-row requests into one vectorized ``predict`` call.
+
+    A batch is flushed when it reaches ``max_batch_size`` rows or when the oldest
+    request in it has waited ``max_wait_ms``. Latency (submit -> result) of the
+    last ``window`` requests is kept for p50/p99 reporting.
+    """
+
+    def __init__(
+        self,
+        model: InferenceModel,
+        max_batch_size: int = 64,
+        max_wait_ms: float = 2.0,
+        window: int = 100_000,
+    ):
+        self.model = model
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._queue: "queue.Queue[Optional[Tuple[Dict[str, Any], Future, float]]]" = queue.Queue()
+        self._latencies: collections.deque = collections.deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._rows = 0
+        self._batches = 0
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._loop, name="mlc-microbatcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, row: Dict[str, Any]) -> Future:
+        fut: Future = Future()
+        self._queue.put((row, fut, time.perf_counter()))
+        return fut
+
+    def predict_one(
+        self, row: Dict[str, Any], timeout: Optional[float] = None
+    ) -> Tuple[float, int]:
+        return self.submit(row).result(timeout=timeout)
+
+    def _collect(self) -> Optional[List[Tuple[Dict[str, Any], Future, float]]]:
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = first[2] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(block=remaining > 0, timeout=max(remaining, 0.0))
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)  # завершимся после текущего батча
+                break
+            batch.append(item)
+        return batch
+
+    def _loop(self) -> None:
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            results: List[Any]
+            try:
+                proba, label = self.model.predict(pd.DataFrame([row for row, _, _ in batch]))
+                results = list(zip(proba.tolist(), label.tolist()))
+            except Exception:
+                # один плохой запрос не роняет батч: строки по одной, ошибка — только своим
+                results = [self._predict_row(row) for row, _, _ in batch]
+            done, n_ok = time.perf_counter(), 0
+            for (_, fut, t0), res in zip(batch, results):
+                if isinstance(res, Exception):
+                    fut.set_exception(res)
+                    continue
+                fut.set_result(res)
+                self._latencies.append(done - t0)
+                n_ok += 1
+            with self._lock:
+                self._rows += n_ok
+                self._batches += 1
+
+    def _predict_row(self, row: Dict[str, Any]) -> Any:
+        try:
+            proba, label = self.model.predict(pd.DataFrame([row]))
+        except Exception as exc:
+            return exc
+        return proba.tolist()[0], label.tolist()[0]
+
+    def stats(self) -> Dict[str, float]:
+        lat = np.asarray(self._latencies, dtype=float) * 1000.0
+        with self._lock:
+            rows, batches = self._rows, self._batches
+        elapsed = time.perf_counter() - self._started
+        return {
+            "requests": rows,
+            "batches": batches,
+            "mean_batch_size": rows / batches if batches else 0.0,
+            "p50_ms": float(np.percentile(lat, 50)) if lat.size else 0.0,
+            "p99_ms": float(np.percentile(lat, 99)) if lat.size else 0.0,
+            "throughput_rps": rows / elapsed if elapsed > 0 else 0.0,
+        }
+
+    def reset_stats(self) -> None:
+        self._latencies.clear()
+        with self._lock:
+            self._rows = self._batches = 0
+            self._started = time.perf_counter()
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive для клиентов нагрузочного теста
+    batcher: MicroBatcher
+
+    def _send(self, code: int, payload: Any) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:  # noqa: N802
+        if self.path == "/health":
+            self._send(200, {"status": "ok"})
+        elif self.path == "/stats":
+            self._send(200, self.batcher.stats())
+        else:
+            self._send(404, {"error": "not found"})
+
+    def do_POST(self) -> None:  # noqa: N802
+        if self.path != "/predict":
+            self._send(404, {"error": "not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"null")
+            rows = payload if isinstance(payload, list) else [payload]
+            if not rows or not all(isinstance(r, dict) for r in rows):
+                raise ValueError("expected a JSON object or a list of objects")
+        except ValueError as exc:
+            self._send(400, {"error": str(exc)})
+            return
+        try:
+            futures = [self.batcher.submit(r) for r in rows]
+            results = [f.result() for f in futures]
+        except Exception as exc:
+            self._send(500, {"error": str(exc)})
+            return
+        out = [{"proba": p, "label": lbl} for p, lbl in results]
+        self._send(200, out if isinstance(payload, list) else out[0])
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+class _ThreadingTCPHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # много одновременных клиентов при нагрузочном тесте
+
+
+class _ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def get_request(self):
+        request, _ = super().get_request()
+        return request, ("unix", 0)
+
+
+def make_server(
+    model: InferenceModel,
+    host: str = "127.0.0.1",
+    port: int = 8080,
+    unix_socket: Optional[str] = None,
+    max_batch_size: int = 64,
+    max_wait_ms: float = 2.0,
+):
+    """HTTP (or HTTP over a Unix socket) server with ``/predict``, ``/stats`` and ``/health``.
+
+    Returns ``(server, batcher)``; call ``server.serve_forever()`` to run and
+    ``server.server_close(); batcher.close()`` to stop.
+    """
+    batcher = MicroBatcher(model, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+    handler = type("Handler", (_Handler,), {"batcher": batcher})
+    server: socketserver.BaseServer
+    if unix_socket:
+        if os.path.exists(unix_socket):
+            os.unlink(unix_socket)
+        server = _ThreadingUnixHTTPServer(unix_socket, handler)
+    else:
+        server = _ThreadingTCPHTTPServer((host, port), handler)
+    return server, batcher
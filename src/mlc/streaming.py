@@ -0,0 +1,469 @@
+"""Out-of-core training for data that does not fit in RAM.
+
+``data.path`` (CSV or Parquet/Arrow files) is read in chunks of
+``streaming.chunksize`` rows several times (``data.kind: synthetic`` yields
+the blocks of :class:`~mlc.synthetic.SyntheticGenerator` instead):
+
+1. statistics pass — per-column moments, a quantile sketch for the median,
+   category counts and class counts (the fitted state of
+   :func:`~mlc.features.build_preprocessor`), a reservoir sample of train rows
+   (plus one of holdout rows for ``--update`` with ``incremental.reservoir``);
+   holdout rows are written to ``artifacts/test.*``;
+2. ``streaming.epochs`` training passes — every ``partial_fit`` model and one
+   clone per (repeat, fold) learn chunk by chunk;
+3. evaluation pass — OOF and holdout scores go into
+   :class:`~mlc.metrics.StreamingMetrics` accumulators.
+
+Each row gets its holdout flag and CV folds inside its chunk, stratified by
+class and seeded by (random_state, chunk number), so every pass sees the same
+split. Calibrators and the cost threshold are fitted on OOF scores of the
+reservoir. Peak memory is O(chunksize + reservoir_size), not O(rows).
+"""
+from __future__ import annotations
+import os
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from .config import Config
+from .data import COLUMNAR_FORMATS, ChunkWriter
+from .logging import setup_logging
+
+logger = setup_logging(name="mlc.streaming")
+
+TEST = -1  # номер «фолда» у строк hold-out
+
+
+def iter_chunks(
+    cfg: Config, chunksize: Optional[int] = None
+) -> Iterator[Tuple[pd.DataFrame, np.ndarray]]:
+    """``(X, y)`` chunks of ``cfg.data`` in file order; the same chunks on every call.
+
+    Synthetic data come in generator blocks of ``data.chunk_rows`` rows."""
+    from .data import _csv_files, _feature_columns, iter_columnar
+
+    d, size = cfg.data, chunksize or cfg.streaming.chunksize
+    if d.kind == "synthetic":
+        from .synthetic import SyntheticGenerator
+
+        for X, y in SyntheticGenerator(d, cfg.random_state).iter_blocks():
+            yield X, y.to_numpy()
+        return
+    if d.kind == "csv" and d.path:
+        chunks: Iterator[pd.DataFrame] = (
+            chunk
+            for path in _csv_files(d.path)
+            for chunk in pd.read_csv(path, usecols=_feature_columns(cfg), chunksize=size)
+        )
+    elif d.kind in COLUMNAR_FORMATS and d.path:
+        chunks = iter_columnar(
+            d.path,
+            d.kind,
+            columns=_feature_columns(cfg),
+            float32=d.float32,
+            keep=(d.target,),
+            batch_size=size,
+        )
+    else:
+        raise ValueError(
+            "Out-of-core training needs data.path with data.kind 'csv'/'parquet'/'arrow'"
+        )
+    for df in chunks:
+        yield df.drop(columns=[d.target]), df[d.target].to_numpy()
+
+
+class QuantileSketch:
+    """Mergeable quantile sketch of a stream of floats (KLL-style compactors).
+
+    Level ``h`` holds items of weight ``2**h``; a level with more than ``k``
+    items is sorted and every other item (random offset) moves one level up.
+    Memory is O(k log(n / k)); the rank error is a few ``n / k`` (random offsets
+    make the errors of compactions cancel). Up to ``k`` values it is exact. NaN
+    is skipped.
+    """
+
+    def __init__(self, k: int = 2048, seed: int = 0):
+        self.k = k
+        self.n = 0
+        self._levels: List[np.ndarray] = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values) -> "QuantileSketch":
+        v = np.asarray(values, dtype=float).ravel()
+        v = v[~np.isnan(v)]
+        self.n += v.size
+        self._levels[0] = np.concatenate([self._levels[0], v])
+        self._compress()
+        return self
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        for h, items in enumerate(other._levels):
+            if h == len(self._levels):
+                self._levels.append(np.empty(0))
+            self._levels[h] = np.concatenate([self._levels[h], items])
+        self.n += other.n
+        self._compress()
+        return self
+
+    def _compress(self) -> None:
+        h = 0
+        while h < len(self._levels):
+            items = self._levels[h]
+            if items.size > self.k:
+                items = np.sort(items)
+                # при нечётном числе наименьшее значение остаётся на своём уровне
+                odd = items.size % 2
+                self._levels[h] = items[:odd]
+                if h + 1 == len(self._levels):
+                    self._levels.append(np.empty(0))
+                up = items[odd + int(self._rng.integers(2)) :: 2]
+                self._levels[h + 1] = np.concatenate([self._levels[h + 1], up])
+            h += 1
+
+    def quantile(self, q: float) -> float:
+        if self.n == 0:
+            return float("nan")
+        if all(lv.size == 0 for lv in self._levels[1:]):
+            return float(np.quantile(self._levels[0], q))  # ничего не сжато — точное значение
+        items = np.concatenate(self._levels)
+        weights = np.concatenate([np.full(lv.size, 2.0**h) for h, lv in enumerate(self._levels)])
+        order = np.argsort(items, kind="stable")
+        cum = np.cumsum(weights[order])
+        return float(items[order][np.searchsorted(cum, q * cum[-1])])
+
+
+class StreamingStats:
+    """Imputer / scaler / one-hot statistics of :func:`~mlc.features.build_preprocessor`,
+    accumulated chunk by chunk; ``merge`` combines partial results (e.g. per file)."""
+
+    def __init__(
+        self, num_cols: Sequence[str], cat_cols: Sequence[str], sketch_k: int = 2048, seed: int = 0
+    ):
+        self.num_cols, self.cat_cols = list(num_cols), list(cat_cols)
+        n = len(self.num_cols)
+        self.count = np.zeros(n)  # непустые значения
+        self.mean = np.zeros(n)
+        self.m2 = np.zeros(n)  # сумма квадратов отклонений от среднего
+        self.missing = np.zeros(n)
+        self.sketches = [QuantileSketch(sketch_k, seed=seed + j) for j in range(n)]
+        self.cat_counts: List[Dict[Any, int]] = [{} for _ in self.cat_cols]
+        self.n_rows = 0
+
+    def _merge_moments(self, count, mean, m2, missing) -> None:
+        # формула Чана для объединения (n, среднее, M2) двух частей
+        total = self.count + count
+        delta = mean - self.mean
+        share = np.divide(count, total, out=np.zeros_like(total), where=total > 0)
+        self.m2 = self.m2 + m2 + delta**2 * self.count * share
+        self.mean = self.mean + delta * share
+        self.count = total
+        self.missing = self.missing + missing
+
+    def update(self, X: pd.DataFrame) -> "StreamingStats":
+        if self.num_cols:
+            V = X[self.num_cols].to_numpy(dtype=float)
+            nan = np.isnan(V)
+            count = (~nan).sum(axis=0).astype(float)
+            total = np.where(nan, 0.0, V).sum(axis=0)
+            mean = np.divide(total, count, out=np.zeros_like(total), where=count > 0)
+            m2 = (np.where(nan, 0.0, V - mean) ** 2).sum(axis=0)
+            self._merge_moments(count, mean, m2, nan.sum(axis=0))
+            for j, sketch in enumerate(self.sketches):
+                sketch.update(V[:, j])
+        for counts, c in zip(self.cat_counts, self.cat_cols):
+            vc = X[c].value_counts()
+            for value, n in vc[vc > 0].items():
+                counts[value] = counts.get(value, 0) + int(n)
+        self.n_rows += len(X)
+        return self
+
+    def merge(self, other: "StreamingStats") -> "StreamingStats":
+        self._merge_moments(other.count, other.mean, other.m2, other.missing)
+        for sketch, o in zip(self.sketches, other.sketches):
+            sketch.merge(o)
+        for counts, other_counts in zip(self.cat_counts, other.cat_counts):
+            for value, n in other_counts.items():
+                counts[value] = counts.get(value, 0) + n
+        self.n_rows += other.n_rows
+        return self
+
+    def medians(self) -> np.ndarray:
+        return np.array([s.quantile(0.5) for s in self.sketches])
+
+    def modes(self) -> List[Any]:
+        # как SimpleImputer(most_frequent): при равенстве — наименьшее значение
+        out = []
+        for counts in self.cat_counts:
+            top = max(counts.values(), default=0)
+            out.append(min((v for v, n in counts.items() if n == top), default=np.nan))
+        return out
+
+    def categories(self) -> List[np.ndarray]:
+        return [np.array(sorted(counts), dtype=object) for counts in self.cat_counts]
+
+    def scaler_moments(self, fill: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Mean and (population) variance after the missing values are imputed with ``fill``."""
+        n = self.count + self.missing
+        mean = (self.count * self.mean + self.missing * fill) / n
+        m2 = self.m2 + self.count * (self.mean - mean) ** 2 + self.missing * (fill - mean) ** 2
+        return mean, m2 / n
+
+
+def streaming_preprocessor(stats: StreamingStats, sample: pd.DataFrame, cfg=None):
+    """:func:`~mlc.features.build_preprocessor` with the fitted state taken from ``stats``.
+
+    The transformer is fitted on ``sample`` (e.g. the reservoir) to set up its
+    structure, then medians, modes and scaler moments are replaced by the
+    whole-data statistics; one-hot vocabularies are the full ones from the start.
+    """
+    from .features import build_preprocessor
+
+    pre = build_preprocessor(
+        sample,
+        cfg,
+        num_cols=stats.num_cols,
+        cat_cols=stats.cat_cols,
+        categories=stats.categories() if stats.cat_cols else None,
+    )
+    pre.fit(sample)
+    if stats.num_cols:
+        num = pre.named_transformers_["num"]
+        median = stats.medians()
+        mean, var = stats.scaler_moments(median)
+        # постоянные колонки не масштабируются, как в StandardScaler
+        constant = var <= 10 * np.finfo(np.float64).eps * mean**2
+        num["imputer"].statistics_ = median
+        scaler = num["scaler"]
+        scaler.mean_, scaler.var_ = mean, var
+        scaler.scale_ = np.where(constant | (var == 0), 1.0, np.sqrt(var))
+        scaler.n_samples_seen_ = (stats.count + stats.missing).astype(np.int64)
+    if stats.cat_cols:
+        pre.named_transformers_["cat"]["imputer"].statistics_ = np.array(
+            stats.modes(), dtype=object
+        )
+    return pre
+
+
+def assign_folds(
+    y, n_splits: int, n_repeats: int, test_size: float, seed: int, chunk: int
+) -> np.ndarray:
+    """``(n_repeats, len(y))`` CV fold of every row of one chunk, ``TEST`` for holdout rows.
+
+    Within each class a ``test_size`` share of the chunk (randomly rounded) is
+    held out in every repeat; the rest is dealt round-robin over the folds from a
+    random start, so each fold gets the chunk's class mix up to one row per class.
+    """
+    y = np.asarray(y)
+    classes = np.unique(y)
+    rng = np.random.default_rng([seed, chunk])
+    test = np.zeros(len(y), dtype=bool)
+    for c in classes:
+        idx = np.flatnonzero(y == c)
+        n_test = int(test_size * idx.size + rng.random())
+        test[rng.choice(idx, n_test, replace=False)] = True
+    folds = np.full((n_repeats, len(y)), TEST, dtype=np.int16)
+    for r in range(n_repeats):
+        rng_r = np.random.default_rng([seed, chunk, r + 1])
+        for c in classes:
+            idx = rng_r.permutation(np.flatnonzero((y == c) & ~test))
+            folds[r, idx] = (rng_r.integers(n_splits) + np.arange(idx.size)) % n_splits
+    return folds
+
+
+class _HoldoutWriter(ChunkWriter):
+    # hold-out дописывается по чанкам в artifacts/test.csv | test.parquet | test.arrow
+    def __init__(self, art: str, kind: str):
+        ext = COLUMNAR_FORMATS[kind][1] if kind in COLUMNAR_FORMATS else ".csv"
+        super().__init__(os.path.join(art, "test" + ext), kind)
+
+
+def _partial_fit_models(cfg: Config, class_counts: Dict[int, int]):
+    from sklearn.base import clone
+    from .models import build_model
+
+    n = sum(class_counts.values())
+    models = {}
+    for spec in cfg.models:
+        name = spec.get("name", spec.get("type"))
+        model = build_model(spec, cfg.random_state)
+        if not hasattr(model, "partial_fit"):
+            logger.warning("Skipping %s: %s has no partial_fit", name, type(model).__name__)
+            continue
+        if model.get_params().get("class_weight") == "balanced":
+            # partial_fit не принимает "balanced" — те же веса по классам всего файла
+            weights = {c: n / (len(class_counts) * k) for c, k in class_counts.items()}
+            model.set_params(class_weight=weights)
+        models[name] = model
+    if not models:
+        raise ValueError(
+            "Out-of-core training needs at least one model with partial_fit (e.g. type 'sgd')"
+        )
+    cv = cfg.validation.cv
+    folds = {
+        name: {(r, f): clone(m) for r in range(cv.n_repeats) for f in range(cv.n_splits)}
+        for name, m in models.items()
+    }
+    return models, folds
+
+
+def run_streaming_training(cfg: Config) -> None:
+    """Out-of-core counterpart of :func:`~mlc.trainer.run_training` (same artifacts)."""
+    from sklearn.pipeline import Pipeline
+    from .calibration import OOFCalibratedClassifier
+    from .cost import expected_cost, optimal_threshold
+    from .features import _infer_columns
+    from .incremental import reservoir_update, save_reservoir
+    from .metrics import StreamingMetrics, bootstrap_metrics
+    from .persistence import save_artifacts
+    from .plots import plot_calibration, plot_cost_curve, plot_pr_curve
+    from .profiling import StageProfiler
+
+    rt, st, cv = cfg.runtime, cfg.streaming, cfg.validation.cv
+    art = cfg.paths.artifacts_dir
+    os.makedirs(art, exist_ok=True)
+    prof = StageProfiler(
+        enabled=rt.profile, hook=rt.profile_hook, hook_stage=rt.profile_stage, out_dir=art
+    )
+
+    def split(chunk, y):
+        return assign_folds(
+            y, cv.n_splits, cv.n_repeats, cfg.data.test_size, cfg.random_state, chunk
+        )
+
+    # 1. статистики препроцессора, классы, резервуары train- и hold-out строк, hold-out на диск
+    stats, reservoir, heldout = None, None, None
+    class_counts: Dict[int, int] = {}
+    holdout = _HoldoutWriter(art, cfg.data.kind)
+    with prof.stage("stats"):
+        for i, (X, y) in enumerate(iter_chunks(cfg)):
+            folds = split(i, y)
+            train = folds[0] != TEST
+            if stats is None:
+                stats = StreamingStats(
+                    *_infer_columns(X), sketch_k=st.sketch_k, seed=cfg.random_state
+                )
+            stats.update(X[train])
+            for c, k in zip(*np.unique(y[train], return_counts=True)):
+                class_counts[int(c)] = class_counts.get(int(c), 0) + int(k)
+            # фолды едут вместе с меткой: OOF-скоры резервуара для калибровки
+            reservoir = reservoir_update(
+                reservoir,
+                X[train],
+                np.column_stack([y[train], folds[:, train].T]),
+                cfg.incremental.reservoir_size,
+                seed=cfg.random_state,
+            )
+            if cfg.incremental.reservoir:  # для будущих --update: строки, не видевшие обучения
+                heldout = reservoir_update(
+                    heldout,
+                    X[~train],
+                    y[~train],
+                    cfg.incremental.reservoir_size,
+                    seed=cfg.random_state,
+                )
+            test_df = X[~train].copy()
+            test_df[cfg.data.target] = y[~train]
+            holdout.write(test_df)
+        holdout.close()
+    if stats is None:
+        raise ValueError(f"No rows in {cfg.data.path}")
+    n_chunks = i + 1
+    logger.info(
+        "Statistics pass: %d train rows in %d chunks, classes %s; holdout -> %s",
+        stats.n_rows,
+        n_chunks,
+        class_counts,
+        holdout.path,
+    )
+    X_res, y_res, fold_res = reservoir["X"], reservoir["y"][:, 0], reservoir["y"][:, 1:].T
+    pre = streaming_preprocessor(stats, X_res, cfg)
+    models, fold_models = _partial_fit_models(cfg, class_counts)
+    classes = np.array(sorted(class_counts))
+
+    # 2. partial_fit: итоговая модель и по клону на каждый (повтор, фолд)
+    for epoch in range(st.epochs):
+        with prof.stage("train_epoch", epoch=epoch):
+            for i, (X, y) in enumerate(iter_chunks(cfg)):
+                folds = split(i, y)
+                train = folds[0] != TEST
+                Xt, y, folds = pre.transform(X[train]), y[train], folds[:, train]
+                for name, model in models.items():
+                    model.partial_fit(Xt, y, classes=classes)
+                    for (r, f), m in fold_models[name].items():
+                        keep = folds[r] != f
+                        m.partial_fit(Xt[keep], y[keep], classes=classes)
+
+    def oof(name, Xt, folds) -> np.ndarray:
+        # (n_repeats, n) P(y=1) от модели фолда, не видевшей строку
+        out = np.full(folds.shape, np.nan)
+        for (r, f), m in fold_models[name].items():
+            rows = np.flatnonzero(folds[r] == f)
+            if rows.size:
+                out[r, rows] = m.predict_proba(Xt[rows])[:, 1]
+        return out
+
+    # калибратор и порог — по OOF-скорам резервуара (равномерная выборка train)
+    cals, thresholds, res_oof = {}, {}, {}
+    with prof.stage("calibration"):
+        Xt_res = pre.transform(X_res)
+        for name, model in models.items():
+            res_oof[name] = oof(name, Xt_res, fold_res)
+            pipe = Pipeline([("preprocess", pre), ("model", model)])
+            cals[name] = OOFCalibratedClassifier(pipe, method=cfg.calibration.method, prefit=True)
+            cals[name].fit(None, y_res, res_oof[name])
+            proba_res = np.nanmean(cals[name].calibrate_proba(res_oof[name]), axis=0)
+            thresholds[name] = optimal_threshold(y_res, proba_res, cfg.cost.fn, cfg.cost.fp)[0]
+
+    # 3. OOF и hold-out метрики всех моделей за один проход
+    k = cfg.reports.pr_k
+    hist_oof = {name: StreamingMetrics(st.n_bins, k=k) for name in models}
+    hist_test = {name: StreamingMetrics(st.n_bins, thresholds[name], k=k) for name in models}
+    with prof.stage("evaluate"):
+        for i, (X, y) in enumerate(iter_chunks(cfg)):
+            folds = split(i, y)
+            train = folds[0] != TEST
+            Xt = pre.transform(X)
+            for name, model in models.items():
+                hist_oof[name].update(
+                    y[train], np.nanmean(oof(name, Xt[train], folds[:, train]), axis=0)
+                )
+                if (~train).any():
+                    proba = cals[name].calibrate_proba(model.predict_proba(Xt[~train])[:, 1])
+                    hist_test[name].update(y[~train], proba)
+
+    metrics_cv: Dict[str, Dict[str, Any]] = {}
+    for name in models:
+        proba = np.nanmean(res_oof[name], axis=0)
+        with prof.stage("bootstrap", model=name):
+            # CI — по резервуару: бутстрап всего потока не помещается в память
+            boot = bootstrap_metrics(
+                y_res, proba, n_boot=400, seed=cfg.random_state, n_jobs=rt.n_jobs
+            )
+        metrics_cv[name] = {
+            "oof": hist_oof[name].metrics(),
+            "ci": {f"{metric}_ci": ci for metric, ci in boot.items()},
+        }
+    best = max(metrics_cv, key=lambda name: metrics_cv[name]["oof"]["pr_auc"])
+    best_thr = thresholds[best]
+    logger.info("Selected best model: %s (PR-AUC=%.4f)", best, metrics_cv[best]["oof"]["pr_auc"])
+    logger.info("Best threshold by cost: %.3f", best_thr)
+
+    with prof.stage("plots"):
+        proba = np.nanmean(res_oof[best], axis=0)
+        plot_pr_curve(y_res, proba, os.path.join(art, "pr_curve.png"))
+        plot_calibration(y_res, proba, os.path.join(art, "calibration_curve.png"))
+        proba_cal = np.nanmean(cals[best].calibrate_proba(res_oof[best]), axis=0)
+        thr_grid = np.linspace(0.0, 1.0, 1001)
+        _, cost_curve = expected_cost(y_res, proba_cal, cfg.cost.fn, cfg.cost.fp, thr_grid)
+        plot_cost_curve(cost_curve, os.path.join(art, "cost_vs_threshold.png"))
+
+    with prof.stage("save_artifacts"):
+        save_artifacts(
+            preproc=pre,
+            model=cals[best],
+            metrics_cv=metrics_cv,
+            metrics_test=hist_test[best].metrics(),
+            thresholds={"optimal": best_thr, "fixed_0_5": 0.5},
+            paths=cfg.paths,
+        )
+        save_reservoir(heldout, art)
+    prof.save(os.path.join(art, "profile.json"))
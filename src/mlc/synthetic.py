@@ -0,0 +1,211 @@
+"""Deterministic chunked generator of imbalanced synthetic data.
+
+Rows follow the model of :func:`sklearn.datasets.make_classification`: Gaussian
+clusters at hypercube vertices of the informative subspace, redundant linear
+combinations, repeated and noise features, shuffled columns and ``flip_y``
+label noise. The global structure is drawn once from the seed (plus a pilot
+sample of ``PILOT_ROWS`` rows for the ``cat_bin`` edges, a fixed cost of every
+generator), while every block of ``data.chunk_rows`` rows comes from its own
+generators ``(seed, block, variable)``: blocks are independent, can be produced
+in parallel or written as separate shards, and the data do not depend on how
+they are split. Each random variable of a block has its own stream, so a
+shorter block is a prefix of the full one: only the rows up to ``n_samples``
+are generated, and the first N rows are the same for any ``n_samples >= N``.
+On top come
+``cat_bin`` (quartile of ``x00``), ``data.n_high_card`` Zipf-distributed
+high-cardinality categoricals whose levels shift the class odds, and missing
+values (MCAR) at ``data.missing_rate`` in every feature.
+"""
+from __future__ import annotations
+import os
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from .config import DataConfig
+from .logging import setup_logging
+
+logger = setup_logging(name="mlc.synthetic")
+
+CLASS_SEP = 1.0  # как в make_classification по умолчанию
+FLIP_Y = 0.01
+ZIPF_EXPONENT = 1.1  # частота уровня ~ 1 / rank**a
+PILOT_ROWS = 20_000  # строк для границ квартилей cat_bin
+
+# потоки случайных чисел: (seed, 0, номер блока) — строки, (seed, 1, ...) — общая структура
+_BLOCK, _STRUCTURE, _PILOT = (0,), (1, 0), (1, 1)
+# внутри блока у каждой величины свой поток: первые k её значений не зависят от числа строк
+_Y, _CLUSTER, _Z, _NOISE, _MISSING, _FLIP, _FLIP_TO, _HIGH_CARD = range(8)
+
+
+def _rng(seed: int, *stream: int) -> np.random.Generator:
+    return np.random.default_rng([seed, *stream])
+
+
+def _class_weights(d: DataConfig) -> np.ndarray:
+    w = list(d.weights) if d.weights else [1.0 / d.n_classes] * d.n_classes
+    if len(w) == d.n_classes - 1:  # как sklearn: вес последнего класса — остаток
+        w.append(1.0 - sum(w))
+    if len(w) != d.n_classes:
+        raise ValueError("data.weights must have n_classes or n_classes - 1 entries")
+    weights = np.asarray(w, dtype=float)
+    return weights / weights.sum()
+
+
+class SyntheticGenerator:
+    """Blocks of ``data.chunk_rows`` rows of the synthetic dataset for ``seed``."""
+
+    def __init__(self, data: DataConfig, seed: int = 0):
+        d = data
+        n_inf, n_red, n_rep = d.n_informative, d.n_redundant, d.n_repeated
+        if n_inf + n_red + n_rep > d.n_features:
+            raise ValueError("n_informative + n_redundant + n_repeated must be <= n_features")
+        if d.chunk_rows < 1:
+            raise ValueError("data.chunk_rows must be positive")
+        self.data, self.seed = d, seed
+        self.weights = _class_weights(d)
+        rng = _rng(seed, *_STRUCTURE)
+
+        # кластер k относится к классу k % n_classes; центры — разные вершины гиперкуба
+        n_clusters = d.n_classes * d.n_clusters_per_class
+        if n_inf < 31:
+            vertex = rng.choice(2**n_inf, n_clusters, replace=n_clusters > 2**n_inf)
+            bits = (vertex[:, None] >> np.arange(n_inf)) & 1
+        else:
+            bits = rng.integers(0, 2, (n_clusters, n_inf))
+        self.centroids = (2.0 * bits - 1.0) * CLASS_SEP
+        self.transforms = 2.0 * rng.random((n_clusters, n_inf, n_inf)) - 1.0
+        self.redundant = 2.0 * rng.random((n_inf, n_red)) - 1.0
+        self.repeated = rng.integers(0, max(n_inf + n_red, 1), n_rep)
+        self.permutation = rng.permutation(d.n_features)
+
+        # высококардинальные: Ципф по случайной перестановке уровней, сдвиг шансов по классу
+        levels = d.high_card_levels
+        zipf = 1.0 / np.arange(1, levels + 1) ** ZIPF_EXPONENT
+        self.high_card_cdf = []
+        for _ in range(d.n_high_card):
+            base = zipf[rng.permutation(levels)]
+            effect = np.vstack([np.zeros(levels), rng.normal(size=(d.n_classes - 1, levels))])
+            p = base * np.exp(effect)
+            self.high_card_cdf.append(np.cumsum(p / p.sum(axis=1, keepdims=True), axis=1))
+        width = len(str(max(levels - 1, 0)))
+        self.levels = pd.Index([f"L{i:0{width}d}" for i in range(levels)])
+
+        pilot, _ = self._sample(_PILOT, PILOT_ROWS)
+        self.cat_edges = np.quantile(pilot[:, 0], [0.25, 0.5, 0.75])
+
+    @property
+    def n_blocks(self) -> int:
+        return -(-self.data.n_samples // self.data.chunk_rows)
+
+    @property
+    def columns(self) -> List[str]:
+        d = self.data
+        hc = [f"hc{j:02d}" for j in range(d.n_high_card)]
+        return [f"x{i:02d}" for i in range(d.n_features)] + ["cat_bin"] + hc
+
+    def _sample(self, stream: Tuple[int, ...], n: int) -> Tuple[np.ndarray, np.ndarray]:
+        # числовые признаки (в порядке колонок) и истинные классы
+        d = self.data
+        n_inf, n_red, n_rep = d.n_informative, d.n_redundant, d.n_repeated
+        y = _rng(self.seed, *stream, _Y).choice(d.n_classes, size=n, p=self.weights)
+        shift = _rng(self.seed, *stream, _CLUSTER).integers(0, d.n_clusters_per_class, n)
+        cluster = y + d.n_classes * shift
+        z = _rng(self.seed, *stream, _Z).standard_normal((n, n_inf))
+        X = np.empty((n, d.n_features))
+        for k in range(len(self.centroids)):
+            m = cluster == k
+            X[m, :n_inf] = z[m] @ self.transforms[k] + self.centroids[k]
+        X[:, n_inf : n_inf + n_red] = X[:, :n_inf] @ self.redundant
+        X[:, n_inf + n_red : n_inf + n_red + n_rep] = X[:, self.repeated]
+        n_noise = d.n_features - n_inf - n_red - n_rep
+        X[:, d.n_features - n_noise :] = _rng(self.seed, *stream, _NOISE).standard_normal(
+            (n, n_noise)
+        )
+        return X[:, self.permutation], y
+
+    def block(self, b: int) -> Tuple[pd.DataFrame, pd.Series]:
+        """Rows ``[b * chunk_rows, (b + 1) * chunk_rows)`` as ``(X, y)``."""
+        d = self.data
+        if not 0 <= b < self.n_blocks:
+            raise IndexError(f"block {b} out of range [0, {self.n_blocks})")
+        # только нужные строки: короткий блок — префикс полного (свой поток у каждой величины)
+        n = min(d.chunk_rows, d.n_samples - b * d.chunk_rows)
+        stream = (*_BLOCK, b)
+        X_num, y_true = self._sample(stream, n)
+        cols: Dict[str, Any] = {f"x{i:02d}": X_num[:, i] for i in range(d.n_features)}
+        quartile = np.searchsorted(self.cat_edges, X_num[:, 0], side="right")
+        cols["cat_bin"] = pd.Categorical.from_codes(quartile, pd.Index(["a", "b", "c", "d"]))
+        for j, cdf in enumerate(self.high_card_cdf):
+            codes = np.empty(n, dtype=np.int64)
+            u = _rng(self.seed, *stream, _HIGH_CARD + j).random(n)
+            for c in range(d.n_classes):
+                m = y_true == c
+                codes[m] = np.minimum(np.searchsorted(cdf[c], u[m]), len(self.levels) - 1)
+            cols[f"hc{j:02d}"] = pd.Categorical.from_codes(codes, self.levels)
+        X = pd.DataFrame(cols, index=pd.RangeIndex(b * d.chunk_rows, b * d.chunk_rows + n))
+        if d.missing_rate > 0:
+            miss = _rng(self.seed, *stream, _MISSING).random((n, X.shape[1])) < d.missing_rate
+            for i, c in enumerate(X.columns):
+                if miss[:, i].any():
+                    X[c] = X[c].mask(miss[:, i])
+        # шум меток — после признаков: признаки отражают истинный класс
+        flip = _rng(self.seed, *stream, _FLIP).random(n) < FLIP_Y
+        flip_to = _rng(self.seed, *stream, _FLIP_TO).integers(0, d.n_classes, n)
+        y = pd.Series(np.where(flip, flip_to, y_true), index=X.index, name=d.target)
+        return X, y
+
+    def iter_blocks(
+        self, blocks: Optional[Iterable[int]] = None
+    ) -> Iterator[Tuple[pd.DataFrame, pd.Series]]:
+        for b in range(self.n_blocks) if blocks is None else blocks:
+            yield self.block(b)
+
+    def generate(self) -> Tuple[pd.DataFrame, pd.Series]:
+        """The whole dataset in memory (row index ``0..n_samples-1``)."""
+        parts = list(self.iter_blocks())
+        X = pd.concat([p[0] for p in parts])
+        y = pd.concat([p[1] for p in parts])
+        return X, y
+
+
+def _write_shard(gen: SyntheticGenerator, blocks: range, path: str, kind: str) -> int:
+    from .data import ChunkWriter
+
+    n = 0
+    with ChunkWriter(path, kind) as w:
+        for X, y in gen.iter_blocks(blocks):
+            w.write(X.assign(**{str(y.name): y.to_numpy()}))
+            n += len(X)
+    return n
+
+
+def write_shards(
+    data: DataConfig,
+    seed: int,
+    out_dir: str,
+    kind: str = "parquet",
+    blocks_per_shard: int = 1,
+    n_jobs: int = 1,
+) -> List[str]:
+    """Write the dataset as ``part-00000.<ext>``, ... (``blocks_per_shard`` blocks each).
+
+    Shards are generated independently by ``n_jobs`` processes and hold at most
+    one block in memory each; Parquet shards get one row group per block. The
+    directory (or a glob over it) is read back by ``data.kind: parquet|arrow|csv``.
+    """
+    from joblib import Parallel, delayed
+    from .data import COLUMNAR_FORMATS
+
+    gen = SyntheticGenerator(data, seed)
+    ext = COLUMNAR_FORMATS[kind][1] if kind in COLUMNAR_FORMATS else ".csv"
+    os.makedirs(out_dir, exist_ok=True)
+    shards = [
+        range(s, min(s + blocks_per_shard, gen.n_blocks))
+        for s in range(0, gen.n_blocks, blocks_per_shard)
+    ]
+    paths = [os.path.join(out_dir, f"part-{i:05d}{ext}") for i in range(len(shards))]
+    Parallel(n_jobs=n_jobs)(
+        delayed(_write_shard)(gen, blocks, path, kind) for blocks, path in zip(shards, paths)
+    )
+    logger.info("Wrote %d rows to %d %s shards in %s", data.n_samples, len(paths), kind, out_dir)
+    return paths
@@ -1,103 +1,231 @@
 from __future__ import annotations
 import os
+from typing import Any, Dict
 import numpy as np
 from sklearn.pipeline import Pipeline
-from sklearn.metrics import average_precision_score, roc_auc_score, brier_score_loss
 from .config import Config
 from .data import make_dataset, train_test_split_stratified
-from .features import build_preprocessor
-from .models import build_model
-from .validation import make_cv, oof_predict
-from .calibration import calibrate
-from .metrics import compute_metrics, bootstrap_ci
-from .cost import expected_cost
-from .plots import plot_pr_curve, plot_calibration, plot_cost_curve
+from .features import CompactEncoder, build_preprocessor, categorical_features
+from .models import NATIVE_CATEGORICAL, SPARSE_INPUT, build_model
+from .sampling import downsample
+from .validation import average_repeats, make_cv, oof_predict_many, race_models
+from .calibration import OOFCalibratedClassifier, calibrate
+from .metrics import compute_metrics, bootstrap_metrics
+from .cost import expected_cost, optimal_threshold
 from .persistence import save_artifacts
+from .profiling import StageProfiler
+from .incremental import reservoir_update, save_reservoir
 from .logging import setup_logging
 
 logger = setup_logging(name="mlc.trainer")
 
 
 def _aggregate(results):
-    return {r["name"]: {"oof": r["oof"], "ci": r["ci"]} for r in results}
+    out = {}
+    for r in results:
+        out[r["name"]] = {"oof": r["oof"], "ci": r["ci"]}
+        if r.get("race"):
+            out[r["name"]]["race"] = r["race"]
+    return out
 
 
 def run_training(cfg: Config) -> None:
-    X, y = make_dataset(cfg)
-    X_tr, X_te, y_tr, y_te = train_test_split_stratified(
-        X,
-        y,
-        test_size=cfg.data.test_size,
-        random_state=cfg.random_state,
-        artifacts_dir=cfg.paths.artifacts_dir,
+    if cfg.streaming.enabled:
+        from .streaming import run_streaming_training  # данные больше RAM: обучение по чанкам
+
+        return run_streaming_training(cfg)
+    rt = cfg.runtime
+    prof = StageProfiler(
+        enabled=rt.profile,
+        hook=rt.profile_hook,
+        hook_stage=rt.profile_stage,
+        out_dir=cfg.paths.artifacts_dir,
     )
+    os.makedirs(cfg.paths.artifacts_dir, exist_ok=True)
 
-    preproc = build_preprocessor(X_tr, cfg)
+    with prof.stage("data"):
+        X, y = make_dataset(cfg)
+    with prof.stage("split"):
+        X_tr, X_te, y_tr, y_te = train_test_split_stratified(
+            X,
+            y,
+            test_size=cfg.data.test_size,
+            random_state=cfg.random_state,
+            artifacts_dir=cfg.paths.artifacts_dir,
+            kind=cfg.data.kind,
+        )
+    del X, y  # сплиты — копии, полная таблица больше не нужна
 
-    results = []
+    encoder, X_fit = None, X_tr
+    if rt.compact:
+        # признаки один раз -> float32-матрица; в фолды уходят только индексы строк
+        with prof.stage("compact_encode"):
+            encoder = CompactEncoder().fit(X_tr)
+            X_fit = encoder.transform(X_tr)
+        logger.info(
+            "Compact features: %.1f MB -> %.1f MB",
+            X_tr.memory_usage(deep=True).sum() / 2**20,
+            X_fit.nbytes / 2**20,
+        )
+        del X_tr  # дальше обучение идёт только по компактной матрице
+        preproc = build_preprocessor(
+            X_fit, cfg, num_cols=encoder.num_idx_, cat_cols=encoder.cat_idx_, compact=True
+        )
+    else:
+        preproc = build_preprocessor(X_tr, cfg)
+
+    pipes = {}
+    smp = cfg.sampling
     for spec in cfg.models:
-        model = build_model(spec, cfg.random_state)
-        pipe = Pipeline([("preprocess", preproc), ("model", model)])
-        cv = make_cv(cfg)
-        oof_proba, oof_idx = oof_predict(pipe, X_tr, y_tr, cv)
+        name = spec.get("name", spec.get("type"))
+        pre, cat_idx = preproc, None
+        if spec.get("type") in NATIVE_CATEGORICAL and spec.get("native_categorical", True):
+            # категориальные — одной колонкой кодов (не больше max_bins уровней) вместо one-hot
+            pre = build_preprocessor(
+                X_fit,
+                cfg,
+                num_cols=encoder.num_idx_ if encoder is not None else None,
+                cat_cols=encoder.cat_idx_ if encoder is not None else None,
+                compact=encoder is not None,
+                native_categorical=True,
+                max_categories=spec.get("params", {}).get("max_bins", 255),
+            )
+            cat_idx = categorical_features(pre)
+        elif encoder is not None and spec.get("type") not in SPARSE_INPUT:
+            pre = build_preprocessor(
+                X_fit,
+                cfg,
+                num_cols=encoder.num_idx_,
+                cat_cols=encoder.cat_idx_,
+                compact=True,
+                sparse=False,
+            )
+        # все положительные + доля отрицательных в каждом фите; вероятности — для исходного приора
+        model = downsample(
+            build_model(spec, cfg.random_state, cat_idx),
+            smp.negative_rate,
+            smp.correction,
+            cfg.random_state,
+        )
+        pipes[name] = Pipeline([("preprocess", pre), ("model", model)])
+    val = cfg.validation
+    if val.selection not in {"exhaustive", "racing"}:
+        raise ValueError("validation.selection must be 'exhaustive' or 'racing'")
+    cv_kw: Dict[str, Any] = dict(
+        n_jobs=rt.n_jobs,
+        max_memory_mb=rt.max_memory_mb,
+        cache_mb=rt.fold_cache_mb,
+        spill_dir=rt.spill_dir,
+        profiler=prof,
+    )
+    race: Dict[str, Dict[str, Any]] = {}
+    with prof.stage("oof_cv"):
+        if val.selection == "racing":
+            oof_all, race = race_models(
+                pipes,
+                X_fit,
+                y_tr,
+                make_cv(cfg),
+                z=val.race_z,
+                min_folds=val.race_min_folds,
+                **cv_kw,
+            )
+        else:
+            oof_all = oof_predict_many(pipes, X_fit, y_tr, make_cv(cfg), **cv_kw)
+
+    results = []
+    for name, pipe in pipes.items():
+        oof_proba, oof_idx = average_repeats(oof_all[name])
         y_oof = y_tr.iloc[oof_idx].values
-        oof_metrics = compute_metrics(y_oof, oof_proba, k=cfg.reports.pr_k)
-        oof_ci = {
-            "pr_auc_ci": bootstrap_ci(
-                y_oof, oof_proba, scorer=average_precision_score, n_boot=400, seed=cfg.random_state
-            ),
-            "roc_auc_ci": bootstrap_ci(
-                y_oof, oof_proba, scorer=roc_auc_score, n_boot=400, seed=cfg.random_state
-            ),
-            "brier_ci": bootstrap_ci(
-                y_oof, oof_proba, scorer=brier_score_loss, n_boot=400, seed=cfg.random_state
-            ),
-        }
+        with prof.stage("oof_metrics", model=name):
+            oof_metrics = compute_metrics(y_oof, oof_proba, k=cfg.reports.pr_k)
+        with prof.stage("bootstrap", model=name):
+            boot = bootstrap_metrics(
+                y_oof, oof_proba, n_boot=400, seed=cfg.random_state, n_jobs=rt.n_jobs
+            )
+        oof_ci = {f"{metric}_ci": ci for metric, ci in boot.items()}
         results.append(
             {
-                "name": spec.get("name", spec.get("type")),
+                "name": name,
                 "oof": oof_metrics,
                 "ci": oof_ci,
                 "pipe": pipe,
                 "y_oof": y_oof,
                 "oof_proba": oof_proba,
+                "oof_repeats": oof_all[name],
+                "oof_idx": oof_idx,
+                "race": race.get(name),
             }
         )
 
-    best = max(results, key=lambda r: r["oof"]["pr_auc"])
+    # снятые в гонке модели видели не все фолды — выбираем только из дошедших до конца
+    finished = [r for r in results if not r["race"] or r["race"]["status"] == "finished"]
+    best = max(finished, key=lambda r: r["oof"]["pr_auc"])
     logger.info("Selected best model: %s (PR-AUC=%.4f)", best["name"], best["oof"]["pr_auc"])
 
     # Honest plots on OOF predictions of the best model
-    os.makedirs(cfg.paths.artifacts_dir, exist_ok=True)
-    plot_pr_curve(
-        best["y_oof"], best["oof_proba"], os.path.join(cfg.paths.artifacts_dir, "pr_curve.png")
-    )
-    plot_calibration(
-        best["y_oof"],
-        best["oof_proba"],
-        os.path.join(cfg.paths.artifacts_dir, "calibration_curve.png"),
-    )
+    with prof.stage("plots"):
+        from .plots import plot_pr_curve, plot_calibration, plot_cost_curve  # matplotlib — лениво
+
+        plot_pr_curve(
+            best["y_oof"], best["oof_proba"], os.path.join(cfg.paths.artifacts_dir, "pr_curve.png")
+        )
+        plot_calibration(
+            best["y_oof"],
+            best["oof_proba"],
+            os.path.join(cfg.paths.artifacts_dir, "calibration_curve.png"),
+        )
 
     # Calibrate best on full train
-    cal = calibrate(best["pipe"], method=cfg.calibration.method, cv_or_holdout=5)
-    cal.fit(X_tr, y_tr)
+    if cfg.calibration.source not in {"cv", "oof"}:
+        raise ValueError("calibration.source must be 'cv' or 'oof'")
+    oof_cal = cfg.calibration.source == "oof"
+    with prof.stage("calibration", model=best["name"]):
+        if oof_cal:
+            # калибратор — по уже посчитанным OOF, базовая модель обучается один раз
+            cal = OOFCalibratedClassifier(best["pipe"], method=cfg.calibration.method)
+            cal.fit(X_fit, y_tr, best["oof_repeats"])
+        else:
+            cal = calibrate(best["pipe"], method=cfg.calibration.method, cv_or_holdout=5)
+            cal.fit(X_fit, y_tr)
 
-    # Cost-optimal threshold on train predictions after calibration
-    proba_tr_cal = cal.predict_proba(X_tr)[:, 1]
-    thr_grid = np.linspace(0.0, 1.0, 1001)
-    best_thr, cost_curve = expected_cost(y_tr, proba_tr_cal, cfg.cost.fn, cfg.cost.fp, thr_grid)
+    # Cost-optimal threshold: on calibrated OOF scores, or on train predictions after calibration
+    with prof.stage("threshold"):
+        if oof_cal:
+            y_thr = best["y_oof"]
+            proba_thr = cal.calibrate_proba(best["oof_repeats"][:, best["oof_idx"]])
+            proba_thr = np.nanmean(proba_thr, axis=0)
+        else:
+            y_thr, proba_thr = y_tr, cal.predict_proba(X_fit)[:, 1]
+        best_thr, _ = optimal_threshold(y_thr, proba_thr, cfg.cost.fn, cfg.cost.fp)
+        thr_grid = np.linspace(0.0, 1.0, 1001)
+        _, cost_curve = expected_cost(y_thr, proba_thr, cfg.cost.fn, cfg.cost.fp, thr_grid)
+    if encoder is not None:
+        # тот же dtype-контракт на инференсе: DataFrame -> float32-матрица -> модель
+        cal = Pipeline([("compact", encoder), ("model", cal)])
     logger.info("Best threshold by cost: %.3f", best_thr)
-    plot_cost_curve(cost_curve, os.path.join(cfg.paths.artifacts_dir, "cost_vs_threshold.png"))
+    with prof.stage("plots"):
+        plot_cost_curve(cost_curve, os.path.join(cfg.paths.artifacts_dir, "cost_vs_threshold.png"))
 
     # Final evaluation on holdout test
-    proba_test = cal.predict_proba(X_te)[:, 1]
-    metrics_test = compute_metrics(y_te, proba_test, threshold=best_thr, k=cfg.reports.pr_k)
-
-    save_artifacts(
-        preproc=preproc,
-        model=cal,
-        metrics_cv=_aggregate(results),
-        metrics_test=metrics_test,
-        thresholds={"optimal": best_thr, "fixed_0_5": 0.5},
-        paths=cfg.paths,
-    )
+    with prof.stage("test_eval"):
+        proba_test = cal.predict_proba(X_te)[:, 1]
+        metrics_test = compute_metrics(y_te, proba_test, threshold=best_thr, k=cfg.reports.pr_k)
+
+    with prof.stage("save_artifacts"):
+        save_artifacts(
+            preproc=preproc,
+            model=cal,
+            metrics_cv=_aggregate(results),
+            metrics_test=metrics_test,
+            thresholds={"optimal": best_thr, "fixed_0_5": 0.5},
+            paths=cfg.paths,
+        )
+        # для будущих --update: hold-out строки, которых не видела ни одна модель
+        reservoir = None
+        if cfg.incremental.reservoir:
+            reservoir = reservoir_update(
+                None, X_te, y_te, cfg.incremental.reservoir_size, seed=cfg.random_state
+            )
+        save_reservoir(reservoir, cfg.paths.artifacts_dir)
+    prof.save(os.path.join(cfg.paths.artifacts_dir, "profile.json"))
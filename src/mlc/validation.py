@@ -1,9 +1,19 @@
 from __future__ import annotations
-from typing import Tuple
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
 import numpy as np
 import pandas as pd
+from joblib import Parallel, delayed, effective_n_jobs, hash as joblib_hash
 from sklearn.model_selection import RepeatedStratifiedKFold
 from sklearn.base import clone
+from sklearn.pipeline import Pipeline
+from .cache import FoldCache, _nbytes
+from .logging import setup_logging
+from .profiling import profiled_call
+
+logger = setup_logging(name="mlc.validation")
+
+# грубая оценка памяти одного фита: копия X в воркере + срезы фолда + матрица после препроцессинга
+_FIT_MEMORY_FACTOR = 3.0
 
 
 def make_cv(cfg) -> RepeatedStratifiedKFold:
@@ -13,13 +23,293 @@ def make_cv(cfg) -> RepeatedStratifiedKFold:
     )
 
 
-def oof_predict(pipe, X: pd.DataFrame, y: pd.Series, cv) -> Tuple[np.ndarray, np.ndarray]:
-    proba = np.zeros(len(y), dtype=float)
-    oof_idx = np.zeros(len(y), dtype=bool)
-    for tr_idx, va_idx in cv.split(X, y):
-        model = clone(pipe)
-        model.fit(X.iloc[tr_idx], y.iloc[tr_idx])
-        p = model.predict_proba(X.iloc[va_idx])[:, 1]
-        proba[va_idx] = p
-        oof_idx[va_idx] = True
-    return proba[oof_idx], np.where(oof_idx)[0]
+def _fold_plan(cv, X, y) -> List[Tuple[int, np.ndarray, np.ndarray]]:
+    # (repeat, tr_idx, va_idx) в порядке cv.split
+    splits = list(cv.split(X, y))
+    n_repeats = getattr(cv, "n_repeats", 1)
+    per_repeat = max(1, len(splits) // n_repeats)
+    return [(i // per_repeat, tr, va) for i, (tr, va) in enumerate(splits)]
+
+
+def _take(X, idx):
+    # строки фолда: DataFrame/Series через iloc, компактная матрица (ndarray/CSR) — индексом
+    return X.iloc[idx] if hasattr(X, "iloc") else X[idx]
+
+
+def _fit_fold(pipe, X, y, tr_idx, va_idx) -> np.ndarray:
+    model = clone(pipe)
+    model.fit(_take(X, tr_idx), _take(y, tr_idx))
+    return model.predict_proba(_take(X, va_idx))[:, 1]
+
+
+def _transform_fold(preproc, X, tr_idx, va_idx):
+    pre = clone(preproc)
+    X_fit = pre.fit_transform(_take(X, tr_idx))
+    return X_fit, pre.transform(_take(X, va_idx))
+
+
+def _fit_transformed(estimator, X_fit, y_fit, X_va) -> np.ndarray:
+    model = clone(estimator)
+    model.fit(X_fit, y_fit)
+    return model.predict_proba(X_va)[:, 1]
+
+
+def _shared_preprocessing(pipes: Mapping[str, Any]) -> List[Tuple[object, List[str]]]:
+    # пайплайны с одинаковыми (необученными) шагами до модели делят один препроцессинг на фолд
+    groups: Dict[str, Tuple[object, List[str]]] = {}
+    for name, pipe in pipes.items():
+        if isinstance(pipe, Pipeline) and len(pipe.steps) > 1:
+            head = pipe[:-1]
+            groups.setdefault(joblib_hash(head), (head, []))[1].append(name)
+    return [g for g in groups.values() if len(g[1]) > 1]
+
+
+def _data_nbytes(X) -> int:
+    if isinstance(X, pd.DataFrame):
+        return int(X.memory_usage(deep=True).sum())
+    return _nbytes(X)
+
+
+def _n_workers(n_jobs: int, max_memory_mb: Optional[float], X, n_tasks: int) -> int:
+    workers = min(effective_n_jobs(n_jobs), n_tasks)
+    if max_memory_mb is not None and workers > 1:
+        per_fit_mb = _FIT_MEMORY_FACTOR * _data_nbytes(X) / 2**20
+        fit = max(1, int(max_memory_mb // max(per_fit_mb, 1e-9)))
+        if fit < workers:
+            logger.info(
+                "Memory budget %.0f MB allows %d of %d workers (~%.0f MB per fit)",
+                max_memory_mb,
+                fit,
+                workers,
+                per_fit_mb,
+            )
+            workers = fit
+    return workers
+
+
+def oof_predict_many(
+    pipes: Mapping[str, Any],
+    X,
+    y,
+    cv,
+    n_jobs: int = 1,
+    max_memory_mb: Optional[float] = None,
+    cache_mb: Optional[float] = None,
+    spill_dir: Optional[str] = None,
+    profiler=None,
+    folds: Optional[Sequence[int]] = None,
+) -> Dict[str, np.ndarray]:
+    """Fit every (model, repeat, fold) in a process pool.
+
+    Returns per-model OOF matrices of shape ``(n_repeats, n_samples)``; samples that
+    a repeat did not validate are NaN. Results are assembled in a fixed order, so
+    they do not depend on ``n_jobs``.
+
+    Pipelines whose preprocessing steps are identical share them: the preprocessor
+    is fitted once per (repeat, fold), the transformed matrices are kept in a
+    :class:`~mlc.cache.FoldCache` (``cache_mb`` in RAM, the rest memmapped under
+    ``spill_dir``) and only the final estimators are fitted per model.
+
+    ``X`` is a DataFrame or a compact matrix (:class:`~mlc.features.CompactEncoder`
+    output); only fold index arrays travel to the workers, and a large ndarray is
+    memmapped by joblib instead of being pickled per task.
+
+    With a :class:`~mlc.profiling.StageProfiler` every fit (and shared
+    preprocessing fit) reports its wall/CPU time and peak RSS, tagged with the
+    model, repeat and fold.
+
+    ``folds`` restricts the run to these positions of the ``cv.split`` sequence
+    (the rest stays NaN); :func:`race_models` uses it to go fold by fold.
+    """
+    plan = _fold_plan(cv, X, y)
+    n_repeats = plan[-1][0] + 1 if plan else 0
+    idx = list(range(len(plan))) if folds is None else list(folds)
+    workers = _n_workers(n_jobs, max_memory_mb, X, len(pipes) * len(idx))
+    y_arr = np.asarray(y)
+
+    fold_no: List[int] = []  # номер фолда внутри повтора
+    seen: Dict[int, int] = {}
+    for rep, _, _ in plan:
+        fold_no.append(seen.get(rep, 0))
+        seen[rep] = fold_no[-1] + 1
+
+    def run(calls):
+        if workers == 1:
+            return (fn(*args, **kwargs) for fn, args, kwargs in calls)
+        return Parallel(n_jobs=workers, return_as="generator")(calls)
+
+    profiling = profiler is not None and profiler.enabled
+
+    def task(fn, *args):
+        # с профилировщиком задача возвращает (результат, wall/CPU/peak RSS)
+        if not profiling:
+            return delayed(fn)(*args)
+        if workers == 1:
+            return delayed(profiler.call)(fn, *args)
+        return delayed(profiled_call)(fn, *args)
+
+    def unwrap(result, i, **tags):
+        if not profiling:
+            return result
+        out, stats = result
+        profiler.add_task(stats, repeat=plan[i][0], fold=fold_no[i], **tags)
+        return out
+
+    shared = _shared_preprocessing(pipes)
+    caches = [FoldCache(cache_mb, spill_dir) for _ in shared]
+    try:
+        tasks = []  # (name, plan index, delayed call)
+        for cache, (head, names) in zip(caches, shared):
+            transformed = run(task(_transform_fold, head, X, *plan[i][1:]) for i in idx)
+            for i, res in zip(idx, transformed):
+                X_fit, X_va = unwrap(res, i, model="+".join(names), task="preprocess")
+                cache.put(i, X_fit, X_va)
+            for name in names:
+                est = pipes[name][-1]
+                for i in idx:
+                    X_fit, X_va = cache.get(i)
+                    y_fit = y_arr[plan[i][1]]
+                    tasks.append((name, i, task(_fit_transformed, est, X_fit, y_fit, X_va)))
+            logger.info(
+                "Shared preprocessing for %s: %d folds cached (%.1f MB in RAM, %.1f MB spilled)",
+                ", ".join(names),
+                len(cache),
+                cache.memory_bytes / 2**20,
+                cache.spilled_bytes / 2**20,
+            )
+
+        cached = {name for _, names in shared for name in names}
+        for name, pipe in pipes.items():
+            if name not in cached:
+                for i in idx:
+                    tasks.append((name, i, task(_fit_fold, pipe, X, y, *plan[i][1:])))
+
+        oof = {name: np.full((n_repeats, len(y)), np.nan) for name in pipes}
+        for (name, i, _), res in zip(tasks, run([t[-1] for t in tasks])):
+            rep, _, va = plan[i]
+            oof[name][rep, va] = unwrap(res, i, model=name, task="fit")
+    finally:
+        for cache in caches:
+            cache.close()
+    return oof
+
+
+def race_models(
+    pipes: Mapping[str, Any],
+    X,
+    y,
+    cv,
+    z: float = 2.0,
+    min_folds: int = 3,
+    n_jobs: int = 1,
+    max_memory_mb: Optional[float] = None,
+    cache_mb: Optional[float] = None,
+    spill_dir: Optional[str] = None,
+    profiler=None,
+) -> Tuple[Dict[str, np.ndarray], Dict[str, Dict[str, Any]]]:
+    """Racing selection: go fold by fold and stop candidates clearly behind the leader.
+
+    After each round every remaining candidate has a PR-AUC per validated fold;
+    the leader has the best mean. From ``min_folds`` folds on, a candidate is
+    stopped when the upper confidence bound of its paired gap to the leader,
+    ``mean(d) + z * sd(d) / sqrt(k)`` with ``d = PR-AUC(candidate) - PR-AUC(leader)``
+    over the same ``k`` folds, drops below zero. Survivors run all folds of
+    ``cv``; OOF matrices of stopped candidates only cover the folds they ran.
+
+    Returns ``(oof, report)``: OOF matrices as :func:`oof_predict_many` and per
+    model ``status`` (``"finished"``/``"stopped"``), ``folds``, ``mean_fold_pr_auc``
+    and, for stopped ones, ``stopped_after_folds``, ``leader`` and ``gap_ucb``.
+    """
+    from sklearn.metrics import average_precision_score
+
+    plan = _fold_plan(cv, X, y)
+    n_repeats = plan[-1][0] + 1 if plan else 0
+    y_arr = np.asarray(y)
+    min_folds = max(min_folds, 2)  # для sd нужно хотя бы два фолда
+    oof = {name: np.full((n_repeats, len(y)), np.nan) for name in pipes}
+    scores: Dict[str, List[float]] = {name: [] for name in pipes}
+    report: Dict[str, Dict[str, Any]] = {name: {"status": "finished"} for name in pipes}
+    alive = list(pipes)
+    workers = effective_n_jobs(n_jobs)
+    pos = 0
+    while pos < len(plan):
+        # фолдов за раунд — столько, чтобы оставшиеся кандидаты заняли все воркеры
+        step = max(1, -(-workers // len(alive)))
+        folds = list(range(pos, min(pos + step, len(plan))))
+        part = oof_predict_many(
+            {name: pipes[name] for name in alive},
+            X,
+            y,
+            cv,
+            n_jobs=n_jobs,
+            max_memory_mb=max_memory_mb,
+            cache_mb=cache_mb,
+            spill_dir=spill_dir,
+            profiler=profiler,
+            folds=folds,
+        )
+        for name in alive:
+            for i in folds:
+                rep, _, va = plan[i]
+                oof[name][rep, va] = part[name][rep, va]
+                scores[name].append(average_precision_score(y_arr[va], part[name][rep, va]))
+        pos = folds[-1] + 1
+        if pos < min_folds or len(alive) == 1:
+            continue
+        means = {name: np.mean(scores[name]) for name in alive}
+        leader = max(alive, key=means.get)
+        for name in [n for n in alive if n != leader]:
+            d = np.asarray(scores[name]) - np.asarray(scores[leader])
+            ucb = float(d.mean() + z * d.std(ddof=1) / np.sqrt(len(d)))
+            if ucb < 0:
+                alive.remove(name)
+                report[name] = {
+                    "status": "stopped",
+                    "stopped_after_folds": pos,
+                    "leader": leader,
+                    "gap_ucb": ucb,
+                }
+                logger.info(
+                    "Racing: stopped %s after %d/%d folds (PR-AUC gap to %s <= %.4f)",
+                    name,
+                    pos,
+                    len(plan),
+                    leader,
+                    ucb,
+                )
+
+    for name in pipes:
+        report[name].update(
+            folds=len(scores[name]), mean_fold_pr_auc=float(np.mean(scores[name]))
+        )
+    logger.info(
+        "Racing: %d of %d fits, finished: %s",
+        sum(r["folds"] for r in report.values()),
+        len(pipes) * len(plan),
+        ", ".join(alive),
+    )
+    return oof, report
+
+
+def average_repeats(oof: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # среднее по повторам для объектов, попавших хотя бы в один валидационный фолд
+    covered = ~np.all(np.isnan(oof), axis=0)
+    return np.nanmean(oof[:, covered], axis=0), np.where(covered)[0]
+
+
+def oof_predict(
+    pipe,
+    X: pd.DataFrame,
+    y: pd.Series,
+    cv,
+    n_jobs: int = 1,
+    negative_rate: float = 1.0,
+    correction: str = "offset",
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Averaged OOF P(y=1); with ``negative_rate < 1`` every fold fits on all positives
+    and that share of negatives (see :func:`~mlc.sampling.downsample`)."""
+    from .sampling import downsample
+
+    pipe = downsample(pipe, negative_rate, correction, getattr(cv, "random_state", None))
+    oof = oof_predict_many({"model": pipe}, X, y, cv, n_jobs=n_jobs)["model"]
+    return average_repeats(oof)
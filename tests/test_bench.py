@@ -0,0 +1,49 @@
+from __future__ import annotations
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH = os.path.join(ROOT, "scripts", "bench.py")
+
+
+def test_bench_run_and_compare(tmp_path):
+    out = tmp_path / "latest.json"
+    cmd = [sys.executable, BENCH, "run", "--rows", "600", "--features", "8", "--weights", "0.9"]
+    cmd += ["--models", "logistic_l2", "--n-repeats", "1", "--out", str(out)]
+    subprocess.run(cmd, check=True, capture_output=True, cwd=ROOT)
+    res = json.loads(out.read_text())
+    (case,) = res["cases"]
+    # стадии run_training из profile.json + замер инференса на сохранённом hold-out
+    for stage in (
+        "data",
+        "split",
+        "oof_cv",
+        "fit:logistic_l2",
+        "bootstrap",
+        "calibration",
+        "threshold",
+        "plots",
+        "test_eval",
+        "predict",
+    ):
+        assert case["stages"][stage] >= 0.0
+    assert case["best_model"] == "logistic_l2"
+    assert case["total_s"] >= case["stages"]["oof_cv"]
+    assert case["throughput"]["predict_rows_per_s"] > 0
+
+    same = subprocess.run([sys.executable, BENCH, "compare", str(out), str(out)])
+    assert same.returncode == 0
+
+    # базовая линия вдвое быстрее -> все заметные стадии помечаются как регрессии
+    for stage in case["stages"]:
+        case["stages"][stage] /= 2
+    base = tmp_path / "baseline.json"
+    base.write_text(json.dumps(res))
+    slower = subprocess.run(
+        [sys.executable, BENCH, "compare", str(base), str(out), "--min-seconds", "0"],
+        capture_output=True,
+        text=True,
+    )
+    assert slower.returncode == 1 and "REGRESSION" in slower.stdout
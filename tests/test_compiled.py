@@ -0,0 +1,118 @@
+from __future__ import annotations
+import time
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.pipeline import Pipeline
+from mlc.calibration import calibrate
+from mlc.compiled import CompiledModel, compile_model
+from mlc.features import CompactEncoder, build_preprocessor, categorical_features
+from mlc.models import SPARSE_INPUT, build_model
+
+SPECS = {
+    "logistic": {"type": "logistic", "params": {"C": 0.5, "class_weight": "balanced"}},
+    "hist_gbdt": {"type": "hist_gbdt", "params": {"max_depth": 4, "max_iter": 40}},
+    "rf": {"type": "rf", "params": {"n_estimators": 30, "max_depth": 6}},
+}
+
+
+def _data(n=1200):
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(n, 5)), columns=[f"x{i}" for i in range(5)])
+    X["cat"] = rng.choice(["a", "b", "c", "d"], size=n)
+    logit = X["x0"] - 0.7 * X["x1"] + (X["cat"] == "d") * 1.5 - 2.5
+    y = pd.Series((rng.random(n) < 1 / (1 + np.exp(-logit))).astype(int))
+    X.loc[::13, "x2"] = np.nan
+    X.loc[::17, "cat"] = np.nan
+    return X, y
+
+
+@pytest.mark.parametrize("model_type", list(SPECS))
+@pytest.mark.parametrize("method", ["sigmoid", "isotonic"])
+def test_compiled_matches_sklearn(model_type, method):
+    X, y = _data()
+    pipe = Pipeline(
+        [("preprocess", build_preprocessor(X)), ("model", build_model(SPECS[model_type], 0))]
+    )
+    cal = calibrate(pipe, method).fit(X, y)
+    cm = compile_model(cal, threshold=0.3)
+
+    X_new = X.head(200).copy()
+    X_new.loc[X_new.index[:3], "cat"] = "unseen"
+    X_new.loc[X_new.index[3:6], "x0"] = np.nan
+    ref = cal.predict_proba(X_new)[:, 1]
+
+    np.testing.assert_allclose(cm.predict_proba(X_new), ref, atol=1e-12)
+    as_array = X_new[cm.columns].to_numpy(object)
+    np.testing.assert_allclose(cm.predict_proba(as_array), ref, atol=1e-12)
+    rows = X_new.to_dict(orient="records")
+    np.testing.assert_allclose([cm.predict_proba(r)[0] for r in rows[:20]], ref[:20], atol=1e-12)
+    proba, label = cm.predict(rows)
+    np.testing.assert_array_equal(label, (ref >= 0.3).astype(int))
+
+
+def test_compiled_roundtrip_and_single_row_latency(tmp_path):
+    X, y = _data()
+    pipe = Pipeline(
+        [("preprocess", build_preprocessor(X)), ("model", build_model(SPECS["logistic"], 0))]
+    )
+    cal = calibrate(pipe, "sigmoid").fit(X, y)
+    compile_model(cal).save(str(tmp_path / "compiled"))
+    cm = CompiledModel.load(str(tmp_path / "compiled"))
+    row = X.iloc[0].to_dict()
+    assert abs(cm.predict_proba(row)[0] - cal.predict_proba(X.head(1))[0, 1]) < 1e-12
+
+    n = 2000
+    start = time.perf_counter()
+    for _ in range(n):
+        cm.predict_proba(row)
+    # цель — десятки микросекунд; порог с большим запасом для медленных CI-машин
+    assert (time.perf_counter() - start) / n < 1e-3
+
+
+@pytest.mark.parametrize("model_type", list(SPECS))
+def test_compiled_matches_compact_pipeline(model_type):
+    X, y = _data()
+    enc = CompactEncoder().fit(X)
+    M = enc.transform(X)
+    sparse = model_type in SPARSE_INPUT
+    pre = build_preprocessor(
+        M, num_cols=enc.num_idx_, cat_cols=enc.cat_idx_, compact=True, sparse=sparse
+    )
+    pipe = Pipeline([("preprocess", pre), ("model", build_model(SPECS[model_type], 0))])
+    model = Pipeline([("compact", enc), ("model", calibrate(pipe, "isotonic").fit(M, y))])
+    cm = compile_model(model)
+
+    X_new = X.head(200).copy()
+    X_new.loc[X_new.index[:3], "cat"] = "unseen"
+    ref = model.predict_proba(X_new)[:, 1]
+    np.testing.assert_allclose(cm.predict_proba(X_new), ref, atol=1e-6)
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_compiled_matches_native_categorical_hgb(compact):
+    X, y = _data(3000)
+    rng = np.random.default_rng(1)
+    # 400 уровней > max_bins: редкие схлопываются в общий код
+    X["hc"] = pd.Categorical([f"L{i}" for i in rng.zipf(1.2, len(X)) % 400])
+    X.loc[::11, "hc"] = np.nan
+    M, enc = X, None
+    if compact:
+        enc = CompactEncoder().fit(X)
+        M = enc.transform(X)
+    cols = dict(num_cols=enc.num_idx_, cat_cols=enc.cat_idx_) if compact else {}
+    pre = build_preprocessor(M, compact=compact, native_categorical=True, **cols)
+    model = build_model(SPECS["hist_gbdt"], 0, categorical_features=categorical_features(pre))
+    cal = calibrate(Pipeline([("preprocess", pre), ("model", model)]), "sigmoid").fit(M, y)
+    model = Pipeline([("compact", enc), ("model", cal)]) if compact else cal
+    cm = compile_model(model)
+    assert "cat_right" in cm.arrays
+
+    X_new = X.head(300).copy()
+    X_new.loc[X_new.index[:3], "cat"] = "unseen"
+    X_new["hc"] = X_new["hc"].cat.add_categories(["L_new"])
+    X_new.loc[X_new.index[3:6], "hc"] = "L_new"
+    ref = model.predict_proba(X_new)[:, 1]
+    np.testing.assert_allclose(cm.predict_proba(X_new), ref, atol=1e-6 if compact else 1e-12)
+    rows = X_new.head(20).to_dict(orient="records")
+    np.testing.assert_allclose([cm.predict_proba(r)[0] for r in rows], ref[:20], atol=1e-6)
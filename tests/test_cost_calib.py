@@ -1,8 +1,21 @@
 from __future__ import annotations
 import json
 from pathlib import Path
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.base import clone
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import RepeatedStratifiedKFold
+from sklearn.pipeline import Pipeline
+from mlc.calibration import OOFCalibratedClassifier
+from mlc.compiled import compile_model
 from mlc.config import load_config
+from mlc.cost import cost_sweep, expected_cost, optimal_threshold
+from mlc.features import build_preprocessor
+from mlc.infer import InferenceModel
 from mlc.trainer import run_training
+from mlc.validation import oof_predict_many
 
 
 def test_calibration_improves_brier_and_cost(tmp_path):
@@ -18,3 +31,76 @@ def test_calibration_improves_brier_and_cost(tmp_path):
 
     thresholds = json.loads((art / "thresholds.json").read_text())
     assert thresholds["optimal"] != 0.5
+
+
+def _brute_force_cost(y, proba, c_fn, c_fp, thresholds):
+    out = []
+    for thr in thresholds:
+        y_hat = (proba >= thr).astype(int)
+        fp = int(((y == 0) & (y_hat == 1)).sum())
+        fn = int(((y == 1) & (y_hat == 0)).sum())
+        out.append(c_fn * fn + c_fp * fp)
+    return np.array(out)
+
+
+def test_expected_cost_matches_threshold_loop():
+    rng = np.random.default_rng(0)
+    y = (rng.random(2000) < 0.1).astype(int)
+    proba = np.round(np.clip(0.3 * y + rng.random(2000) * 0.7, 0, 1), 3)
+    grid = np.linspace(0.0, 1.0, 1001)
+    thr, df = expected_cost(y, proba, 10.0, 1.0, grid)
+    ref = _brute_force_cost(y, proba, 10.0, 1.0, grid)
+    np.testing.assert_allclose(df["cost"].to_numpy(), ref)
+    assert thr == grid[int(np.argmin(ref))]
+
+
+def test_optimal_threshold_and_sweep_are_exact():
+    rng = np.random.default_rng(1)
+    y = (rng.random(1500) < 0.05).astype(int)
+    proba = np.clip(0.4 * y + rng.random(1500) * 0.6, 0, 1)
+    breaks = np.append(np.unique(proba), 1.1)
+
+    thr, cost = optimal_threshold(y, proba, 20.0, 1.0)
+    ref = _brute_force_cost(y, proba, 20.0, 1.0, breaks)
+    assert cost == ref.min()
+    assert _brute_force_cost(y, proba, 20.0, 1.0, [thr])[0] == cost
+
+    scenarios = [(20.0, 1.0), (1.0, 1.0), (5.0, 2.0), (1.0, 100.0)]
+    sweep = cost_sweep(y, proba, scenarios)
+    assert len(sweep) == len(scenarios)
+    for (c_fn, c_fp), row in zip(scenarios, sweep.itertuples()):
+        assert row.cost == _brute_force_cost(y, proba, c_fn, c_fp, breaks).min()
+
+
+@pytest.mark.parametrize("method", ["sigmoid", "isotonic"])
+def test_oof_calibration_fits_base_once_and_compiles(method):
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame({"a": rng.normal(size=1500), "b": rng.choice(list("xyz"), size=1500)})
+    y = pd.Series((X["a"] + rng.normal(size=1500) > 1.5).astype(int))
+    pipe = Pipeline([("preprocess", build_preprocessor(X)), ("model", LogisticRegression())])
+    cv = RepeatedStratifiedKFold(n_splits=3, n_repeats=2, random_state=0)
+    oof = oof_predict_many({"lr": pipe}, X, y, cv)["lr"]
+
+    cal = OOFCalibratedClassifier(pipe, method=method).fit(X, y, oof)
+    (member,) = cal.calibrated_classifiers_
+    base = clone(pipe).fit(X, y)
+    np.testing.assert_allclose(member.estimator[-1].coef_, base[-1].coef_)
+    p = cal.predict_proba(X)[:, 1]
+    np.testing.assert_allclose(cal.calibrate_proba(base.predict_proba(X)[:, 1]), p, atol=1e-10)
+    np.testing.assert_allclose(compile_model(cal).predict_proba(X), p, atol=1e-10)
+    # калибровка по OOF: средняя вероятность близка к доле положительных
+    assert abs(cal.calibrate_proba(oof).mean() - y.mean()) < 0.02
+
+
+def test_training_with_oof_calibration(tmp_path):
+    cfg = load_config("configs/default.yaml")
+    cfg.models = cfg.models[:1]
+    cfg.calibration.source = "oof"
+    cfg.paths.artifacts_dir = str(tmp_path / "artifacts")
+    run_training(cfg)
+    art = Path(cfg.paths.artifacts_dir)
+    prof = json.loads((art / "profile.json").read_text())
+    fits = [t for t in prof["tasks"] if t["task"] == "fit"]
+    assert len(fits) == 10  # только OOF; калибровка не добавляет фитов в CV
+    assert 0.0 < json.loads((art / "thresholds.json").read_text())["optimal"] < 1.0
+    assert InferenceModel.load(cfg.paths).compiled
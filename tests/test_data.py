@@ -0,0 +1,129 @@
+from __future__ import annotations
+import json
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pytest
+from mlc.config import load_config
+from mlc.data import _csv_files, _dataset, make_dataset, read_columnar, train_test_split_stratified
+
+
+def _frame(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "id": np.arange(n),
+            "x0": rng.normal(size=n),
+            "x1": rng.integers(0, 100, size=n),
+            "unused": rng.normal(size=n),
+            "cat": rng.choice(["a", "b", "c"], size=n),
+            "target": (rng.random(n) < 0.2).astype(int),
+        }
+    )
+
+
+def _cfg(tmp_path, kind, path, columns=None):
+    cfg_path = tmp_path / "cfg.yaml"
+    cfg_path.write_text(Path("configs/default.yaml").read_text())
+    cfg = load_config(cfg_path)
+    cfg.data.kind, cfg.data.path, cfg.data.columns = kind, path, columns
+    return cfg
+
+
+def test_glob_expansion_and_missing_files(tmp_path):
+    for i in (1, 0):
+        _frame(10, seed=i).to_csv(tmp_path / f"part-{i}.csv", index=False)
+    parts = [str(tmp_path / "part-0.csv"), str(tmp_path / "part-1.csv")]
+    assert _csv_files(str(tmp_path)) == parts  # каталог -> отсортированные *.csv
+    assert _csv_files(str(tmp_path / "part-*.csv")) == parts
+    assert _csv_files(parts[::-1]) == parts[::-1]
+    assert _csv_files(parts[0]) == parts[:1]
+
+    # в сообщении — исходный шаблон, а не пустой результат glob
+    missing = str(tmp_path / "nothing-*.parquet")
+    with pytest.raises(FileNotFoundError, match=r"No files match '.*nothing-\*\.parquet'"):
+        _csv_files(missing)
+    with pytest.raises(FileNotFoundError, match=r"No files match '.*nothing-\*\.parquet'"):
+        _dataset(missing, "parquet")
+
+
+def test_parquet_multi_file_projection_and_dtypes(tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+
+    df = _frame()
+    root = tmp_path / "ds"
+    root.mkdir()
+    for i, part in enumerate([df.iloc[:200], df.iloc[200:]]):  # 2 файла по несколько row group
+        pq.write_table(
+            pa.Table.from_pandas(part, preserve_index=False),
+            root / f"part-{i}.parquet",
+            row_group_size=50,
+        )
+
+    cfg = _cfg(tmp_path, "parquet", str(root), columns=["x0", "x1", "cat"])
+    X, y = make_dataset(cfg)
+    assert list(X.columns) == ["x0", "x1", "cat"]
+    assert X["x0"].dtype == np.float32 and X["x1"].dtype == np.float32
+    assert isinstance(X["cat"].dtype, pd.CategoricalDtype)
+    assert y.dtype == np.int64
+    np.testing.assert_array_equal(y.values, df["target"].values)
+    np.testing.assert_allclose(X["x0"].values, df["x0"].values, rtol=1e-6)
+
+
+def test_arrow_glob_and_columnar_holdout(tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.feather as feather
+
+    df = _frame()
+    for i, part in enumerate([df.iloc[i : i + 150] for i in range(0, len(df), 150)]):
+        feather.write_feather(
+            pa.Table.from_pandas(part, preserve_index=False), tmp_path / f"chunk-{i}.arrow"
+        )
+    cfg = _cfg(tmp_path, "arrow", str(tmp_path / "chunk-*.arrow"))
+    X, y = make_dataset(cfg)
+    assert len(X) == len(df)
+
+    art = tmp_path / "art"
+    X_tr, X_te, _, y_te = train_test_split_stratified(X, y, 0.25, 0, str(art), kind="arrow")
+    assert not (art / "test.csv").exists()
+    back = read_columnar(str(art / "test.arrow"), "arrow", float32=False)
+    assert len(back) == len(X_te)
+    np.testing.assert_array_equal(back["target"].values, y_te.values)
+    assert isinstance(back["cat"].dtype, pd.CategoricalDtype)
+
+
+def test_training_and_scoring_on_parquet(tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+
+    from mlc.infer import InferenceModel, score_csv, score_file
+    from mlc.trainer import run_training
+
+    rng = np.random.default_rng(1)
+    n = 3000
+    df = pd.DataFrame(rng.normal(size=(n, 4)), columns=[f"x{i}" for i in range(4)])
+    df["cat"] = rng.choice(["u", "v"], size=n)
+    df["target"] = (df["x0"] + rng.normal(size=n) > 1.5).astype(int)
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp_path / "train.parquet")
+
+    cfg = _cfg(tmp_path, "parquet", str(tmp_path / "train.parquet"))
+    cfg.models = [{"name": "lr", "type": "logistic", "params": {"class_weight": "balanced"}}]
+    cfg.paths.artifacts_dir = str(tmp_path / "art")
+    run_training(cfg)
+    art = tmp_path / "art"
+    assert (art / "test.parquet").exists()
+    assert json.loads((art / "metrics_test.json").read_text())["pr_auc"] > 0.2
+
+    inf = InferenceModel.load(cfg.paths)
+    test = read_columnar(str(art / "test.parquet"), float32=False)
+    test.to_csv(tmp_path / "test.csv", index=False)
+    n_rows = score_file(inf, str(art / "test.parquet"), str(tmp_path / "a.csv"), chunksize=97)
+    score_csv(inf, str(tmp_path / "test.csv"), str(tmp_path / "b.csv"))
+    a, b = pd.read_csv(tmp_path / "a.csv"), pd.read_csv(tmp_path / "b.csv")
+    assert n_rows == len(test)
+    # пустой Parquet: строк нет, но шапка с колонками прогноза всё равно пишется
+    pq.write_table(pa.Table.from_pandas(df.head(0), preserve_index=False), tmp_path / "e.parquet")
+    assert score_file(inf, str(tmp_path / "e.parquet"), str(tmp_path / "e.csv")) == 0
+    assert list(pd.read_csv(tmp_path / "e.csv").columns) == list(df.columns) + ["proba", "label"]
+    np.testing.assert_allclose(a["proba"].values, b["proba"].values, atol=1e-6)
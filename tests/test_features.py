@@ -1,6 +1,8 @@
 from __future__ import annotations
+import numpy as np
 import pandas as pd
-from mlc.features import build_preprocessor
+import scipy.sparse as sp
+from mlc.features import CompactEncoder, build_preprocessor, categorical_features
 
 
 def test_preprocessor_y_agnostic():
@@ -16,3 +18,31 @@ def test_unknown_categories():
     df2 = pd.DataFrame({"num": [4], "cat": ["zzz"]})
     Xt = pre.transform(df2)
     assert Xt.shape[1] >= 2
+
+
+def test_compact_encoder_codes_and_sparse_float32():
+    df = pd.DataFrame({"num": [1.5, None, 3.0, 4.0], "cat": ["b", "a", None, "b"]})
+    enc = CompactEncoder().fit(df)
+    M = enc.transform(pd.DataFrame({"num": [2.0, 1.0], "cat": ["a", "zzz"]}))
+    assert M.dtype == np.float32 and M.flags["C_CONTIGUOUS"]
+    np.testing.assert_array_equal(M, [[2.0, 0.0], [1.0, 2.0]])  # "zzz" -> len(categories)
+    assert np.isnan(enc.transform(df)[2, 1])
+
+    wide = pd.DataFrame({"num": np.arange(40.0), "cat": [f"v{i}" for i in range(40)]})
+    enc = CompactEncoder().fit(wide)
+    pre = build_preprocessor(None, num_cols=enc.num_idx_, cat_cols=enc.cat_idx_, compact=True)
+    Xt = pre.fit_transform(enc.transform(wide))
+    assert sp.issparse(Xt) and Xt.dtype == np.float32 and Xt.shape == (40, 41)
+
+
+def test_native_categorical_ordinal_codes():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({"num": rng.normal(size=600), "cat": [f"v{i % 300}" for i in range(600)]})
+    df.loc[::7, "cat"] = np.nan
+    pre = build_preprocessor(df, native_categorical=True, max_categories=16)
+    Xt = pre.fit_transform(df)
+    assert Xt.shape == (600, 2) and categorical_features(pre) == [1]
+    codes = Xt[:, 1]
+    assert np.isnan(codes[::7]).all() and np.nanmax(codes) == 15  # редкие — общий код 15
+    new = pre.transform(pd.DataFrame({"num": [0.0], "cat": ["zzz"]}))
+    assert np.isnan(new[0, 1])
@@ -0,0 +1,15 @@
+from __future__ import annotations
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_import_time_budget():
+    # бюджеты и запрещённые «тяжёлые» импорты заданы в scripts/bench_import.py
+    scale = os.environ.get("MLC_IMPORT_BUDGET_SCALE", "1.0")
+    cmd = [sys.executable, os.path.join(ROOT, "scripts", "bench_import.py")]
+    cmd += ["--repeat", "3", "--budget-scale", scale, "--check"]
+    proc = subprocess.run(cmd, capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stdout + proc.stderr
@@ -0,0 +1,124 @@
+from __future__ import annotations
+import dataclasses as dc
+import json
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pytest
+from mlc.config import load_config
+from mlc.data import make_dataset
+from mlc.incremental import load_reservoir, reservoir_update, run_incremental, update_model
+from mlc.infer import InferenceModel
+from mlc.persistence import load_artifacts
+from mlc.trainer import run_training
+
+
+def _cfg(tmp_path, models):
+    cfg = load_config("configs/default.yaml")
+    cfg.data.n_samples = 2000
+    cfg.validation.cv.n_splits, cfg.validation.cv.n_repeats = 3, 1
+    cfg.models = models
+    cfg.incremental.reservoir, cfg.incremental.reservoir_size = True, 500
+    cfg.paths.artifacts_dir = str(tmp_path / "artifacts")
+    return cfg
+
+
+def _delta(cfg, n=600, seed=7):
+    new = dc.replace(cfg, random_state=seed, data=dc.replace(cfg.data, n_samples=n))
+    return make_dataset(new)
+
+
+def test_reservoir_is_uniform_and_bounded():
+    X = pd.DataFrame({"i": np.arange(10_000), "c": ["a", "b"] * 5_000})
+    res = None
+    for start in range(0, 10_000, 1_500):  # батчи разного размера
+        part = X.iloc[start : start + 1_500]
+        res = reservoir_update(res, part, part["i"].to_numpy() % 2, size=1_000, seed=0)
+    assert res["n_seen"] == 10_000 and len(res["X"]) == len(res["y"]) == 1_000
+    ids = res["X"]["i"].to_numpy()
+    assert len(np.unique(ids)) == 1_000
+    np.testing.assert_array_equal(res["y"], ids % 2)
+    # равномерность: доля строк из каждой половины потока около 1/2
+    assert 0.4 < np.mean(ids < 5_000) < 0.6
+    assert pd.api.types.is_string_dtype(res["X"]["c"])
+
+
+@pytest.mark.parametrize(
+    "spec",
+    [
+        {"name": "rf", "type": "rf", "params": {"n_estimators": 20, "max_depth": 6}},
+        {"name": "hgb", "type": "hist_gbdt", "params": {"max_iter": 30}},
+        {"name": "sgd", "type": "sgd", "params": {"class_weight": "balanced"}},
+    ],
+)
+def test_update_grows_members_and_keeps_compiled_parity(tmp_path, spec):
+    cfg = _cfg(tmp_path, [spec])
+    run_training(cfg)
+    art = Path(cfg.paths.artifacts_dir)
+    # резервуар — hold-out сплит (400 строк), а не train: его не видела ни одна модель
+    res = load_reservoir(str(art))
+    test_ids = pd.read_csv(art / "test.csv")["x00"].round(8)
+    assert res["n_seen"] == len(res["X"]) == 400
+    assert res["X"]["x00"].dropna().round(8).isin(test_ids).all()
+
+    X_new, y_new = _delta(cfg)
+    delta = art / "delta.csv"
+    X_new.assign(target=y_new.values).to_csv(delta, index=False)
+    _, before, _ = load_artifacts(cfg.paths)
+    run_incremental(cfg, str(delta))
+
+    _, after, thr = load_artifacts(cfg.paths)
+    est0 = before.calibrated_classifiers_[0].estimator[-1]
+    est1 = after.calibrated_classifiers_[0].estimator[-1]
+    if spec["type"] == "rf":
+        assert len(est1.estimators_) == len(est0.estimators_) + cfg.incremental.extra_trees
+    elif spec["type"] == "hist_gbdt":
+        assert est1.n_iter_ > est0.n_iter_
+    else:
+        assert est1.t_ > est0.t_
+    upd = json.loads((art / "metrics_update.json").read_text())
+    assert upd["n_new"] == 600 and upd["n_train"] == 480 and upd["n_calibration"] == 400 + 120
+    assert upd["threshold"]["after"] == thr
+    assert load_reservoir(str(art))["n_seen"] == 400 + 120
+
+    # бандл пересобран из обновлённой модели
+    X_te = pd.read_csv(art / "test.csv").drop(columns=["target"])
+    sk = InferenceModel.load(cfg.paths, use_bundle=False).predict(X_te)[0]
+    fast = InferenceModel.load(cfg.paths).predict(X_te)[0]
+    np.testing.assert_allclose(fast.values, sk.values, atol=1e-8)
+
+
+def test_update_keeps_history_in_compact_mode(tmp_path):
+    from sklearn.base import clone
+
+    cfg = _cfg(tmp_path, [{"name": "sgd", "type": "sgd", "params": {"class_weight": "balanced"}}])
+    cfg.runtime.compact = True
+    cfg.incremental.reservoir = False
+    run_training(cfg)
+    assert load_reservoir(cfg.paths.artifacts_dir) is None  # сырые строки — только по запросу
+    _, model, _ = load_artifacts(cfg.paths)
+    X_new, y_new = _delta(cfg, n=300)
+    X_cal, y_cal = X_new.iloc[:100], y_new.iloc[:100]
+    member = model[-1].calibrated_classifiers_[0].estimator
+    coef = member[-1].coef_.copy()
+    # та же модель, обученная с нуля только на дельте
+    Xt = member[:-1].transform(model[0].transform(X_new.iloc[100:]))
+    fresh = clone(member[-1]).fit(Xt, y_new.iloc[100:]).coef_
+
+    proba = update_model(model, X_new.iloc[100:], y_new.iloc[100:], cfg, X_cal, y_cal)
+    moved = np.linalg.norm(member[-1].coef_ - coef)
+    assert 0 < moved < 0.5 * np.linalg.norm(fresh - coef)  # история не забыта
+    np.testing.assert_allclose(proba, model.predict_proba(X_cal)[:, 1], atol=1e-10)
+    with pytest.raises(ValueError, match="both classes"):
+        update_model(model, X_new, np.zeros(len(y_new)), cfg, X_cal, y_cal)
+
+
+def test_update_refuses_logistic(tmp_path):
+    cfg = _cfg(tmp_path, [{"name": "lr", "type": "logistic", "params": {"C": 1.0}}])
+    run_training(cfg)
+    _, model, _ = load_artifacts(cfg.paths)
+    coef = model.calibrated_classifiers_[0].estimator[-1].coef_.copy()
+    X_new, y_new = _delta(cfg)
+    with pytest.raises(NotImplementedError, match="forgets the history"):
+        update_model(model, X_new, y_new, cfg, X_new, y_new)
+    np.testing.assert_array_equal(model.calibrated_classifiers_[0].estimator[-1].coef_, coef)
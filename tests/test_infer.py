@@ -0,0 +1,154 @@
+from __future__ import annotations
+import json
+import os
+import subprocess
+import sys
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from mlc.calibration import calibrate
+from mlc.config import PathsConfig
+from mlc.features import build_preprocessor
+from mlc.infer import InferenceModel, MultiInferenceModel, score_csv
+from mlc.persistence import save_artifacts
+
+
+def _model_and_data(n=500):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(
+        {
+            "id": np.arange(n),
+            "a": rng.normal(size=n),
+            "b": rng.choice(["x", "y"], size=n),
+        }
+    )
+    y = (df["a"] + rng.normal(scale=0.5, size=n) > 1.0).astype(int)
+    feats = df[["a", "b"]]
+    pipe = Pipeline([("preprocess", build_preprocessor(feats)), ("model", LogisticRegression())])
+    pipe.fit(feats, y)
+    return InferenceModel(pipe.named_steps["preprocess"], pipe, threshold=0.3), df
+
+
+def test_score_csv_streams_same_predictions(tmp_path):
+    inf, df = _model_and_data()
+    src = tmp_path / "in.csv"
+    df.to_csv(src, index=False)
+
+    n = score_csv(inf, str(src), str(tmp_path / "out.csv"), chunksize=77)
+    assert n == len(df)
+    out = pd.read_csv(tmp_path / "out.csv")
+    proba, label = inf.predict(pd.read_csv(src))
+    assert list(out.columns) == ["id", "a", "b", "proba", "label"]
+    np.testing.assert_allclose(out["proba"], proba)
+    np.testing.assert_array_equal(out["label"], label)
+
+    score_csv(inf, str(src), str(tmp_path / "ids.csv"), chunksize=128, columns=["id"])
+    ids = pd.read_csv(tmp_path / "ids.csv")
+    assert list(ids.columns) == ["id", "proba", "label"]
+    np.testing.assert_array_equal(ids["id"], df["id"])
+
+
+def test_score_csv_empty_input_keeps_header(tmp_path):
+    inf, df = _model_and_data()
+    src = tmp_path / "in.csv"
+    df.head(0).to_csv(src, index=False)
+    for n_jobs in (1, 2):
+        out = tmp_path / f"out{n_jobs}.csv"
+        assert score_csv(inf, str(src), str(out), n_jobs=n_jobs) == 0
+        assert out.read_text() == "id,a,b,proba,label\n"
+    multi = MultiInferenceModel({"m": inf})
+    score_csv(multi, str(src), str(tmp_path / "multi.csv"), columns=["id"])
+    assert (tmp_path / "multi.csv").read_text() == "id,proba_m,label_m\n"
+
+
+def test_score_csv_parallel_keeps_row_order(tmp_path):
+    inf, df = _model_and_data(2000)
+    src = tmp_path / "in.csv"
+    df.to_csv(src, index=False)
+    score_csv(inf, str(src), str(tmp_path / "serial.csv"), chunksize=97)
+    n = score_csv(inf, str(src), str(tmp_path / "par.csv"), chunksize=97, n_jobs=3)
+    assert n == len(df)
+    # шарды скорятся параллельно, но файл побайтно совпадает с последовательным
+    assert (tmp_path / "par.csv").read_bytes() == (tmp_path / "serial.csv").read_bytes()
+
+
+def test_collapsed_ensemble_matches_and_compiles(tmp_path):
+    from mlc.calibration import calibration_parity
+    from mlc.incremental import save_reservoir
+
+    rng = np.random.default_rng(1)
+    X = pd.DataFrame({"a": rng.normal(size=3000), "b": rng.choice(["x", "y", "z"], size=3000)})
+    y = (X["a"] + rng.normal(scale=0.7, size=3000) > 1.5).astype(int)
+    pipe = Pipeline([("preprocess", build_preprocessor(X)), ("model", LogisticRegression())])
+    cal = calibrate(pipe, "sigmoid").fit(X[:2000], y[:2000])
+    inf = InferenceModel(None, cal, threshold=0.3)
+
+    collapsed = inf.collapse(X[:2000])
+    (member,) = collapsed.model.calibrated_classifiers_
+    assert member.estimator is cal.calibrated_classifiers_[collapsed.model.member].estimator
+    p_ref, p_new = inf.predict(X[2000:])[0], collapsed.predict(X[2000:])[0]
+    parity = calibration_parity(p_ref, p_new, y[2000:], threshold=0.3)
+    assert parity["abs_diff_mean"] < 0.01 and parity["label_agreement"] > 0.98
+    assert abs(parity["brier_collapsed"] - parity["brier_reference"]) < 0.002
+    np.testing.assert_allclose(collapsed.compile().predict_proba(X[2000:]), p_new, atol=1e-10)
+
+    # load(collapse=True): таблица по сохранённому резервуару
+    art = tmp_path / "art"
+    save_artifacts(None, cal, {}, {}, {"optimal": 0.3}, paths=PathsConfig(str(art)))
+    save_reservoir({"X": X[:2000], "y": y[:2000].values, "n_seen": 2000}, str(art))
+    loaded = InferenceModel.load(PathsConfig(str(art)), collapse=True)
+    assert loaded.compiled
+    np.testing.assert_allclose(loaded.predict(X[2000:])[0], p_new, atol=1e-10)
+
+    # скрипт: отчёт о паритете — на части резервуара, не попавшей в таблицу
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    script = os.path.join(root, "scripts", "collapse_model.py")
+    env = {**os.environ, "PYTHONPATH": os.path.join(root, "src")}
+    X[:2000].assign(target=y[:2000]).to_csv(art / "test.csv", index=False)
+    cmd = [sys.executable, script, "--artifacts-dir", str(art), "--repeat", "1"]
+    subprocess.run(cmd + ["--json", str(tmp_path / "p.json")], check=True, env=env)
+    report = json.loads((tmp_path / "p.json").read_text())
+    assert report["n"] == report["rows"]["n_input"] == report["rows"]["n_reference"] == 1000
+    assert report["rows"]["input"].startswith("reservoir.pkl")
+    # резервуар — выборка сохранённого hold-out: тот же файл как --input отклоняется
+    same = subprocess.run(cmd + ["--input", str(art / "test.csv")], env=env, capture_output=True)
+    assert same.returncode != 0 and b"hold-out" in same.stderr
+
+
+def test_multi_model_shares_preprocessing(tmp_path):
+    from sklearn.ensemble import HistGradientBoostingClassifier
+    from mlc.metrics import StreamingMetrics
+
+    rng = np.random.default_rng(2)
+    X = pd.DataFrame({"a": rng.normal(size=2000), "b": rng.choice(["x", "y", "z"], size=2000)})
+    y = (X["a"] + rng.normal(scale=0.7, size=2000) > 1.5).astype(int)
+    models = {}
+    for name, est in [("lr", LogisticRegression()), ("hgb", HistGradientBoostingClassifier())]:
+        pipe = Pipeline([("preprocess", build_preprocessor(X)), ("model", est)])
+        models[name] = InferenceModel(None, calibrate(pipe, "sigmoid", 3).fit(X, y), 0.3)
+
+    # одинаковые фолды — одинаковые препроцессоры членов: 3 трансформации вместо 6
+    multi = MultiInferenceModel(models)
+    assert multi.shared_steps() == {"total": 6, "distinct": 3}
+    compiled = MultiInferenceModel(
+        {name: InferenceModel(None, m.compile(), 0.3) for name, m in models.items()}
+    )
+    assert compiled.shared_steps() == {"total": 2, "distinct": 1}
+    for m in (multi, compiled):
+        got = m.predict(X)
+        assert list(got.columns) == ["proba_lr", "label_lr", "proba_hgb", "label_hgb"]
+        for name, inf in models.items():
+            proba, label = inf.predict(X)
+            np.testing.assert_allclose(got[f"proba_{name}"], proba, atol=1e-10)
+            np.testing.assert_array_equal(got[f"label_{name}"], label)
+
+    src = tmp_path / "in.csv"
+    X.assign(target=y).to_csv(src, index=False)
+    accs = {name: StreamingMetrics(threshold=0.3) for name in models}
+    score_csv(multi, str(src), str(tmp_path / "out.csv"), chunksize=300, metrics=accs)
+    out = pd.read_csv(tmp_path / "out.csv")
+    # эталон — на тех же строках после CSV: read_csv не обязан восстанавливать float точно
+    X_csv = pd.read_csv(src).drop(columns=["target"])
+    np.testing.assert_allclose(out["proba_hgb"], models["hgb"].predict(X_csv)[0])
+    assert accs["lr"].n == accs["hgb"].n == len(X)
@@ -0,0 +1,153 @@
+from __future__ import annotations
+import numpy as np
+import pytest
+from sklearn.metrics import average_precision_score, brier_score_loss, roc_auc_score
+from mlc.metrics import bootstrap_ci, bootstrap_metrics, compute_metrics
+from mlc.metrics import StreamingMetrics
+
+
+def _loop_bootstrap(y, proba, scorer, n_boot, seed):
+    rng = np.random.default_rng(seed)
+    idx = np.arange(len(y))
+    stats = [scorer(y[s], proba[s]) for s in (rng.choice(idx, size=len(y)) for _ in range(n_boot))]
+    return np.mean(stats), np.percentile(stats, 2.5), np.percentile(stats, 97.5)
+
+
+@pytest.mark.parametrize("decimals", [None, 2])
+def test_bootstrap_metrics_matches_scorer_loop(decimals):
+    rng = np.random.default_rng(0)
+    y = (rng.random(1500) < 0.05).astype(int)
+    proba = np.clip(0.3 * y + 0.7 * rng.random(1500), 0, 1)
+    if decimals is not None:
+        proba = np.round(proba, decimals)  # много связанных скоров
+
+    res = bootstrap_metrics(y, proba, n_boot=60, seed=3)
+    for name, scorer in [
+        ("pr_auc", average_precision_score),
+        ("roc_auc", roc_auc_score),
+        ("brier", brier_score_loss),
+    ]:
+        ref = _loop_bootstrap(y, proba, scorer, 60, 3)
+        np.testing.assert_allclose(res[name], ref, rtol=1e-10)
+        got = bootstrap_ci(y, proba, scorer, n_boot=60, seed=3)
+        np.testing.assert_allclose(got, ref, rtol=1e-10)
+
+
+def test_bootstrap_metrics_parallel_is_deterministic():
+    rng = np.random.default_rng(1)
+    y = (rng.random(800) < 0.1).astype(int)
+    proba = rng.random(800)
+    assert bootstrap_metrics(y, proba, n_boot=50, seed=5, n_jobs=2) == bootstrap_metrics(
+        y, proba, n_boot=50, seed=5
+    )
+
+
+def _reference_metrics(y, proba, threshold, k, w=None):
+    # прежняя реализация compute_metrics: отдельные проходы sklearn
+    from sklearn import metrics as skm
+
+    fpr, tpr, _ = skm.roc_curve(y, proba, sample_weight=w)
+    precision, recall, _ = skm.precision_recall_curve(y, proba, sample_weight=w)
+    y_pred = (proba >= threshold).astype(int)
+    cm = skm.confusion_matrix(y, y_pred, labels=[0, 1], sample_weight=w)
+    wy = y if w is None else y * w
+    return {
+        "roc_auc": skm.auc(fpr, tpr),
+        "pr_auc": skm.auc(recall, precision),
+        "brier": skm.brier_score_loss(y, proba, sample_weight=w),
+        "accuracy": skm.accuracy_score(y, y_pred, sample_weight=w),
+        "f1_at_thr": skm.f1_score(y, y_pred, sample_weight=w),
+        "recall_at_k": float(wy[np.argsort(-proba)[:k]].sum() / wy.sum()),
+        "tn": cm[0, 0],
+        "fp": cm[0, 1],
+        "fn": cm[1, 0],
+        "tp": cm[1, 1],
+    }
+
+
+@pytest.mark.parametrize("decimals", [None, 2])
+@pytest.mark.parametrize("weighted", [False, True])
+def test_compute_metrics_single_pass_matches_sklearn(decimals, weighted):
+    rng = np.random.default_rng(1)
+    y = (rng.random(5000) < 0.05).astype(int)
+    proba = np.clip(0.3 * y + 0.7 * rng.random(5000), 0, 1)
+    if decimals is not None:
+        proba = np.round(proba, decimals)
+    w = rng.uniform(0.5, 2.0, size=5000) if weighted else None
+    k = int(np.sum(proba > np.quantile(proba, 0.97)))  # граница top-k не режет блок связанных
+
+    got = compute_metrics(y, proba, threshold=0.4, k=k, sample_weight=w)
+    ref = _reference_metrics(y, proba, 0.4, k, w)
+    assert set(got) == set(ref)
+    for name, value in ref.items():
+        np.testing.assert_allclose(got[name], value, rtol=1e-12, err_msg=name)
+    assert isinstance(got["tp"], float if weighted else int)
+
+
+def test_compute_metrics_single_class_falls_back():
+    y = np.zeros(50, dtype=int)
+    proba = np.linspace(0, 1, 50)
+    with pytest.warns(Warning):
+        got = compute_metrics(y, proba, threshold=0.5, k=5)
+    assert got["tp"] == 0 and got["fp"] == 25 and got["recall_at_k"] == 0.0
+
+
+def _stream_data(n=20_000, seed=2):
+    rng = np.random.default_rng(seed)
+    y = (rng.random(n) < 0.05).astype(int)
+    proba = np.clip(0.3 * y + 0.7 * rng.random(n), 0, 1)
+    return y, proba
+
+
+@pytest.mark.parametrize("weighted", [False, True])
+def test_streaming_metrics_matches_compute_metrics(weighted):
+    y, proba = _stream_data()
+    w = np.random.default_rng(3).uniform(0.5, 2.0, len(y)) if weighted else None
+    acc = StreamingMetrics(threshold=0.4)
+    for part in np.array_split(np.arange(len(y)), 7):
+        acc.update(y[part], proba[part], None if w is None else w[part])
+    got, ref = acc.metrics(), compute_metrics(y, proba, threshold=0.4, sample_weight=w)
+    for name in ("brier", "accuracy", "f1_at_thr", "tn", "fp", "fn", "tp"):
+        np.testing.assert_allclose(got[name], ref[name], rtol=1e-10, err_msg=name)
+    assert isinstance(got["tp"], float if weighted else int)
+    bounds = acc.auc_bounds()
+    for name in ("roc_auc", "pr_auc"):
+        assert abs(got[name] - ref[name]) < 1e-3
+        assert bounds[name][0] <= ref[name] + 1e-12 and ref[name] <= bounds[name][1] + 1e-12
+
+
+def test_streaming_metrics_merge_and_round_trip(tmp_path):
+    y, proba = _stream_data()
+    whole = StreamingMetrics(n_bins=1000, k=200).update(y, proba)
+    left = StreamingMetrics(n_bins=1000, k=200).update(y[:5000], proba[:5000])
+    right = StreamingMetrics(n_bins=1000, k=200).update(y[5000:], proba[5000:])
+    path = tmp_path / "state.json"
+    right.save(str(path))
+    merged = left.merge(StreamingMetrics.load(str(path)))
+    assert merged.metrics() == pytest.approx(whole.metrics())
+    assert merged.metrics()["recall_at_k"] == compute_metrics(y, proba, k=200)["recall_at_k"]
+    with pytest.raises(ValueError):
+        merged.merge(StreamingMetrics(n_bins=500, k=200))
+
+
+def test_streaming_metrics_cost_and_calibration():
+    from sklearn.calibration import calibration_curve
+    from mlc.cost import expected_cost
+
+    y, proba = _stream_data()
+    acc = StreamingMetrics(n_bins=1000).update(y, proba)
+
+    def exact(thr):
+        return float(expected_cost(y, proba, 10.0, 1.0, np.array([thr]))[1]["cost"].iloc[0])
+
+    # порог на границе бина — стоимость точная
+    edge = acc.cost(0.25, c_fn=10.0, c_fp=1.0)
+    assert edge["cost_low"] == edge["cost_high"]
+    np.testing.assert_allclose(edge["cost"], exact(0.25))
+    mid = acc.cost(0.2505, c_fn=10.0, c_fp=1.0)
+    assert mid["cost_low"] <= exact(0.2505) <= mid["cost_high"]
+
+    frac_pos, mean_pred = calibration_curve(y, proba, n_bins=10)
+    got_pred, got_pos = acc.calibration_curve(10)
+    np.testing.assert_allclose(got_pred, mean_pred, rtol=1e-10)
+    np.testing.assert_allclose(got_pos, frac_pos, rtol=1e-10)
@@ -16,6 +16,9 @@ def test_oof_prauc_and_artifacts(tmp_path):
     assert (art / "preprocessor.pkl").exists()
     assert (art / "model.pkl").exists()
     assert (art / "metrics_test.json").exists()
+    prof = json.loads((art / "profile.json").read_text())
+    assert {"data", "oof_cv", "calibration"} <= {s["name"] for s in prof["stages"]}
+    assert prof["tasks"]
     d = json.loads((art / "metrics_cv.json").read_text())
     vals = [v["oof"]["pr_auc"] for v in d.values()]
     assert max(vals) > 0.2
@@ -0,0 +1,82 @@
+from __future__ import annotations
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.pipeline import Pipeline
+from mlc.calibration import calibrate
+from mlc.config import PathsConfig
+from mlc.features import build_preprocessor
+from mlc.infer import InferenceModel
+from mlc.models import build_model
+from mlc.persistence import load_bundle, save_artifacts, verify_bundle
+
+
+def _save(tmp_path, model_type="rf"):
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(600, 4)), columns=list("abcd"))
+    X["cat"] = rng.choice(["u", "v", "w"], size=600)
+    y = pd.Series((X["a"] + rng.normal(size=600) > 1.2).astype(int))
+    spec = {"type": model_type, "params": {"n_estimators": 20, "max_depth": 5}}
+    pre = build_preprocessor(X)
+    cal = calibrate(Pipeline([("preprocess", pre), ("model", build_model(spec, 0))]), "isotonic")
+    cal.fit(X, y)
+    paths = PathsConfig(artifacts_dir=str(tmp_path / "art"))
+    save_artifacts(pre, cal, {}, {}, {"optimal": 0.2, "fixed_0_5": 0.5}, paths)
+    return paths, cal, X
+
+
+def test_bundle_is_memory_mapped_and_matches_joblib(tmp_path):
+    paths, cal, X = _save(tmp_path)
+    bundle = os.path.join(paths.artifacts_dir, "bundle")
+    assert os.path.exists(os.path.join(bundle, "manifest.json"))
+    verify_bundle(bundle)
+
+    inf = InferenceModel.load(paths)
+    assert inf.compiled
+    assert isinstance(inf.model.arrays["node_threshold"], np.memmap)
+    assert inf.threshold == 0.2
+
+    legacy = InferenceModel.load(paths, use_bundle=False)
+    assert not legacy.compiled
+    p_bundle, l_bundle = inf.predict(X.head(100))
+    p_joblib, l_joblib = legacy.predict(X.head(100))
+    np.testing.assert_allclose(p_bundle, p_joblib, atol=1e-12)
+    np.testing.assert_array_equal(l_bundle, l_joblib)
+    np.testing.assert_allclose(p_joblib, cal.predict_proba(X.head(100))[:, 1])
+
+
+def test_corrupt_bundle_is_detected_and_falls_back(tmp_path):
+    paths, _, X = _save(tmp_path)
+    bundle = os.path.join(paths.artifacts_dir, "bundle")
+    target = os.path.join(bundle, "node_value.npy")
+    data = bytearray(open(target, "rb").read())
+    data[-1] ^= 0xFF
+    open(target, "wb").write(bytes(data))
+    with pytest.raises(ValueError):
+        load_bundle(paths, verify=True)
+
+    with open(target, "ab") as f:
+        f.write(b"\0")  # другой размер -> бандл отвергается без чтения массивов
+    inf = InferenceModel.load(paths)
+    assert not inf.compiled
+    assert len(inf.predict(X.head(5))[0]) == 5
+
+
+def test_stale_bundle_is_removed_when_new_model_cannot_compile(tmp_path):
+    from sklearn.neighbors import KNeighborsClassifier
+
+    paths, _, X = _save(tmp_path)
+    bundle = os.path.join(paths.artifacts_dir, "bundle")
+    assert os.path.isdir(bundle)
+
+    y = pd.Series((X["b"] > 0.5).astype(int))
+    pre = build_preprocessor(X)
+    knn = calibrate(Pipeline([("preprocess", pre), ("model", KNeighborsClassifier())]), "sigmoid")
+    knn.fit(X, y)
+    save_artifacts(pre, knn, {}, {}, {"optimal": 0.4}, paths)
+    assert not os.path.exists(bundle)
+
+    inf = InferenceModel.load(paths)
+    assert not inf.compiled and inf.threshold == 0.4
+    np.testing.assert_allclose(inf.predict(X.head(50))[0], knn.predict_proba(X.head(50))[:, 1])
@@ -0,0 +1,71 @@
+from __future__ import annotations
+import json
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import RepeatedStratifiedKFold
+from sklearn.pipeline import Pipeline
+from mlc.features import build_preprocessor
+from mlc.profiling import StageProfiler
+from mlc.validation import oof_predict_many
+
+
+def test_nested_stages_and_disabled_noop(tmp_path):
+    prof = StageProfiler()
+    with prof.stage("outer"):
+        with prof.stage("inner", model="lr"):
+            buf = np.ones(4_000_000)  # ~30 MB
+            del buf
+    outer, inner = prof.stages
+    assert inner["parent"] == "outer" and inner["model"] == "lr"
+    assert outer["peak_rss_mb"] >= inner["peak_rss_mb"] > 0
+    assert outer["wall_s"] >= inner["wall_s"] >= 0
+    prof.save(str(tmp_path / "profile.json"))
+    d = json.loads((tmp_path / "profile.json").read_text())
+    assert [s["name"] for s in d["stages"]] == ["outer", "inner"]
+
+    off = StageProfiler(enabled=False)
+    with off.stage("outer"):
+        pass
+    off.save(str(tmp_path / "off.json"))
+    assert off.stages == [] and not (tmp_path / "off.json").exists()
+
+
+def test_oof_tasks_per_model_and_fold():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame({"a": rng.normal(size=200), "b": rng.choice(["x", "y"], size=200)})
+    y = pd.Series((X["a"] > 0.8).astype(int))
+    pre = build_preprocessor(X)
+    pipes = {
+        "lr": Pipeline([("preprocess", pre), ("model", LogisticRegression())]),
+        "lr_c": Pipeline([("preprocess", pre), ("model", LogisticRegression(C=0.1))]),
+    }
+    cv = RepeatedStratifiedKFold(n_splits=3, n_repeats=2, random_state=0)
+    prof = StageProfiler()
+    plain = oof_predict_many(pipes, X, y, cv)
+    profiled = oof_predict_many(pipes, X, y, cv, profiler=prof)
+    for name in pipes:
+        np.testing.assert_allclose(plain[name], profiled[name])
+
+    fits = [t for t in prof.tasks if t["task"] == "fit"]
+    assert sorted((t["model"], t["repeat"], t["fold"]) for t in fits) == sorted(
+        (m, r, f) for m in pipes for r in range(2) for f in range(3)
+    )
+    assert all(t["wall_s"] >= 0 and t["peak_rss_mb"] > 0 for t in prof.tasks)
+    assert prof.summary()["models"]["lr"]["tasks"] == 6
+
+
+def test_hook_on_chosen_stage(tmp_path):
+    prof = StageProfiler(hook="tracemalloc", hook_stage="work", out_dir=str(tmp_path))
+    with prof.stage("other"):
+        pass
+    with prof.stage("work"):
+        keep = [bytearray(1024) for _ in range(2000)]
+    assert prof.hook_report["stage"] == "work"
+    assert prof.hook_report["traced_peak_mb"] > 1.0
+    del keep
+
+    prof = StageProfiler(hook="cprofile", hook_stage="work", out_dir=str(tmp_path))
+    with prof.stage("work"):
+        sorted(range(10_000), key=lambda v: -v)
+    assert (tmp_path / "profile_work.prof").exists()
@@ -0,0 +1,88 @@
+from __future__ import annotations
+import json
+from pathlib import Path
+import numpy as np
+import pytest
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from mlc.calibration import calibrate
+from mlc.compiled import compile_model
+from mlc.config import load_config
+from mlc.data import make_dataset
+from mlc.features import build_preprocessor
+from mlc.models import build_model
+from mlc.sampling import DownsampledClassifier, downsample
+from mlc.trainer import run_training
+from mlc.validation import make_cv, oof_predict
+
+
+def _data(n=6000, weights=(0.97, 0.03)):
+    cfg = load_config("configs/default.yaml")
+    cfg.data.n_samples, cfg.data.weights = n, list(weights)
+    return cfg, *make_dataset(cfg)
+
+
+@pytest.mark.parametrize("correction", ["offset", "weight"])
+def test_downsampled_logistic_recovers_class_prior(correction):
+    rng = np.random.default_rng(0)
+    X = rng.standard_normal((40_000, 3))
+    y = (rng.random(40_000) < 1 / (1 + np.exp(-(X[:, 0] - 4.0)))).astype(int)
+    full = LogisticRegression().fit(X, y)
+    model = DownsampledClassifier(LogisticRegression(), 0.05, correction, random_state=0).fit(X, y)
+    assert model.n_fit_ < 0.1 * len(y)
+    p = model.predict_proba(X)[:, 1]
+    # средняя вероятность — исходная доля положительных, а не доля в выборке
+    assert abs(p.mean() - y.mean()) < 0.2 * y.mean()
+    np.testing.assert_allclose(model.estimator_.coef_, full.coef_, atol=0.15)
+    np.testing.assert_allclose(p, full.predict_proba(X)[:, 1], atol=0.05)
+
+
+def test_oof_predict_with_downsampling():
+    cfg, X, y = _data()
+    pipe = Pipeline(
+        [
+            ("preprocess", build_preprocessor(X)),
+            ("model", build_model({"type": "hist_gbdt", "params": {"max_iter": 50}}, 0)),
+        ]
+    )
+    proba, idx = oof_predict(pipe, X, y, make_cv(cfg), negative_rate=0.1)
+    assert len(idx) == len(y)
+    assert abs(proba.mean() - y.mean()) < 0.3 * y.mean()
+
+
+@pytest.mark.parametrize(
+    "spec",
+    [
+        {"type": "logistic"},
+        {"type": "hist_gbdt", "params": {"max_iter": 30}},
+        {"type": "rf", "params": {"n_estimators": 20, "max_depth": 5}},
+    ],
+)
+def test_compiled_matches_downsampled_calibrated_model(spec):
+    _, X, y = _data(3000)
+    pipe = downsample(
+        Pipeline([("preprocess", build_preprocessor(X)), ("model", build_model(spec, 0))]),
+        0.2,
+        random_state=0,
+    )
+    cal = calibrate(pipe, method="sigmoid", cv_or_holdout=3).fit(X, y)
+    np.testing.assert_allclose(
+        compile_model(cal).predict_proba(X), cal.predict_proba(X)[:, 1], atol=1e-6
+    )
+
+
+def test_run_training_downsampled(tmp_path):
+    cfg = load_config("configs/default.yaml")
+    cfg.data.n_samples = 3000
+    cfg.validation.cv.n_splits, cfg.validation.cv.n_repeats = 3, 1
+    cfg.models = [{"name": "hgb", "type": "hist_gbdt", "params": {"max_iter": 40}}]
+    cfg.sampling.negative_rate = 0.2
+    cfg.paths.artifacts_dir = str(tmp_path / "artifacts")
+    run_training(cfg)
+    art = Path(cfg.paths.artifacts_dir)
+    metrics_test = json.loads((art / "metrics_test.json").read_text())
+    # hold-out — полное распределение: все строки теста в матрице ошибок
+    assert sum(metrics_test[c] for c in ("tn", "fp", "fn", "tp")) == round(
+        3000 * cfg.data.test_size
+    )
+    assert (art / "bundle" / "manifest.json").exists()
@@ -0,0 +1,86 @@
+from __future__ import annotations
+import http.client
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from mlc.features import build_preprocessor
+from mlc.infer import InferenceModel
+from mlc.serving import MicroBatcher, make_server
+
+
+def _model_and_rows(n=200):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({"a": rng.normal(size=n), "b": rng.choice(["x", "y"], size=n)})
+    y = (df["a"] > 0.5).astype(int)
+    pipe = Pipeline([("preprocess", build_preprocessor(df)), ("model", LogisticRegression())])
+    pipe.fit(df, y)
+    return InferenceModel(pipe.named_steps["preprocess"], pipe, threshold=0.5), df
+
+
+def test_microbatcher_batches_concurrent_rows():
+    inf, df = _model_and_rows()
+    batcher = MicroBatcher(inf, max_batch_size=32, max_wait_ms=20)
+    try:
+        rows = df.to_dict(orient="records")
+        with ThreadPoolExecutor(16) as pool:
+            got = list(pool.map(batcher.predict_one, rows))
+        proba, label = inf.predict(df)
+        np.testing.assert_allclose([p for p, _ in got], proba)
+        np.testing.assert_array_equal([lbl for _, lbl in got], label)
+        stats = batcher.stats()
+        assert stats["requests"] == len(df)
+        assert stats["mean_batch_size"] > 1
+        assert stats["p99_ms"] >= stats["p50_ms"] > 0
+    finally:
+        batcher.close()
+
+
+def test_microbatcher_fails_only_the_bad_row():
+    inf, df = _model_and_rows(n=20)
+    batcher = MicroBatcher(inf, max_batch_size=64, max_wait_ms=50)
+    try:
+        rows = df.to_dict(orient="records")
+        rows[3] = {"a": "oops", "b": "x"}  # батч целиком не предсказывается
+        futures = [batcher.submit(r) for r in rows]
+        proba, _ = inf.predict(df)
+        for i, fut in enumerate(futures):
+            if i == 3:
+                assert fut.exception(timeout=5) is not None
+            else:
+                assert abs(fut.result(timeout=5)[0] - proba.iloc[i]) < 1e-12
+        assert batcher.stats()["requests"] == len(rows) - 1
+    finally:
+        batcher.close()
+
+
+def test_http_server_predict_and_stats():
+    inf, df = _model_and_rows()
+    server, batcher = make_server(inf, port=0, max_batch_size=8, max_wait_ms=1)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        conn = http.client.HTTPConnection("127.0.0.1", server.server_address[1])
+        rows = df.head(3).to_dict(orient="records")
+        conn.request("POST", "/predict", body=json.dumps(rows[0]))
+        one = json.loads(conn.getresponse().read())
+        conn.request("POST", "/predict", body=json.dumps(rows))
+        many = json.loads(conn.getresponse().read())
+        proba, _ = inf.predict(df.head(3))
+        assert abs(one["proba"] - proba[0]) < 1e-12
+        np.testing.assert_allclose([r["proba"] for r in many], proba)
+
+        conn.request("POST", "/predict", body=b"[1, 2]")
+        resp = conn.getresponse()
+        resp.read()
+        assert resp.status == 400
+
+        conn.request("GET", "/stats")
+        assert json.loads(conn.getresponse().read())["requests"] == 4
+    finally:
+        server.shutdown()
+        server.server_close()
+        batcher.close()
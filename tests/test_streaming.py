@@ -0,0 +1,107 @@
+from __future__ import annotations
+import json
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from mlc.config import load_config
+from mlc.data import make_dataset
+from mlc.features import build_preprocessor
+from mlc.incremental import load_reservoir
+from mlc.infer import InferenceModel
+from mlc.streaming import TEST, QuantileSketch, StreamingStats, assign_folds, streaming_preprocessor
+from mlc.trainer import run_training
+
+
+def _table(n=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(
+        {
+            "a": rng.standard_normal(n),
+            "b": rng.exponential(2.0, n),
+            "c": rng.choice(["x", "y", "z"], n, p=[0.5, 0.3, 0.2]).astype(object),
+        }
+    )
+    X.loc[rng.random(n) < 0.1, "a"] = np.nan
+    X.loc[rng.random(n) < 0.1, "c"] = np.nan
+    return X
+
+
+def test_quantile_sketch_median_and_merge():
+    rng = np.random.default_rng(0)
+    values = rng.lognormal(size=200_000)
+    left, right = QuantileSketch(k=256, seed=1), QuantileSketch(k=256, seed=2)
+    for part in np.array_split(values[:120_000], 7):
+        left.update(part)
+    right.update(values[120_000:])
+    merged = left.merge(right)
+    assert merged.n == values.size
+    rank = np.mean(values <= merged.quantile(0.5))
+    assert abs(rank - 0.5) < 0.01
+    assert QuantileSketch(k=256).update(values[:101]).quantile(0.5) == np.median(values[:101])
+
+
+def test_streaming_preprocessor_matches_in_memory_fit():
+    X = _table()
+    stats = StreamingStats(["a", "b"], ["c"], sketch_k=10_000)
+    for part in np.array_split(np.arange(len(X)), 6):
+        stats.update(X.iloc[part])
+    # структура — по маленькой выборке без одной категории, состояние — по всем чанкам
+    sample = X[X["c"] != "z"].head(50)
+    pre = streaming_preprocessor(stats, sample)
+    ref = build_preprocessor(X).fit(X)
+    np.testing.assert_allclose(pre.transform(X), ref.transform(X), rtol=1e-9, atol=1e-9)
+
+
+def test_assign_folds_is_stratified_and_deterministic():
+    y = (np.random.default_rng(0).random(10_000) < 0.05).astype(int)
+    folds = assign_folds(y, n_splits=5, n_repeats=2, test_size=0.2, seed=3, chunk=7)
+    np.testing.assert_array_equal(folds, assign_folds(y, 5, 2, 0.2, 3, 7))
+    test = folds[0] == TEST
+    np.testing.assert_array_equal(test, folds[1] == TEST)  # hold-out общий для повторов
+    assert abs(test[y == 1].mean() - 0.2) < 0.01 and abs(test[y == 0].mean() - 0.2) < 0.01
+    for r in range(2):
+        for c in (0, 1):
+            sizes = np.bincount(folds[r, (y == c) & ~test], minlength=5)
+            assert sizes.max() - sizes.min() <= 1
+    assert (folds[0] != folds[1])[~test].any()
+
+
+def test_out_of_core_training_writes_usable_artifacts(tmp_path):
+    cfg = load_config("configs/default.yaml")
+    cfg.data.n_samples = 4000
+    X, y = make_dataset(cfg)
+    path = tmp_path / "train.csv"
+    X.assign(target=y).to_csv(path, index=False)
+
+    cfg.data.kind, cfg.data.path = "csv", str(path)
+    cfg.validation.cv.n_splits, cfg.validation.cv.n_repeats = 3, 1
+    cfg.models = [
+        {"name": "sgd", "type": "sgd", "params": {"class_weight": "balanced"}},
+        {"name": "rf", "type": "rf", "params": {"n_estimators": 10}},  # без partial_fit — пропуск
+    ]
+    cfg.streaming.enabled, cfg.streaming.chunksize, cfg.streaming.epochs = True, 700, 3
+    cfg.incremental.reservoir, cfg.incremental.reservoir_size = True, 1000
+    cfg.paths.artifacts_dir = str(tmp_path / "artifacts")
+    run_training(cfg)
+
+    art = Path(cfg.paths.artifacts_dir)
+    metrics_cv = json.loads((art / "metrics_cv.json").read_text())
+    assert list(metrics_cv) == ["sgd"]
+    assert metrics_cv["sgd"]["oof"]["roc_auc"] > 0.7
+    test_df = pd.read_csv(art / "test.csv")
+    assert abs(len(test_df) - 0.2 * len(X)) < 10
+    assert load_reservoir(str(art))["n_seen"] == len(test_df)  # для --update: только hold-out
+    metrics_test = json.loads((art / "metrics_test.json").read_text())
+    assert sum(metrics_test[c] for c in ("tn", "fp", "fn", "tp")) == len(test_df)
+    assert {s["name"] for s in json.loads((art / "profile.json").read_text())["stages"]} >= {
+        "stats",
+        "train_epoch",
+        "evaluate",
+    }
+
+    inf = InferenceModel.load(cfg.paths)
+    proba, _ = inf.predict(test_df.drop(columns=["target"]))
+    ref, _ = InferenceModel.load(cfg.paths, use_bundle=False).predict(
+        test_df.drop(columns=["target"])
+    )
+    np.testing.assert_allclose(proba, ref, atol=1e-6)
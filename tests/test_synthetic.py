@@ -0,0 +1,76 @@
+from __future__ import annotations
+import dataclasses as dc
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import cross_val_predict
+from mlc.config import load_config
+from mlc.data import make_dataset
+from mlc.synthetic import SyntheticGenerator, write_shards
+
+
+def _data(**kw):
+    d = load_config("configs/default.yaml").data
+    return dc.replace(d, **{"n_samples": 5000, "chunk_rows": 1000, **kw})
+
+
+def test_blocks_are_deterministic_and_independent():
+    d = _data(n_samples=2500, n_high_card=2, high_card_levels=50, missing_rate=0.05)
+    X, y = SyntheticGenerator(d, seed=7).generate()
+    assert len(X) == len(y) == 2500
+    assert list(X.index) == list(range(2500))
+    again, _ = SyntheticGenerator(d, seed=7).generate()
+    pd.testing.assert_frame_equal(X, again)
+    # блок не зависит ни от соседей, ни от общего числа строк
+    longer = SyntheticGenerator(dc.replace(d, n_samples=10_000), seed=7)
+    X_b, y_b = longer.block(2)
+    pd.testing.assert_frame_equal(X_b.iloc[:500], X.iloc[2000:])
+    np.testing.assert_array_equal(y_b.iloc[:500], y.iloc[2000:])
+    other, _ = SyntheticGenerator(d, seed=8).generate()
+    assert not np.allclose(other["x00"].fillna(0), X["x00"].fillna(0))
+
+
+def test_distribution_matches_config():
+    d = _data(
+        n_samples=40_000, chunk_rows=7000, n_high_card=1, high_card_levels=200, missing_rate=0.1
+    )
+    X, y = SyntheticGenerator(d, seed=0).generate()
+    assert abs(y.mean() - 0.05) < 0.01
+    assert X.columns.tolist() == [f"x{i:02d}" for i in range(20)] + ["cat_bin", "hc00"]
+    assert isinstance(X["hc00"].dtype, pd.CategoricalDtype)
+    np.testing.assert_allclose(X.isna().mean(), 0.1, atol=0.01)
+    shares = X["cat_bin"].value_counts(normalize=True).sort_index()
+    np.testing.assert_allclose(shares, 0.25, atol=0.02)
+    # уровни высококардинальной колонки несут сигнал о классе
+    rate = y.groupby(X["hc00"], observed=True).mean()
+    assert rate.std() > 0.02
+    Xn = X.filter(like="x").fillna(0.0).to_numpy()
+    proba = cross_val_predict(LogisticRegression(max_iter=500), Xn, y, cv=3, method="predict_proba")
+    assert roc_auc_score(y, proba[:, 1]) > 0.7
+
+
+def test_make_dataset_uses_generator():
+    cfg = load_config("configs/default.yaml")
+    X, y = make_dataset(cfg)
+    ref, ref_y = SyntheticGenerator(cfg.data, cfg.random_state).generate()
+    pd.testing.assert_frame_equal(X, ref)
+    assert y.name == cfg.data.target and len(y) == cfg.data.n_samples
+
+
+@pytest.mark.parametrize("kind", ["parquet", "csv"])
+def test_write_shards_in_parallel_matches_generate(tmp_path, kind):
+    if kind == "parquet":
+        pytest.importorskip("pyarrow")
+    d = _data(n_samples=3500, n_high_card=1, high_card_levels=30, missing_rate=0.02)
+    paths = write_shards(d, 3, str(tmp_path), kind=kind, blocks_per_shard=2, n_jobs=2)
+    assert [p.rsplit("/", 1)[-1] for p in paths] == [f"part-0000{i}.{kind}" for i in range(2)]
+
+    cfg = load_config("configs/default.yaml")
+    cfg.data = dc.replace(d, kind=kind, path=str(tmp_path), float32=False)  # каталог шардов
+    X, y = make_dataset(cfg)
+    ref_X, ref_y = SyntheticGenerator(d, 3).generate()
+    np.testing.assert_array_equal(y.to_numpy(), ref_y.to_numpy())
+    np.testing.assert_allclose(X["x05"].to_numpy(), ref_X["x05"].to_numpy())
+    assert (X["hc00"].astype(object).fillna("") == ref_X["hc00"].astype(object).fillna("")).all()
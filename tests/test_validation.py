@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.dummy import DummyClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import RepeatedStratifiedKFold
+from sklearn.pipeline import Pipeline
+
+from mlc.cache import FoldCache
+from mlc.features import CompactEncoder, build_preprocessor
+from mlc.validation import average_repeats, oof_predict, oof_predict_many, race_models
+
+
+def _toy():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame({"a": rng.normal(size=300), "b": rng.choice(["x", "y", "z"], size=300)})
+    y = pd.Series((X["a"] + rng.normal(scale=0.5, size=300) > 1.0).astype(int))
+    pipe = Pipeline([("preprocess", build_preprocessor(X)), ("model", LogisticRegression())])
+    return X, y, pipe
+
+
+def test_oof_keeps_every_repeat_and_averages():
+    X, y, pipe = _toy()
+    cv = RepeatedStratifiedKFold(n_splits=3, n_repeats=2, random_state=0)
+    oof = oof_predict_many({"lr": pipe}, X, y, cv)["lr"]
+    assert oof.shape == (2, len(y))
+    assert not np.isnan(oof).any()
+    assert not np.allclose(oof[0], oof[1])
+
+    proba, idx = oof_predict(pipe, X, y, cv)
+    np.testing.assert_array_equal(idx, np.arange(len(y)))
+    np.testing.assert_allclose(proba, oof.mean(axis=0))
+
+
+def test_parallel_schedule_matches_serial():
+    X, y, pipe = _toy()
+    cv = RepeatedStratifiedKFold(n_splits=3, n_repeats=2, random_state=1)
+    pipes = {"lr": pipe, "lr_c": clone(pipe).set_params(model__C=0.1)}
+    serial = oof_predict_many(pipes, X, y, cv, n_jobs=1)
+    parallel = oof_predict_many(pipes, X, y, cv, n_jobs=2, max_memory_mb=1024)
+    for name in pipes:
+        np.testing.assert_allclose(serial[name], parallel[name])
+    proba, idx = average_repeats(serial["lr"])
+    assert len(proba) == len(idx) == len(y)
+
+
+def test_shared_preprocessing_matches_full_pipelines(tmp_path):
+    X, y, pipe = _toy()
+    cv = RepeatedStratifiedKFold(n_splits=3, n_repeats=2, random_state=2)
+    pipes = {"lr": pipe, "lr_c": clone(pipe).set_params(model__C=0.1)}
+    # cache_mb=0 -> все матрицы фолдов уходят в memmap
+    shared = oof_predict_many(pipes, X, y, cv, cache_mb=0, spill_dir=str(tmp_path))
+    for name, p in pipes.items():
+        alone = oof_predict_many({name: p}, X, y, cv)[name]
+        np.testing.assert_allclose(shared[name], alone)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_compact_matrix_matches_dataframe_oof():
+    X, y, pipe = _toy()
+    cv = RepeatedStratifiedKFold(n_splits=3, n_repeats=1, random_state=3)
+    enc = CompactEncoder().fit(X)
+    M = enc.transform(X)
+    pre = build_preprocessor(M, num_cols=enc.num_idx_, cat_cols=enc.cat_idx_, compact=True)
+    compact = Pipeline([("preprocess", pre), ("model", LogisticRegression())])
+    serial = oof_predict_many({"lr": compact}, M, y, cv)["lr"]
+    parallel = oof_predict_many({"lr": compact}, M, y, cv, n_jobs=2)["lr"]
+    np.testing.assert_allclose(serial, parallel)
+    np.testing.assert_allclose(serial, oof_predict_many({"lr": pipe}, X, y, cv)["lr"], atol=1e-4)
+
+
+def test_fold_cache_spills_over_budget(tmp_path):
+    a = np.ones((1000, 10))
+    with FoldCache(max_memory_mb=0.1, spill_dir=str(tmp_path)) as cache:
+        cache.put(0, a, a[:10])
+        cache.put(1, a, a[:10])
+        X_fit, _ = cache.get(1)
+        assert isinstance(X_fit, np.memmap)
+        np.testing.assert_array_equal(X_fit, a)
+        assert cache.spilled_bytes > 0
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_racing_stops_weak_candidate_and_keeps_winner():
+    X, y, pipe = _toy()
+    cv = RepeatedStratifiedKFold(n_splits=3, n_repeats=2, random_state=0)
+    weak = Pipeline([("preprocess", pipe[0]), ("model", DummyClassifier(strategy="prior"))])
+    pipes = {"lr": pipe, "weak": weak}
+    full = oof_predict_many(pipes, X, y, cv)
+    oof, report = race_models(pipes, X, y, cv, min_folds=3)
+
+    assert report["lr"]["status"] == "finished" and report["lr"]["folds"] == 6
+    assert report["weak"]["status"] == "stopped"
+    assert report["weak"]["stopped_after_folds"] == report["weak"]["folds"] == 3
+    assert report["weak"]["leader"] == "lr" and report["weak"]["gap_ucb"] < 0
+    np.testing.assert_allclose(oof["lr"], full["lr"])
+    # снятый кандидат покрыт только первым повтором
+    assert not np.isnan(oof["weak"][0]).any() and np.isnan(oof["weak"][1]).all()